@@ -5,15 +5,24 @@ import asyncio
 import logging
 import signal
 import sys
+from pathlib import Path
 from typing import Any
 from typing import Literal
 
+import tomli
+
+from src.libs.event_loop import configure_loop
+from src.libs.event_loop import loop_factory
 from src.libs.i18n import i18n
 from src.libs.mcp_config_loader import MCPConfigLoader
 from src.libs.mcp_server import McpServer
 from src.models.config_model import Config
+from src.models.config_model import ProxyConfig
+from src.models.config_model import ServerConfig
 from src.utils.custom_log import create_logger
 
+CONFIG_FILE = "moonshot_config.toml"
+
 
 async def shutdown(
     server: McpServer,
@@ -43,27 +52,39 @@ async def shutdown(
         logger.exception("Close MCP server failed")
 
 
-async def setup_config() -> tuple[logging.Logger, dict, MCPConfigLoader]:
+async def setup_config() -> tuple[logging.Logger, Config, MCPConfigLoader]:
     """Set up configuration and logger."""
     logger = await create_logger("mcp_server")
-    main_config = MCPConfigLoader("moonshot_config.toml")
-    await main_config.load_config()
-    config = await main_config.get_config()
+    main_config = MCPConfigLoader(CONFIG_FILE)
 
     try:
-        validated_config = Config(**config)
+        await main_config.load_config()
         logger.info("Validated config successfully")
-        config = validated_config.model_dump()
     except Exception:
         logger.exception("Config validation error")
         raise
 
+    config = await main_config.get_config()
     return logger, config, main_config
 
 
+async def reload_config(main_config: MCPConfigLoader, logger: logging.Logger) -> Config | None:
+    """Reload the config file, returning the new config or None if nothing changed."""
+    try:
+        changed = await main_config.load_config()
+    except Exception:
+        logger.exception("Error reloading server with new configuration")
+        return None
+    if not changed:
+        logger.info("Config file content unchanged, skipping reload")
+        return None
+    logger.info("Validated new config successfully")
+    return await main_config.get_config()
+
+
 async def setup_server(
-    server_config: dict,
-    proxy_config: dict,
+    server_config: ServerConfig,
+    proxy_config: dict[str, ProxyConfig],
     logger: logging.Logger,
 ) -> McpServer:
     """Create and set up the MCP server."""
@@ -79,6 +100,8 @@ async def setup_server(
                 shutdown(server, signal=s, logger=logger),
             ),
         )
+    # SIGHUP 触发零停机重启:新进程接管监听套接字后,本进程排空并退出
+    loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.create_task(server.restart()))
 
     # Add a custom exception handler to handle CancelledError more gracefully
     def custom_exception_handler(
@@ -98,6 +121,15 @@ async def setup_server(
     return server
 
 
+def configured_event_loop() -> str:
+    """Read ``[server] event_loop`` before the loop starts, the full config is validated later."""
+    try:
+        data = tomli.loads(Path(CONFIG_FILE).read_text(encoding="utf-8"))
+    except (OSError, tomli.TOMLDecodeError):
+        return "asyncio"
+    return data.get("server", {}).get("event_loop", "asyncio")
+
+
 def parse_args() -> Literal["http", "sse"]:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="Moonshot MCP Server")
@@ -121,47 +153,24 @@ async def main() -> None:
     server = None  # Initialize server variable
 
     async def reload_server() -> None:
-        """Reload the server when the config file changes."""
-        nonlocal server
-        logger.info("Config file changed, restarting server...")
-        # 使用与主服务器相同的模式
-
-        # 停止当前服务器
-        if server is not None:
-            await server.stop()
-            server = None  # 确保服务器被完全停止和清理
-
-        # 重新加载配置
-        await main_config.load_config()
-        new_config = await main_config.get_config()
-
-        try:
-            # 验证新配置
-            validated_config = Config(**new_config)
-            logger.info("Validated new config successfully")
-            new_config = validated_config.model_dump()
-
-            # 获取新的服务器配置
-            new_server_config = new_config["server"]
-            new_proxy_config = new_config["mcpServers"]
-
-            # 创建新的服务器实例
-            server = await McpServer.create(new_server_config, new_proxy_config, logger)
-
-            if server and server.main_server:
-                logger.info("Configuration updated successfully. Please restart the server manually to apply changes.")
-                # 不尝试启动HTTP服务器,因为这会导致端口冲突
-                # 相反,我们只创建代理
-                await server.create_proxies()
-            else:
-                logger.error("Failed to create server during reload: main_server is None")
-        except Exception:
-            logger.exception("Error reloading server with new configuration")
+        """Apply a config file change, in place when only ``[mcpServers]`` changed."""
+        new_config = await reload_config(main_config, logger)
+        if new_config is None or server is None:
+            return
+        if new_config.server == server.server_config and server.can_update_backends(new_config.mcpServers):
+            # 只有后端变化,未变的后端及其会话保持不动
+            logger.info("Backends changed, updating them in place...")
+            await server.update_backends(new_config.mcpServers)
+            return
+        # 新进程读取新配置并接管监听套接字,连接不中断
+        logger.info("Config file changed, restarting in a new process...")
+        await server.restart()
 
     await main_config.start_watching(reload_server)
 
-    server_config = config["server"]
-    proxy_config = config["mcpServers"]
+    server_config = config.server
+    proxy_config = config.mcpServers
+    configure_loop(server_config.executor_workers)
 
     try:
         # 创建服务器实例
@@ -178,10 +187,7 @@ async def main() -> None:
 
         # 根据命令行参数选择服务器模式
         logger.info("Starting server in %s mode", server_mode)
-        if server_mode == "http":
-            await server.main_server.run_http_async()
-        else:  # server_mode == "sse"
-            await server.main_server.run_sse_async()
+        await server.serve("streamable-http" if server_mode == "http" else "sse")
 
     except Exception:
         logger.exception("Error starting MCP server")
@@ -195,7 +201,7 @@ async def main() -> None:
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        asyncio.run(main(), loop_factory=loop_factory(configured_event_loop()))
     except KeyboardInterrupt:
         logger = logging.getLogger("mcp_server")
         logger.info("KeyboardInterrupt, stopping server...")
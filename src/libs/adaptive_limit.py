@@ -0,0 +1,150 @@
+import math
+from abc import ABC
+from abc import abstractmethod
+from typing import Any
+
+# 上限未配置时自适应并发的最大值
+DEFAULT_MAX_CONCURRENCY = 256
+# 出错时乘性减小的系数
+BACKOFF_RATIO = 0.9
+
+
+class ConcurrencyLimit(ABC):
+    """Concurrency limit of one backend, adjusted from the round trips of its calls.
+
+    ``sample`` is fed every finished call with its round-trip time, the
+    number of calls in flight when it finished and whether it failed. The
+    limit only grows while the backend is actually using most of it, so an
+    idle backend keeps its current limit.
+    """
+
+    name = ""
+
+    def __init__(self, minimum: int, maximum: int) -> None:
+        """Initialize the limit between ``minimum`` and ``maximum``."""
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(self._initial())
+        self.samples = 0
+        self.drops = 0
+
+    @property
+    def capacity(self) -> int:
+        """Return the limit as a number of calls."""
+        return int(self.limit)
+
+    def sample(self, rtt: float, in_flight: int, dropped: bool) -> int:  # noqa: FBT001
+        """Account one finished call and return the new capacity."""
+        self.samples += 1
+        if dropped:
+            self.drops += 1
+            self.limit = max(self.minimum, self.limit * BACKOFF_RATIO)
+        else:
+            self.limit = min(self.maximum, max(self.minimum, self._update(rtt, in_flight)))
+        return self.capacity
+
+    def _initial(self) -> int:
+        return max(self.minimum, self.maximum // 4)
+
+    @abstractmethod
+    def _update(self, rtt: float, in_flight: int) -> float:
+        """Return the next limit after a successful call."""
+
+    def status(self) -> dict[str, Any]:
+        """Return the algorithm, current limit and its bounds."""
+        return {
+            "algorithm": self.name,
+            "limit": round(self.limit, 2),
+            "min": self.minimum,
+            "max": self.maximum,
+            "samples": self.samples,
+            "drops": self.drops,
+        }
+
+
+class AimdLimit(ConcurrencyLimit):
+    """Additive increase, multiplicative decrease, driven by failures.
+
+    Each successful call of a busy backend adds ``1 / limit``, so the limit
+    grows by about one per limit's worth of calls, and every failed call
+    cuts it by 10%. Calls running past the backend's ``timeout`` count as
+    failures, which makes that timeout the latency the limit keeps under.
+    """
+
+    name = "aimd"
+
+    def _update(self, _rtt: float, in_flight: int) -> float:
+        if in_flight * 2 >= self.limit:
+            return self.limit + 1 / self.limit
+        return self.limit
+
+
+class GradientLimit(ConcurrencyLimit):
+    """Scale the limit by the ratio of long-term to recent round-trip time.
+
+    When recent calls are slower than the long-term average, calls are
+    queueing inside the backend and the limit shrinks in proportion, by at
+    most half per call. Otherwise it grows by the square root of the limit,
+    which leaves room to notice a backend that got faster. It starts at the
+    minimum, so the long-term round trip is first learnt without queueing.
+    """
+
+    name = "gradient"
+
+    def __init__(
+        self,
+        minimum: int,
+        maximum: int,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        long_window: int = 600,
+    ) -> None:
+        """Initialize the limit.
+
+        Args:
+            minimum: Lowest limit
+            maximum: Highest limit
+            tolerance: Ratio of recent to long-term latency tolerated before shrinking
+            smoothing: Weight of each new estimate in the limit
+            long_window: Number of calls averaged in the long-term round trip
+
+        """
+        super().__init__(minimum, maximum)
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self._long_alpha = 2 / (long_window + 1)
+        self._short_alpha = 2 / (10 + 1)
+        self.long_rtt = 0.0
+        self.short_rtt = 0.0
+
+    def _initial(self) -> int:
+        return self.minimum
+
+    def _update(self, rtt: float, in_flight: int) -> float:
+        if not self.long_rtt:
+            self.long_rtt = self.short_rtt = rtt
+        self.short_rtt += (rtt - self.short_rtt) * self._short_alpha
+        self.long_rtt += (rtt - self.long_rtt) * self._long_alpha
+        # 长期延迟远高于近期时说明负载已下降,加快长期均值的回落
+        if self.long_rtt > 2 * self.short_rtt:
+            self.long_rtt *= 0.95
+        if in_flight * 2 < self.limit:
+            return self.limit
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        estimate = self.limit * gradient + math.sqrt(self.limit)
+        return self.limit * (1 - self.smoothing) + estimate * self.smoothing
+
+    def status(self) -> dict[str, Any]:
+        """Return the limit with the recent and long-term round trips."""
+        status = super().status()
+        status["short_rtt_ms"] = round(self.short_rtt * 1000, 1)
+        status["long_rtt_ms"] = round(self.long_rtt * 1000, 1)
+        return status
+
+
+LIMITS: dict[str, type[ConcurrencyLimit]] = {AimdLimit.name: AimdLimit, GradientLimit.name: GradientLimit}
+
+
+def create_limit(algorithm: str, minimum: int, maximum: int | None) -> ConcurrencyLimit:
+    """Return the limit of ``algorithm``, which is 'aimd' or 'gradient'."""
+    return LIMITS[algorithm](minimum, maximum or DEFAULT_MAX_CONCURRENCY)
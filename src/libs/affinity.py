@@ -0,0 +1,259 @@
+import asyncio
+import contextlib
+import itertools
+import logging
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+from typing import Any
+
+import anyio
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+from mcp.server.lowlevel import Server
+
+from src.libs.i18n import i18n
+
+if TYPE_CHECKING:
+    from src.libs.proxy_client import ProxyClient
+    from src.libs.supervisor import BackendSupervisor
+
+logger = logging.getLogger("mcp_server")
+
+# 当前请求所属的前端会话编号,由 track_sessions 在会话开始时设置
+_front_session: ContextVar[int | None] = ContextVar("front_session", default=None)
+_session_ids = itertools.count(1)
+
+# 上游会话断开时抛出的异常,出现后解除固定,下次调用重新建立会话
+BROKEN_SESSION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, OSError)
+
+
+class PinLimitError(ToolError):
+    """Raised when a backend already holds its maximum of pinned sessions."""
+
+    def __init__(self, name: str, limit: int) -> None:
+        """Initialize the error for backend ``name`` holding ``limit`` sessions."""
+        super().__init__(i18n.gettext("Backend '{}' already holds {} pinned sessions").format(name, limit))
+
+
+def front_session() -> int | None:
+    """Return the id of the front-end session handling the current request."""
+    return _front_session.get()
+
+
+def track_sessions(server: Server, on_end: Callable[[int], None]) -> None:
+    """Give each front-end session of ``server`` an id and report when it ends.
+
+    Every transport runs a session through ``server.run``, and request
+    handlers run in tasks started from it, so they inherit the id set here.
+    """
+    run = server.run
+
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        session = next(_session_ids)
+        token = _front_session.set(session)
+        try:
+            return await run(*args, **kwargs)
+        finally:
+            _front_session.reset(token)
+            on_end(session)
+
+    server.run = wrapper
+
+
+class _Pin:
+    """One upstream session held open for a front-end session."""
+
+    def __init__(self) -> None:
+        self.client: ProxyClient | None = None
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.error: BaseException | None = None
+        self.opened = asyncio.Event()
+        self.closing = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+
+class SessionPins:
+    """Upstream sessions of one backend, each pinned to a front-end session.
+
+    A backend keeping state per session, such as an open browser or a
+    database transaction, cannot be shared or load-balanced. Each front-end
+    session instead gets a client of its own on its first call, which for a
+    stdio backend is a process of its own, and every later call of that
+    session goes to it. The pinned session closes when the front-end session
+    ends, after ``idle_timeout`` seconds without calls, or when the gateway
+    stops. At most ``max_sessions`` are open at once, and a new front-end
+    session is refused rather than taking the session of another. A client
+    created with a supervisor is opened and closed through it, so a pinned
+    process is health-checked and restarted like the backend's own, losing
+    the session's state when it is.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        create_client: Callable[[int], Awaitable["ProxyClient"]],
+        max_sessions: int,
+        idle_timeout: float,
+        start_timeout: float,
+    ) -> None:
+        """Initialize the pins.
+
+        Args:
+            name: Backend name from ``[mcpServers.<name>]``
+            create_client: Returns a new, unopened client of the backend for a front-end session
+            max_sessions: Maximum number of pinned sessions
+            idle_timeout: Seconds without calls after which a session closes
+            start_timeout: Seconds to wait for a new session to open
+
+        """
+        self.name = name
+        self.create_client = create_client
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.start_timeout = start_timeout
+        self.opened = 0
+        self.expired = 0
+        self._pins: dict[int, _Pin] = {}
+
+    @contextlib.asynccontextmanager
+    async def session(self, fallback: "ProxyClient") -> AsyncIterator["ProxyClient"]:
+        """Enter the client pinned to the current front-end session for one call.
+
+        Outside a front-end session, such as while listing the backend's
+        catalog, the call goes to ``fallback``.
+        """
+        session = front_session()
+        if session is None:
+            async with fallback:
+                yield fallback
+            return
+        pin = await self._pin(session)
+        pin.in_flight += 1
+        try:
+            async with pin.client:
+                yield pin.client
+        except BROKEN_SESSION_ERRORS:
+            # 上游会话已断开,其中的状态已丢失,下次调用重新建立会话
+            logger.warning("Pinned session of '%s' for session %d broke", self.name, session)
+            self.release(session)
+            raise
+        finally:
+            pin.in_flight -= 1
+            pin.last_used = time.monotonic()
+
+    def release(self, session: int) -> None:
+        """Close the upstream session pinned to front-end ``session``, if any."""
+        pin = self._pins.pop(session, None)
+        if pin is not None:
+            pin.closing.set()
+
+    async def run(self) -> None:
+        """Close pinned sessions left idle for ``idle_timeout`` seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            now = time.monotonic()
+            for session, pin in list(self._pins.items()):
+                if pin.in_flight == 0 and now - pin.last_used > self.idle_timeout:
+                    logger.info("Closing idle pinned session of '%s' for session %d", self.name, session)
+                    self.expired += 1
+                    self.release(session)
+
+    async def close(self, close_timeout: float) -> None:
+        """Close every pinned session, waiting at most ``close_timeout`` seconds."""
+        tasks = [pin.task for pin in self._pins.values() if pin.task]
+        for session in list(self._pins):
+            self.release(session)
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=close_timeout)
+            for task in pending:
+                task.cancel()
+
+    def supervisors(self) -> list["BackendSupervisor"]:
+        """Return the supervisors of the open pinned sessions that have one."""
+        return [pin.client.supervisor for pin in self._pins.values() if pin.client and pin.client.supervisor]
+
+    def status(self) -> dict[str, Any]:
+        """Return the open pinned sessions, their bound and the processes they run in."""
+        return {
+            "pinned": len(self._pins),
+            "pids": sorted(pid for supervisor in self.supervisors() for pid in supervisor.pids),
+            "max": self.max_sessions,
+            "busy": sum(1 for pin in self._pins.values() if pin.in_flight),
+            "opened": self.opened,
+            "expired": self.expired,
+        }
+
+    async def _pin(self, session: int) -> _Pin:
+        """Return the pin of ``session``, opening its upstream session on first use."""
+        pin = self._pins.get(session)
+        if pin is None:
+            if len(self._pins) >= self.max_sessions:
+                raise PinLimitError(self.name, self.max_sessions)
+            # 先登记再打开,同一会话的并发调用等待同一个上游会话
+            pin = _Pin()
+            self._pins[session] = pin
+            pin.task = asyncio.create_task(self._hold(session, pin), name=f"pin:{self.name}:{session}")
+        try:
+            await asyncio.wait_for(asyncio.shield(pin.opened.wait()), self.start_timeout)
+        except TimeoutError:
+            pin.error = TimeoutError(f"Pinned session of '{self.name}' did not open within {self.start_timeout}s")
+            pin.task.cancel()
+        if pin.error is not None:
+            if self._pins.get(session) is pin:
+                self.release(session)
+            raise pin.error
+        return pin
+
+    async def _hold(self, session: int, pin: _Pin) -> None:
+        """Open the upstream session and keep it open until the pin is released.
+
+        The session is opened and closed in this task only, as its transport
+        requires, and calls enter the already open client.
+        """
+        try:
+            pin.client = await self.create_client(session)
+            await self._open(pin.client)
+        except Exception as e:
+            logger.exception("Failed to open a pinned session of '%s'", self.name)
+            pin.error = e
+            pin.opened.set()
+            return
+        self.opened += 1
+        logger.info("Pinned a session of '%s' to session %d", self.name, session)
+        pin.opened.set()
+        try:
+            await pin.closing.wait()
+        finally:
+            try:
+                await self._close(pin.client)
+            except Exception:  # noqa: BLE001
+                logger.debug("Error closing pinned session of '%s'", self.name, exc_info=True)
+            logger.info("Closed the pinned session of '%s' for session %d", self.name, session)
+
+    async def _open(self, client: "ProxyClient") -> None:
+        """Open the upstream session of ``client``, through its supervisor when it has one."""
+        if client.supervisor is None:
+            await Client.__aenter__(client)
+            return
+        started = False
+        try:
+            started = await client.supervisor.start(self.start_timeout)
+        finally:
+            # 启动超时或被取消时同样停止监控,不留下孤儿进程
+            if not started:
+                await client.supervisor.stop(self.start_timeout)
+        if not started:
+            msg = f"Pinned session of '{self.name}' did not open within {self.start_timeout}s"
+            raise TimeoutError(msg)
+
+    async def _close(self, client: "ProxyClient") -> None:
+        """Close the upstream session of ``client``."""
+        if client.supervisor is None:
+            await Client.__aexit__(client, None, None, None)
+        else:
+            await client.supervisor.stop(self.start_timeout)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import Any
+
+from mcp.shared.exceptions import McpError
+from mcp.types import CallToolRequest
+from mcp.types import CallToolRequestParams
+from pydantic import BaseModel
+from pydantic import Field
+
+from src.libs.i18n import i18n
+from src.libs.request_context import report_progress
+
+BATCH_TOOL = "batch_call"
+
+
+class BatchCall(BaseModel):
+    """One tool call of a batch."""
+
+    tool: str = Field(description="Prefixed name of the tool to call")
+    arguments: dict[str, Any] = Field(default_factory=dict, description="Arguments of the call")
+    timeout: float | None = Field(default=None, description="Seconds before this call is abandoned")
+
+
+class BatchRunner:
+    """Run the calls of a batch concurrently through the regular tools/call handler.
+
+    Every call goes through the same validation, rate limits, scheduling and
+    routing as a standalone request, each with its own timeout. When the
+    client sends a progress token, every finished call is also sent at once
+    as a progress notification whose message is the call's JSON result.
+    """
+
+    def __init__(
+        self,
+        call_tool: Callable[[CallToolRequest], Awaitable[Any]],
+        max_calls: int,
+        timeout: float,
+    ) -> None:
+        """Initialize the runner.
+
+        Args:
+            call_tool: The wrapped lowlevel tools/call handler
+            max_calls: Maximum number of calls in one batch
+            timeout: Default per-call timeout in seconds
+
+        """
+        self.call_tool = call_tool
+        self.max_calls = max_calls
+        self.timeout = timeout
+
+    async def run(self, calls: list[BatchCall], ordered: bool = True) -> list[dict[str, Any]]:  # noqa: FBT001, FBT002
+        """Call several tools concurrently, across any backends, in one request.
+
+        Returns one entry per call with its index, tool, content and error.
+        Entries follow the order of ``calls``, or the order in which calls
+        finished when ``ordered`` is false.
+        """
+        if len(calls) > self.max_calls:
+            msg = i18n.gettext("A batch holds at most {} calls, got {}").format(self.max_calls, len(calls))
+            raise ValueError(msg)
+
+        tasks = [asyncio.ensure_future(self._call(index, call)) for index, call in enumerate(calls)]
+        finished = []
+        try:
+            for future in asyncio.as_completed(tasks):
+                item = await future
+                finished.append(item)
+                await report_progress(len(finished), len(calls), json.dumps(item, ensure_ascii=False))
+        finally:
+            for task in tasks:
+                task.cancel()
+        if ordered:
+            finished.sort(key=lambda item: item["index"])
+        return finished
+
+    async def _call(self, index: int, call: BatchCall) -> dict[str, Any]:
+        item: dict[str, Any] = {"index": index, "tool": call.tool, "content": [], "error": None}
+        if call.tool == BATCH_TOOL:
+            item["error"] = i18n.gettext("Batches cannot be nested")
+            return item
+        request = CallToolRequest(
+            method="tools/call",
+            params=CallToolRequestParams(name=call.tool, arguments=call.arguments),
+        )
+        timeout = call.timeout if call.timeout is not None else self.timeout
+        try:
+            result = (await asyncio.wait_for(self.call_tool(request), timeout)).root
+        except TimeoutError:
+            item["error"] = i18n.gettext("Timed out after {}s").format(timeout)
+            return item
+        except McpError as e:
+            item["error"] = e.error.message
+            return item
+        except Exception as e:  # noqa: BLE001
+            item["error"] = str(e)
+            return item
+        item["content"] = [content.model_dump(mode="json", exclude_none=True) for content in result.content]
+        if result.isError:
+            item["error"] = next((content.text for content in result.content if content.type == "text"), "error")
+        return item
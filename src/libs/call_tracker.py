@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+from fastmcp.exceptions import ToolError
+
+from src.libs.i18n import i18n
+
+logger = logging.getLogger("mcp_server")
+
+
+class ServerDrainingError(ToolError):
+    """Raised when a new upstream call arrives while the server is draining."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize the error for backend ``name``."""
+        super().__init__(i18n.gettext("Server is shutting down, rejected new call to '{}'").format(name))
+        self.name = name
+
+
+class CallTracker:
+    """Track in-flight upstream calls per backend.
+
+    Calls are keyed by the asyncio task that issued them, so nested
+    ``async with client`` blocks inside one call are counted once.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the tracker."""
+        self.draining: bool = False
+        self._calls: dict[str, dict[asyncio.Task, int]] = defaultdict(dict)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def enter(self, name: str) -> None:
+        """Register a call to backend ``name`` issued by the current task."""
+        if self.draining:
+            raise ServerDrainingError(name)
+        task = asyncio.current_task()
+        calls = self._calls[name]
+        calls[task] = calls.get(task, 0) + 1
+        self._idle.clear()
+
+    def exit(self, name: str) -> None:
+        """Unregister a call to backend ``name`` issued by the current task."""
+        task = asyncio.current_task()
+        calls = self._calls.get(name)
+        if not calls or task not in calls:
+            return
+        calls[task] -= 1
+        if calls[task] <= 0:
+            del calls[task]
+        if not calls:
+            del self._calls[name]
+        if not self._calls:
+            self._idle.set()
+
+    def in_flight(self) -> dict[str, int]:
+        """Return the number of in-flight calls for each backend."""
+        return {name: len(calls) for name, calls in self._calls.items()}
+
+    def tasks(self, name: str) -> list[asyncio.Task]:
+        """Return the tasks currently calling backend ``name``."""
+        return list(self._calls.get(name, {}))
+
+    async def drain(self, deadline: float) -> bool:
+        """Stop accepting new calls and wait for in-flight calls to finish.
+
+        Args:
+            deadline: Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if every call finished before the deadline.
+
+        """
+        self.draining = True
+        if self._idle.is_set():
+            return True
+        logger.info("Draining %d in-flight call(s): %s", sum(self.in_flight().values()), self.in_flight())
+        try:
+            await asyncio.wait_for(self._idle.wait(), deadline)
+        except TimeoutError:
+            logger.warning("Drain deadline of %.1fs exceeded, in-flight calls: %s", deadline, self.in_flight())
+            return False
+        return True
@@ -0,0 +1,237 @@
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+
+from starlette.datastructures import Headers
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 各算法未配置压缩级别时使用的默认级别
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+# 各算法支持的最高压缩级别
+MAX_LEVELS = {"zstd": 22, "br": 11, "gzip": 9}
+# 只缓存不超过该大小的响应体
+MAX_CACHED_BODY = 1024 * 1024
+
+
+def available_encodings() -> list[str]:
+    """Return the supported content codings, most preferred first."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str, encodings: list[str]) -> str | None:
+    """Pick the server-preferred coding among those the client accepts.
+
+    Codings with ``q=0`` are refused, and ``*`` accepts any coding not
+    listed explicitly.
+    """
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(encoding: str, body: bytes, level: int) -> bytes:
+    """Compress a whole body with ``encoding``."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    # mtime 固定为 0,相同的输入得到相同的输出,便于缓存
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk.
+
+    Each chunk of a streamed response, e.g. an SSE event, is decodable as
+    soon as it arrives instead of waiting for the compressor's buffer.
+    """
+
+    def __init__(self, encoding: str, level: int) -> None:
+        """Initialize the compressor."""
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress ``data`` and flush it."""
+        if self.encoding == "zstd":
+            return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Terminate the compressed stream."""
+        if self.encoding == "zstd":
+            return self._compressor.flush()
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """Compress HTTP responses with the best coding the client accepts.
+
+    Complete bodies below ``min_size`` are sent as is, and compressed bodies
+    are kept in a small LRU cache keyed by content digest, so repeated
+    payloads are compressed once. Streamed responses such as SSE are
+    compressed chunk by chunk. Paths starting with an entry of ``exclude``
+    are never compressed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_size: int = 1024,
+        level: int | None = None,
+        exclude: list[str] | None = None,
+        cache_size: int = 128,
+    ) -> None:
+        """Initialize the middleware."""
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.exclude = tuple(exclude or ())
+        self.cache_size = cache_size
+        self.encodings = available_encodings()
+        self._cache: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle one ASGI connection."""
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude):
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressedResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compress_body(self, encoding: str, body: bytes) -> bytes:
+        """Compress a complete body, reusing the cached result for a repeated payload."""
+        level = self.level_for(encoding)
+        if self.cache_size <= 0 or len(body) > MAX_CACHED_BODY:
+            return compress(encoding, body, level)
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        compressed = self._cache[key] = compress(encoding, body, level)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return compressed
+
+    def level_for(self, encoding: str) -> int:
+        """Return the configured level capped to what ``encoding`` supports, or its default level."""
+        if self.level is None:
+            return DEFAULT_LEVELS[encoding]
+        return min(self.level, MAX_LEVELS[encoding])
+
+
+class _CompressedResponder:
+    """Rewrite the messages of one response."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start: Message | None = None
+        self.stream: StreamCompressor | None = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self.downstream(message)
+        elif message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message.get("headers", []))
+            content_length = headers.get("content-length")
+            # 已编码或明确小于阈值的响应原样发送
+            if "content-encoding" in headers or (
+                content_length is not None and int(content_length) < self.middleware.min_size
+            ):
+                await self._pass()
+        elif message["type"] == "http.response.body":
+            await self._body(message)
+        else:
+            await self.downstream(message)
+
+    async def _body(self, message: Message) -> None:
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if self.stream is None:
+            if not more_body:
+                # 完整的响应体,按阈值决定是否压缩
+                if len(body) < self.middleware.min_size:
+                    await self._pass()
+                    await self.downstream(message)
+                    return
+                compressed = self.middleware.compress_body(self.encoding, body)
+                await self._start(content_length=len(compressed))
+                await self.downstream({"type": "http.response.body", "body": compressed})
+                return
+            self.stream = StreamCompressor(self.encoding, self.middleware.level_for(self.encoding))
+            await self._start(content_length=None)
+
+        data = self.stream.compress(body) if body else b""
+        if not more_body:
+            data += self.stream.finish()
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _start(self, content_length: int | None) -> None:
+        self.start["headers"] = list(self.start.get("headers", []))
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        await self.downstream(self.start)
+
+    async def _pass(self) -> None:
+        self.passthrough = True
+        await self.downstream(self.start)
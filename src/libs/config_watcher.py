@@ -0,0 +1,196 @@
+"""基于事件循环的配置文件监控.
+
+Linux 上通过 inotify 只监听配置文件本身,其它平台或 inotify 不可用时退化为轮询。
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from collections.abc import Awaitable
+from collections.abc import Callable
+from pathlib import Path
+
+logger = logging.getLogger("mcp_server")
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+# 文件被替换或删除后,原 inode 上的 watch 失效,需要重新监听新文件
+REARM_MASK = IN_MOVE_SELF | IN_DELETE_SELF | IN_IGNORED
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify() -> ctypes.CDLL | None:
+    """加载 libc 中的 inotify 接口,不可用时返回 None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class ConfigWatcher:
+    """监控单个配置文件,变化时以尾沿防抖的方式触发回调.
+
+    正在执行的回调不会被并发触发:执行期间到达的变化会合并为一次后续执行。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        callback: Callable[[], Awaitable[None] | None],
+        debounce: float = 0.5,
+        poll_interval: float = 1.0,
+    ) -> None:
+        """初始化ConfigWatcher.
+
+        Args:
+            path: 配置文件路径
+            callback: 文件变化后调用的回调,可以是协程函数
+            debounce: 最后一次变化之后等待的秒数
+            poll_interval: 轮询模式的检查间隔,以及 inotify 重新监听的重试间隔
+
+        """
+        self.path = path
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._libc = _load_inotify()
+        self._fd: int | None = None
+        self._wd: int | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._poll_task: asyncio.Task | None = None
+        self._run_task: asyncio.Task | None = None
+        self._pending = False
+
+    @property
+    def mode(self) -> str:
+        """当前的监控方式: inotify 或 polling."""
+        return "inotify" if self._fd is not None else "polling"
+
+    async def start(self) -> None:
+        """开始监控."""
+        self._loop = asyncio.get_running_loop()
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                self._loop.add_reader(fd, self._on_readable)
+                self._arm()
+        if self._fd is None:
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """停止监控并等待正在执行的回调结束."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+            self._wd = None
+        if self._poll_task:
+            self._poll_task.cancel()
+            self._poll_task = None
+        self._pending = False
+        if self._run_task:
+            await asyncio.gather(self._run_task, return_exceptions=True)
+
+    def _arm(self) -> bool:
+        """在当前路径上(重新)添加 inotify watch."""
+        if self._wd is not None:
+            self._libc.inotify_rm_watch(self._fd, self._wd)
+            self._wd = None
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(self.path), WATCH_MASK)
+        if wd < 0:
+            return False
+        self._wd = wd
+        return True
+
+    def _rearm(self) -> None:
+        """文件被原子替换时,新文件可能稍后才出现,失败则稍后重试."""
+        if self._fd is None:
+            return
+        if self._arm():
+            self._schedule()
+        else:
+            self._loop.call_later(self.poll_interval, self._rearm)
+
+    def _on_readable(self) -> None:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        changed = rearm = False
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size + name_len
+            if wd != self._wd:
+                continue
+            changed = True
+            rearm = rearm or bool(mask & REARM_MASK)
+        if rearm:
+            self._rearm()
+        elif changed:
+            self._schedule()
+
+    async def _poll(self) -> None:
+        last = self._stat()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = self._stat()
+            if current != last:
+                last = current
+                self._schedule()
+
+    def _stat(self) -> tuple[int, int, int] | None:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _schedule(self) -> None:
+        """尾沿防抖:每次变化都会把触发时间推迟到 debounce 秒之后."""
+        if self._timer:
+            self._timer.cancel()
+        self._timer = self._loop.call_later(self.debounce, self._fire)
+
+    def _fire(self) -> None:
+        self._timer = None
+        if self._run_task and not self._run_task.done():
+            self._pending = True
+            return
+        self._run_task = asyncio.create_task(self._run_callback())
+
+    async def _run_callback(self) -> None:
+        while True:
+            self._pending = False
+            logger.info("Config file changed, scheduling reload...")
+            try:
+                result = self.callback()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception("Config reload callback failed")
+            if not self._pending:
+                return
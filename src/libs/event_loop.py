@@ -0,0 +1,33 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger("mcp_server")
+
+
+def loop_factory(name: str) -> Callable[[], asyncio.AbstractEventLoop] | None:
+    """Return the factory of event loop ``name`` for ``asyncio.run``, or None for asyncio's own loop.
+
+    uvloop is optional. When it is not installed the gateway runs on asyncio
+    and says so, rather than refusing to start.
+    """
+    if name != "uvloop":
+        return None
+    if uvloop is None:
+        logger.warning("uvloop is not installed, running on the asyncio event loop")
+        return None
+    return uvloop.new_event_loop
+
+
+def configure_loop(executor_workers: int | None) -> None:
+    """Size the running loop's default executor, which runs DNS lookups and ``asyncio.to_thread``."""
+    loop = asyncio.get_running_loop()
+    if executor_workers:
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="moonshot"))
+    logger.info("Running on %s.%s", type(loop).__module__, type(loop).__name__)
@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+
+import uvicorn
+
+logger = logging.getLogger("mcp_server")
+
+# 新进程通过这两个环境变量得知继承的监听套接字与需要退出的旧进程
+LISTEN_FD_ENV = "MOONSHOT_LISTEN_FD"
+HANDOFF_PID_ENV = "MOONSHOT_HANDOFF_PID"
+# 检查新进程是否提前退出的间隔秒数
+SUCCESSOR_POLL_INTERVAL = 1.0
+
+
+def listening_socket(config: uvicorn.Config) -> socket.socket:
+    """Return the socket to serve on, inherited from the previous process when it listens on the configured address.
+
+    Otherwise a new socket is bound, as uvicorn would.
+    """
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd is not None:
+        sock = socket.socket(fileno=int(fd))
+        if _listens_on(sock, config.host, config.port):
+            logger.info("Serving on the inherited socket %s", sock.getsockname())
+            return sock
+        # 地址已变更,关闭本进程中继承的副本,旧进程仍持有原套接字直到退出
+        logger.info("Address changed to %s:%s, binding a new socket", config.host, config.port)
+        sock.close()
+    return config.bind_socket()
+
+
+def _listens_on(sock: socket.socket, host: str, port: int) -> bool:
+    """Return True if ``sock`` is bound to ``host`` and ``port``."""
+    try:
+        addresses = {info[4][:2] for info in socket.getaddrinfo(host, port, sock.family, socket.SOCK_STREAM)}
+    except OSError:
+        return False
+    return sock.getsockname()[:2] in addresses
+
+
+class Handoff:
+    """Restart the gateway in a new process without closing its listening socket.
+
+    ``start`` runs the same command line again with the socket inherited.
+    Both processes accept connections on it while the new one starts its
+    backends, and once it serves it sends SIGTERM to this process, which
+    then drains its calls and exits as on any shutdown. If the new process
+    fails first, this one keeps serving. Sessions live in the process that
+    created them, so clients re-initialize after the old process exits.
+    """
+
+    def __init__(self, sock: socket.socket) -> None:
+        """Initialize the handoff of listening socket ``sock``."""
+        self.sock = sock
+        self._successor: subprocess.Popen | None = None
+        self._watch_task: asyncio.Task | None = None
+
+    async def start(self) -> bool:
+        """Start the new process.
+
+        Returns:
+            bool: False if a new process is already starting.
+
+        """
+        if self._successor is not None and self._successor.poll() is None:
+            logger.warning("A restart is already in progress (pid %s)", self._successor.pid)
+            return False
+        fd = self.sock.fileno()
+        env = {**os.environ, LISTEN_FD_ENV: str(fd), HANDOFF_PID_ENV: str(os.getpid())}
+        # 新进程使用独立的进程组,旧进程退出或收到 Ctrl+C 时不受影响.
+        # 不用 asyncio 的子进程:事件循环关闭时会杀掉仍在运行的子进程,新进程会随旧进程一起退出
+        self._successor = subprocess.Popen(  # noqa: S603, ASYNC220
+            [sys.executable, *sys.orig_argv[1:]],
+            pass_fds=(fd,),
+            env=env,
+            start_new_session=True,
+        )
+        logger.info("Started pid %s to take over %s", self._successor.pid, self.sock.getsockname())
+        self._watch_task = asyncio.create_task(self._watch(self._successor))
+        return True
+
+    @staticmethod
+    def notify_ready() -> None:
+        """Tell the process this one took over from to drain and exit.
+
+        Called once this process serves. Only the parent that started it is
+        signalled, so a stale environment cannot stop an unrelated process.
+        """
+        pid = os.environ.pop(HANDOFF_PID_ENV, None)
+        if pid is None or os.getppid() != int(pid):
+            return
+        logger.info("Took over from pid %s, asking it to drain", pid)
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(int(pid), signal.SIGTERM)
+
+    async def _watch(self, process: subprocess.Popen) -> None:
+        """Log the new process exiting before it took over."""
+        while (code := process.poll()) is None:  # noqa: ASYNC110
+            await asyncio.sleep(SUCCESSOR_POLL_INTERVAL)
+        logger.error("Restarted process %s exited with code %s, this process keeps serving", process.pid, code)
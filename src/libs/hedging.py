@@ -0,0 +1,156 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import Any
+from typing import TypeVar
+
+T = TypeVar("T")
+C = TypeVar("C")
+
+# 每个工具保留的最近延迟样本数
+WINDOW_SIZE = 256
+# 样本数不足时不做对冲
+MIN_SAMPLES = 20
+# 每新增该数量的样本重新计算一次百分位
+RECOMPUTE_EVERY = 16
+# 对冲预算最多累积的请求数
+MAX_BUDGET = 10.0
+
+
+class LatencyWindow:
+    """Recent latencies of one tool, with a lazily recomputed percentile."""
+
+    def __init__(self, percentile: float) -> None:
+        """Initialize an empty window tracking ``percentile`` (0-100)."""
+        self.percentile = percentile
+        self.samples: deque[float] = deque(maxlen=WINDOW_SIZE)
+        self._threshold: float | None = None
+        self._since_recompute = 0
+
+    def record(self, latency: float) -> None:
+        """Add one latency sample, in seconds."""
+        self.samples.append(latency)
+        self._since_recompute += 1
+
+    def threshold(self) -> float | None:
+        """Return the tracked percentile, or None until there are enough samples."""
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        if self._threshold is None or self._since_recompute >= RECOMPUTE_EVERY:
+            ordered = sorted(self.samples)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            self._threshold = ordered[index]
+            self._since_recompute = 0
+        return self._threshold
+
+
+class Hedger:
+    """Send a second attempt of a slow idempotent call to another replica.
+
+    When the first attempt has not answered within the configured percentile
+    of the tool's recent latency, the call is repeated on a different
+    replica. The first successful response wins and the other attempt is
+    cancelled. Every call earns ``budget`` of a hedge, so hedges never add
+    more than that fraction of extra load.
+    """
+
+    def __init__(self, name: str, tools: list[str], percentile: float, budget: float) -> None:
+        """Initialize the hedger.
+
+        Args:
+            name: Backend name, used in status output
+            tools: Tool names safe to send twice, ``"*"`` for every tool
+            percentile: Latency percentile after which a call is hedged
+            budget: Maximum ratio of hedged calls to calls
+
+        """
+        self.name = name
+        self.tools = set(tools)
+        self.percentile = percentile
+        self.budget = budget
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._tokens = 0.0
+        self._windows: dict[str, LatencyWindow] = {}
+        self._next = itertools.count()
+
+    def applies(self, tool: str) -> bool:
+        """Return True if calls to ``tool`` may be hedged."""
+        return "*" in self.tools or tool in self.tools
+
+    async def call(self, tool: str, replicas: list[C], attempt: Callable[[C], Awaitable[T]]) -> T:
+        """Call ``tool`` on one of ``replicas``, hedging on another if it is slow."""
+        self.calls += 1
+        self._tokens = min(MAX_BUDGET, self._tokens + self.budget)
+        window = self._windows.get(tool)
+        if window is None:
+            window = self._windows[tool] = LatencyWindow(self.percentile)
+
+        # 轮询选择首个副本,对冲请求发往下一个副本
+        start = next(self._next) % len(replicas)
+        primary, secondary = replicas[start], replicas[(start + 1) % len(replicas)]
+        first = asyncio.ensure_future(self._timed(window, attempt(primary)))
+        delay = window.threshold()
+        try:
+            if delay is None or primary is secondary:
+                return await first
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done or self._tokens < 1:
+                return await first
+
+            self._tokens -= 1
+            self.hedged += 1
+            # 只记录首个请求的延迟,对冲请求在首个请求之后才发出,胜出时的延迟偏短
+            second = asyncio.ensure_future(attempt(secondary))
+            try:
+                result, winner = await self._first_success(first, second)
+            finally:
+                second.cancel()
+            if winner is second:
+                self.hedge_wins += 1
+            return result
+        finally:
+            first.cancel()
+
+    def status(self) -> dict[str, Any]:
+        """Return hedging counters of this backend."""
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+            "thresholds": {tool: window.threshold() for tool, window in self._windows.items()},
+        }
+
+    @staticmethod
+    async def _timed(window: LatencyWindow, call: Awaitable[T]) -> T:
+        """Await ``call`` and record its latency in ``window``.
+
+        An attempt cancelled because the hedge answered first records the
+        time it had run, a lower bound of its latency, so the slow calls that
+        trigger hedges keep counting toward the percentile.
+        """
+        started = time.monotonic()
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            window.record(time.monotonic() - started)
+            raise
+        window.record(time.monotonic() - started)
+        return result
+
+    @staticmethod
+    async def _first_success(first: asyncio.Future, second: asyncio.Future) -> tuple[Any, asyncio.Future]:
+        """Return the first successful result, or raise the first attempt's error if both fail."""
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if not future.cancelled() and future.exception() is None:
+                    return future.result(), future
+        return first.result(), first
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import socket
+from collections.abc import Awaitable
+from collections.abc import Callable
+from types import FrameType
+
+import uvicorn
+
+logger = logging.getLogger("mcp_server")
+
+
+class GracefulServer(uvicorn.Server):
+    """Uvicorn server that drains in-flight calls before shutting down.
+
+    On the first SIGTERM/SIGINT the listening sockets are closed and
+    ``on_drain`` is awaited; only then is the regular uvicorn shutdown
+    started. A second signal falls back to uvicorn's default behaviour.
+    ``on_started`` is called once the server accepts connections.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        on_drain: Callable[[], Awaitable[None]],
+        on_started: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize the server."""
+        super().__init__(config)
+        self._on_drain = on_drain
+        self._on_started = on_started
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._drain_task: asyncio.Task | None = None
+
+    async def serve(self, sockets: list[socket.socket] | None = None) -> None:
+        self._loop = asyncio.get_running_loop()
+        await super().serve(sockets)
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().startup(sockets)
+        if self.started and self._on_started:
+            self._on_started()
+
+    def handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        if self._loop is None or self._drain_task is not None or self.should_exit:
+            super().handle_exit(sig, frame)
+            return
+        self._captured_signals.append(sig)
+        self._loop.call_soon_threadsafe(self._start_drain)
+
+    def _start_drain(self) -> None:
+        self._drain_task = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        # 先停止接收新连接,再等待已有调用完成
+        for server in self.servers:
+            server.close()
+        # 立即关闭空闲的长连接,进行中的请求应答后也关闭连接,客户端的后续请求改由新连接发给接管的进程
+        for connection in list(self.server_state.connections):
+            connection.shutdown()
+        try:
+            await self._on_drain()
+        except Exception:
+            logger.exception("Drain failed, shutting down immediately")
+        finally:
+            self.should_exit = True
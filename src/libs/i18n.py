@@ -1,6 +1,16 @@
-"""国际化模块."""
+"""国际化模块.
+
+进程默认语言由 ``I18n.change_language`` 设置;单个请求可以通过 ``use_language``
+在当前上下文中临时切换语言,不同请求之间互不影响。
+"""
 
 import gettext
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
 from pathlib import Path
 from typing import ClassVar
 from typing import Optional
@@ -9,10 +19,17 @@ from src.settings import get_settings
 
 settings = get_settings()
 
+LOCALE_DIR = Path(__file__).parent.parent / "locale"
+# 最多缓存的语言目录数量
+MAX_CATALOGS = 8
+
+# 当前请求使用的翻译函数,为 None 时使用进程默认语言
+_current_gettext: ContextVar[Callable[[str], str] | None] = ContextVar("i18n_gettext", default=None)
+
 
 class I18n:
     _instance: Optional["I18n"] = None
-    _translations: ClassVar[dict[str, gettext.NullTranslations]] = {}
+    _translations: ClassVar[OrderedDict[str, gettext.NullTranslations]] = OrderedDict()
 
     def __new__(cls, language: str = "zh_CN") -> "I18n":  # noqa: ARG004
         if cls._instance is None:
@@ -29,40 +46,48 @@ class I18n:
         if not hasattr(self, "language"):
             self.language = language
             self._ = None
+            # 预加载所有可用语言,请求处理时不再读取翻译文件
+            for available in available_languages()[:MAX_CATALOGS]:
+                self.get_translation(available)
             self.load_translations()
 
-    def load_translations(self) -> None:
-        """加载翻译."""
+    @classmethod
+    def get_translation(cls, language: str) -> gettext.NullTranslations:
+        """获取语言的翻译目录,超过缓存上限时淘汰最久未使用的语言.
+
+        Args:
+            language (str): 语言代码
+
+        Returns:
+            gettext.NullTranslations: 翻译目录,找不到时返回空翻译
+
+        """
+        translations = cls._translations.get(language)
+        if translations is not None:
+            cls._translations.move_to_end(language)
+            return translations
         try:
-            # 获取项目根目录
-            root_dir = Path(__file__).parent.parent
-            locale_dir = root_dir / "locale"
-            # 确保翻译目录存在
-            if not Path.exists(locale_dir):
-                msg = f"翻译目录不存在: {locale_dir}"
-                raise FileNotFoundError(msg)  # noqa: TRY301
-            # 如果该语言的翻译已加载,直接使用缓存
-            if self.language in self._translations:
-                self.translations = self._translations[self.language]
-            else:
-                self.translations = gettext.translation(
-                    "messages",
-                    locale_dir,
-                    languages=[self.language],
-                    fallback=True,
-                )
-                self._translations[self.language] = self.translations
-
-            self.translations.install()
-            self._ = self.translations.gettext
-
-        except (FileNotFoundError, OSError, gettext.NullTranslationsError):
+            translations = gettext.translation(
+                "messages",
+                LOCALE_DIR,
+                languages=[language],
+                fallback=True,
+            )
+        except OSError:
             # 使用空翻译作为后备方案
-            self.translations = gettext.NullTranslations()
-            self._ = self.translations.gettext
+            translations = gettext.NullTranslations()
+        cls._translations[language] = translations
+        if len(cls._translations) > MAX_CATALOGS:
+            cls._translations.popitem(last=False)
+        return translations
+
+    def load_translations(self) -> None:
+        """加载进程默认语言的翻译."""
+        self.translations = self.get_translation(self.language)
+        self._ = self.translations.gettext
 
     def gettext(self, message: str) -> str:
-        """获取翻译.
+        """获取翻译,优先使用当前请求的语言.
 
         Args:
             message (str): 消息
@@ -71,13 +96,31 @@ class I18n:
             str: 翻译后的文本
 
         """
-        if self._ is None:
+        translate = _current_gettext.get() or self._
+        if translate is None:
             return message
-        return self._(message)
+        return translate(message)
+
+    @contextmanager
+    def use_language(self, language: str | None) -> Iterator[None]:
+        """在当前上下文中临时使用指定语言,language 为 None 时使用默认语言.
+
+        Args:
+            language (str | None): 语言代码
+
+        """
+        if language is None:
+            yield
+            return
+        token = _current_gettext.set(self.get_translation(language).gettext)
+        try:
+            yield
+        finally:
+            _current_gettext.reset(token)
 
     @classmethod
     def change_language(cls, language: str) -> None:
-        """切换语言.
+        """切换进程默认语言.
 
         Args:
             language (str): 新的语言代码
@@ -88,5 +131,56 @@ class I18n:
             cls._instance.load_translations()
 
 
+@lru_cache(maxsize=1)
+def available_languages() -> tuple[str, ...]:
+    """返回 locale 目录下已编译翻译的语言代码."""
+    if not LOCALE_DIR.exists():
+        return ()
+    return tuple(sorted(mo.parent.parent.name for mo in LOCALE_DIR.glob("*/LC_MESSAGES/messages.mo")))
+
+
+@lru_cache(maxsize=256)
+def negotiate_language(accept_language: str | None) -> str | None:
+    """根据 Accept-Language 选择最合适的可用语言.
+
+    支持 q 权重,``zh-CN`` 与 ``zh_CN`` 等价;没有完全匹配时按主语言匹配,
+    例如 ``en`` 匹配 ``en_US``。结果按请求头缓存,重复的请求头只解析一次。
+
+    Args:
+        accept_language (str | None): Accept-Language 请求头或语言代码
+
+    Returns:
+        str | None: 语言代码,没有可用语言时返回 None
+
+    """
+    if not accept_language:
+        return None
+    languages = available_languages()
+    by_lower = {lang.lower(): lang for lang in languages}
+
+    candidates: list[tuple[float, str]] = []
+    for part in accept_language.split(","):
+        tag, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if tag and tag != "*" and quality > 0:
+            candidates.append((quality, tag.replace("-", "_").lower()))
+    # 稳定排序,同权重时保持请求头中的顺序
+    candidates.sort(key=lambda item: item[0], reverse=True)
+
+    for _, tag in candidates:
+        if tag in by_lower:
+            return by_lower[tag]
+        primary = tag.split("_")[0]
+        for lang in languages:
+            if lang.lower().split("_")[0] == primary:
+                return lang
+    return None
+
+
 # 初始化国际化类
 i18n = I18n(settings.lang)
@@ -0,0 +1,53 @@
+from typing import Any
+from typing import TypeVar
+
+from pydantic import BaseModel
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# 使用 msgspec 而不是 orjson: orjson 将超过 64 位的整数解析为浮点数,
+# 写出的浮点数如 1e+16 也与 pydantic 的 1e16 不同,无法逐字节一致
+
+
+def codec() -> str:
+    """Return the library parsing and writing relayed JSON."""
+    return "msgspec" if msgspec is not None else "pydantic"
+
+
+def dump_model(model: BaseModel, **kwargs: Any) -> bytes:  # noqa: ANN401
+    """Serialize ``model`` to JSON bytes, as ``model.model_dump_json(**kwargs).encode()`` does.
+
+    With msgspec installed, the model is dumped to JSON-compatible Python
+    objects and encoded by msgspec, which writes the same bytes as pydantic:
+    compact separators, UTF-8 rather than escapes, and the same float
+    notation. A value msgspec cannot encode falls back to pydantic.
+    """
+    if msgspec is not None:
+        try:
+            return msgspec.json.encode(model.model_dump(mode="json", **kwargs))
+        except (msgspec.EncodeError, TypeError, OverflowError):
+            pass
+    return model.model_dump_json(**kwargs).encode()
+
+
+def load_model(model_type: type[ModelT], data: bytes | str) -> ModelT:
+    """Parse JSON ``data`` into ``model_type``, as ``model_type.model_validate_json(data)`` does.
+
+    With msgspec installed, msgspec parses and pydantic validates the
+    resulting objects, which for unions such as ``JSONRPCMessage`` is much
+    cheaper than validating from JSON. Input msgspec rejects, such as NaN
+    literals or invalid UTF-8, is left to pydantic, so errors are the same.
+    """
+    if msgspec is not None:
+        try:
+            obj = msgspec.json.decode(data)
+        except msgspec.DecodeError:
+            pass
+        else:
+            return model_type.model_validate(obj)
+    return model_type.model_validate_json(data)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any
+
+logger = logging.getLogger("mcp_server")
+
+# 保留的最近阻塞记录数
+RECENT_STALLS = 20
+# 记录阻塞现场时保留的栈帧数
+STACK_DEPTH = 12
+
+
+class LoopMonitor:
+    """Measure how late the event loop runs its callbacks and catch what blocks it.
+
+    A probe sleeps ``interval`` seconds in a loop, and the difference between
+    when it asked to wake up and when it did is the loop's lag. While the
+    probe is overdue by more than ``threshold``, a watchdog thread captures
+    the stack of the loop's thread and the task it is running, which is
+    the code blocking the loop. Once the loop is back, the stall is logged
+    with that stack and kept for the status endpoint.
+    """
+
+    def __init__(self, interval: float, threshold: float) -> None:
+        """Initialize the monitor.
+
+        Args:
+            interval: Seconds between probes
+            threshold: Lag in seconds above which a stall is logged
+
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.recent: deque[dict[str, Any]] = deque(maxlen=RECENT_STALLS)
+        self._expected = 0.0
+        self._culprit: dict[str, Any] | None = None
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        """Probe the loop until cancelled."""
+        loop = asyncio.get_running_loop()
+        watchdog = threading.Thread(
+            target=self._watch,
+            args=(loop, threading.get_ident()),
+            name="loop-watchdog",
+            daemon=True,
+        )
+        self._expected = time.monotonic() + self.interval
+        watchdog.start()
+        try:
+            while True:
+                self._expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                self.lag = max(0.0, time.monotonic() - self._expected)
+                self.max_lag = max(self.max_lag, self.lag)
+                if self.lag > self.threshold:
+                    self._record_stall()
+                self._culprit = None
+        finally:
+            self._stop.set()
+
+    def status(self) -> dict[str, Any]:
+        """Return the current and maximum lag and the recent stalls."""
+        return {
+            "lag_ms": round(self.lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": self.stalls,
+            "recent_stalls": list(self.recent),
+        }
+
+    def _record_stall(self) -> None:
+        self.stalls += 1
+        culprit = self._culprit or {"task": None, "stack": []}
+        stall = {"at": time.time(), "lag_ms": round(self.lag * 1000, 1), **culprit}
+        self.recent.append(stall)
+        logger.warning(
+            "Event loop blocked for %.0fms by task %s:\n%s",
+            self.lag * 1000,
+            culprit["task"],
+            "\n".join(culprit["stack"]) or "  (stack not captured)",
+        )
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, thread_id: int) -> None:
+        """Capture the loop thread's stack while the probe is overdue, from a thread of its own."""
+        poll = max(0.01, self.threshold / 4)
+        while not self._stop.wait(poll):
+            if self._culprit is not None or time.monotonic() - self._expected <= self.threshold:
+                continue
+            frame = sys._current_frames().get(thread_id)  # noqa: SLF001
+            if frame is None:
+                continue
+            task = asyncio.current_task(loop)
+            stack = traceback.format_stack(frame, limit=STACK_DEPTH)
+            self._culprit = {
+                "task": task.get_name() if task else None,
+                "coroutine": task.get_coro().__qualname__ if task else None,
+                "stack": [line.rstrip() for line in stack],
+            }
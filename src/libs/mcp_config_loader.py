@@ -1,48 +1,14 @@
-import asyncio
+import hashlib
 import logging
 from collections.abc import Callable
 from pathlib import Path
 
 import tomli
-from watchdog.events import FileSystemEvent
-from watchdog.events import FileSystemEventHandler
-from watchdog.observers import Observer
 
-logger = logging.getLogger("mcp_server")
-
-
-class FileModifiedHandler(FileSystemEventHandler):
-    """处理配置文件修改事件."""
-
-    def __init__(self, loader: "MCPConfigLoader", debounce_interval: float = 1.0) -> None:
-        """初始化FileModifiedHandler."""
-        self.loader = loader
-        self.debounce_interval = debounce_interval
-        self.last_triggered = 0
-
-    def on_modified(self, event: FileSystemEvent) -> None:
-        """当配置文件被修改时触发."""
-        # 将 event.src_path 转换为 Path 对象进行比较
-        if str(event.src_path) != str(self.loader.config_path) or event.is_directory:
-            return
+from src.libs.config_watcher import ConfigWatcher
+from src.models.config_model import Config
 
-        # 使用时间戳而不是事件循环的时间
-        import time
-
-        current_time = time.time()
-        if current_time - self.last_triggered < self.debounce_interval:
-            return  # 防抖: 忽略短时间内的重复修改
-
-        self.last_triggered = current_time
-        logger.info("Config file changed, scheduling reload...")
-
-        if self.loader._loop and self.loader.callback:  # noqa: SLF001
-            # 确保回调是异步的,调度到事件循环
-            coro = self.loader.callback()
-            if asyncio.iscoroutine(coro):
-                asyncio.run_coroutine_threadsafe(coro, self.loader._loop)  # noqa: SLF001
-            else:
-                self.loader._loop.call_soon_threadsafe(self.loader.callback)  # noqa: SLF001
+logger = logging.getLogger("mcp_server")
 
 
 class MCPConfigLoader:
@@ -50,19 +16,35 @@ class MCPConfigLoader:
         """初始化MCPConfigLoader."""
         self.config_path = Path(config_path).resolve()
         self.callback: Callable | None = None
-        self._loop: asyncio.AbstractEventLoop | None = None
-        self._observer = None
-        self._config: dict | None = None
+        self._watcher: ConfigWatcher | None = None
+        self._config: Config | None = None
+        self._digest: str | None = None
+
+    async def load_config(self) -> bool:
+        """加载并校验配置文件.
 
-    async def load_config(self) -> None:
-        """加载配置文件."""
+        文件内容的哈希未变化时跳过解析和校验,直接复用已校验的配置。
+
+        Returns:
+            bool: 配置内容是否发生了变化
+
+        """
         if not self.config_path.exists():
             config_not_found = "Config file not found"
             raise FileNotFoundError(config_not_found)
 
         try:
-            with self.config_path.open("rb") as f:
-                self._config = tomli.load(f)
+            content = self.config_path.read_bytes()
+        except OSError as e:
+            msg = f"Config file load failed: {e}"
+            raise ValueError(msg) from e
+
+        digest = hashlib.sha256(content).hexdigest()
+        if self._config is not None and digest == self._digest:
+            return False
+
+        try:
+            data = tomli.loads(content.decode("utf-8"))
         except tomli.TOMLDecodeError as e:
             msg = "Config file load failed"
             raise ValueError(msg) from e
@@ -70,35 +52,37 @@ class MCPConfigLoader:
             msg = f"Config file load failed: {e}"
             raise ValueError(msg) from e
 
-    async def get_config(self) -> dict | None:
-        """获取当前配置."""
+        # 校验失败时抛出 pydantic.ValidationError(ValueError 的子类),保留上一次的有效配置
+        self._config = Config.model_validate(data)
+        self._digest = digest
+        return True
+
+    async def get_config(self) -> Config | None:
+        """获取当前已校验的配置."""
         if self._config is None:
             await self.load_config()
         return self._config
 
-    async def start_watching(self, callback: Callable) -> None:
-        """启动配置文件监控."""
+    async def start_watching(self, callback: Callable, debounce: float = 0.5) -> None:
+        """启动配置文件监控.
+
+        Args:
+            callback: 配置文件变化后调用的回调,重叠的变化会合并,回调不会并发执行
+            debounce: 最后一次写入后等待的秒数
+
+        """
         if not self.config_path.exists():
             msg = "Config file not found"
             raise FileNotFoundError(msg)
 
         self.callback = callback
-        self._loop = asyncio.get_running_loop()
-
-        event_handler = FileModifiedHandler(self, debounce_interval=1.0)
-        self._observer = Observer()
-        self._observer.schedule(
-            event_handler,
-            path=self.config_path.parent,
-            recursive=False,
-        )
-        self._observer.start()
-        logger.info("Started watching config file: '%s'", self.config_path)
+        self._watcher = ConfigWatcher(self.config_path, callback, debounce=debounce)
+        await self._watcher.start()
+        logger.info("Started watching config file: '%s' (%s)", self.config_path, self._watcher.mode)
 
     async def stop_watching(self) -> None:
         """停止配置文件监控."""
-        if self._observer:
-            self._observer.stop()
-            self._observer.join()
-            self._observer = None
+        if self._watcher:
+            await self._watcher.stop()
+            self._watcher = None
             logger.info("Stopped watching config file: %s", self.config_path)
@@ -1,67 +1,494 @@
 import asyncio
+import hmac
+import ipaddress
 import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from functools import partial
 from typing import Any
+from typing import Literal
 
+import uvicorn
 from fastapi import FastAPI
-from fastmcp import Client
 from fastmcp import FastMCP
 from fastmcp.client.transports import NodeStdioTransport
 from fastmcp.client.transports import NpxStdioTransport
 from fastmcp.client.transports import PythonStdioTransport
 from fastmcp.client.transports import SSETransport
+from fastmcp.client.transports import StdioTransport
 from fastmcp.client.transports import UvxStdioTransport
 from fastmcp.client.transports import WSTransport
+from mcp.shared.exceptions import McpError
+from mcp.types import INVALID_PARAMS
+from mcp.types import CallToolRequest
+from mcp.types import CallToolResult
+from mcp.types import ErrorData
+from mcp.types import GetPromptRequest
+from mcp.types import ListPromptsRequest
+from mcp.types import ListPromptsResult
+from mcp.types import ListResourcesRequest
+from mcp.types import ListResourcesResult
+from mcp.types import ListToolsRequest
+from mcp.types import ListToolsResult
+from mcp.types import PingRequest
+from mcp.types import PromptListChangedNotification
+from mcp.types import ReadResourceRequest
+from mcp.types import ResourceListChangedNotification
+from mcp.types import ServerResult
+from mcp.types import TextContent
+from mcp.types import ToolListChangedNotification
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.responses import PlainTextResponse
+from starlette.responses import Response
 
+from src.libs.adaptive_limit import create_limit
+from src.libs.affinity import SessionPins
+from src.libs.affinity import track_sessions
+from src.libs.batch import BATCH_TOOL
+from src.libs.batch import BatchRunner
+from src.libs.call_tracker import CallTracker
+from src.libs.compression import CompressionMiddleware
+from src.libs.handoff import Handoff
+from src.libs.handoff import listening_socket
+from src.libs.hedging import Hedger
+from src.libs.http_server import GracefulServer
+from src.libs.i18n import i18n
+from src.libs.json_codec import codec
+from src.libs.loop_monitor import LoopMonitor
+from src.libs.profiler import collapse
+from src.libs.profiler import sample_stacks
+from src.libs.proxy_client import ProxyClient
+from src.libs.rate_limiter import Limit
+from src.libs.rate_limiter import RateLimiter
+from src.libs.request_context import client_identity
+from src.libs.request_context import request_locale
+from src.libs.request_context import request_timeout
+from src.libs.request_context import settle_cancelled_request
+from src.libs.resource_monitor import ResourceMonitor
+from src.libs.result_cache import ResultCache
+from src.libs.routing import Catalog
+from src.libs.routing import RoutingTable
+from src.libs.scheduler import CallScheduler
+from src.libs.scheduler import FairScheduler
+from src.libs.shared_store import StoreCache
+from src.libs.shared_store import StoreError
+from src.libs.shared_store import create_store
+from src.libs.stdio_transport import BufferedStdioTransport
+from src.libs.supervisor import BackendSupervisor
+from src.libs.supervisor import BackendUnavailableError
+from src.libs.tool_index import SEARCH_TOOL
+from src.libs.tool_index import ToolSearch
+from src.libs.tool_validator import ToolValidators
+from src.libs.traffic_capture import TrafficRecorder
 from src.models.config_model import ProxyConfig
 from src.models.config_model import ServerConfig
 
+STDIO_TYPES = ("process", "uvx", "npx")
+LIST_CHANGED_NOTIFICATIONS = (
+    ToolListChangedNotification,
+    ResourceListChangedNotification,
+    PromptListChangedNotification,
+)
+
+
+def with_request_locale(handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+    """Wrap a lowlevel request handler so it runs in the client's locale."""
+
+    async def wrapper(request: Any) -> Any:  # noqa: ANN401
+        with i18n.use_language(request_locale()):
+            return await handler(request)
+
+    return wrapper
+
+
+def with_client_cancellation(handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+    """Wrap a lowlevel request handler so a client cancelling it ends only that request.
+
+    Cancelling the handler also cancels its upstream request, and the
+    session is left running for the client's other requests.
+    """
+
+    async def wrapper(request: Any) -> Any:  # noqa: ANN401
+        try:
+            return await handler(request)
+        except asyncio.CancelledError:
+            if not settle_cancelled_request():
+                raise
+            return None
+
+    return wrapper
+
+
+def is_loopback(host: str) -> bool:
+    """Return True if ``host`` is a loopback IP address."""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
 
 class McpServer:
     """MCP server aggregator class."""
 
-    def __init__(self, server_config: ServerConfig, proxy_config: ProxyConfig) -> None:
+    def __init__(self, server_config: ServerConfig, proxy_config: dict[str, ProxyConfig]) -> None:
         """Initialize the MCP server."""
         self.server_config: ServerConfig = server_config
-        self.proxy_config: ProxyConfig = proxy_config
+        self.proxy_config: dict[str, ProxyConfig] = proxy_config
         self.main_server: FastMCP | None = None
-        self.clients: list[Client] = []
+        self.clients: list[ProxyClient] = []
+        self.supervisors: dict[str, BackendSupervisor] = {}
+        self.resource_monitor: ResourceMonitor | None = None
+        self.call_tracker = CallTracker()
+        self.rate_limiter = RateLimiter(server_config, proxy_config)
+        self.validators = ToolValidators()
+        self.routes = RoutingTable()
+        self.store = StoreCache(
+            create_store(server_config.store_url, server_config.store_pool_size),
+            server_config.store_namespace,
+            server_config.store_l1_size,
+            server_config.store_l1_ttl,
+        )
+        self.result_cache = ResultCache(self.store, proxy_config)
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self.scheduler: FairScheduler | None = None
+        self._weights = {config.prefix: config.weight for config in proxy_config.values()}
+        if server_config.max_concurrency:
+            self.scheduler = FairScheduler("server", server_config.max_concurrency, lambda p: self._weights.get(p, 1.0))
+        self.recorder: TrafficRecorder | None = None
+        if server_config.capture_file:
+            self.recorder = TrafficRecorder(
+                server_config.capture_file,
+                self.routes.backend_of,
+                server_config.capture_sample_rate,
+                server_config.capture_redact,
+            )
+        self.loop_monitor: LoopMonitor | None = None
+        if server_config.loop_lag_interval > 0:
+            self.loop_monitor = LoopMonitor(server_config.loop_lag_interval, server_config.loop_lag_threshold)
+        self._profiling = asyncio.Lock()
+        # 启动时按需安装的请求包装,之后启用的后端设置需要新进程才能生效
+        self._rate_limited = False
+        self._caching_results = False
+        self._tracking_sessions = False
         self._tasks: list[asyncio.Task] = []
+        self._drain_task: asyncio.Task | None = None
+        self.handoff: Handoff | None = None
         self._logger: logging.Logger | None = None
         self.is_shutting_down: bool = False
+        self._stopped: bool = False
 
     @classmethod
-    async def create(cls, server_config: ServerConfig, proxy_config: ProxyConfig, logger: logging.Logger) -> None:
+    async def create(
+        cls,
+        server_config: ServerConfig,
+        proxy_config: dict[str, ProxyConfig],
+        logger: logging.Logger,
+    ) -> "McpServer":
         """Create a new instance of the MCP server."""
         instance = cls(server_config, proxy_config)
         instance._logger = logger
         app = FastAPI()
         instance.main_server = FastMCP.from_fastapi(
             app=app,
-            name=server_config["name"],
-            host=server_config.get("host", "127.0.0.1"),
-            port=server_config.get("port", "8000"),
+            name=server_config.name,
+            host=server_config.host,
+            port=server_config.port,
         )
+        # Route requests straight to their backend, enforce client limits and record traffic,
+        # then translate messages per client rather than per process
+        routers = {
+            ListToolsRequest: instance._list_tools,
+            ListResourcesRequest: instance._list_resources,
+            ListPromptsRequest: instance._list_prompts,
+            CallToolRequest: instance._route_tool_call,
+            ReadResourceRequest: instance._route_resource_read,
+            GetPromptRequest: instance._route_prompt,
+        }
+        handlers = instance.main_server._mcp_server.request_handlers  # noqa: SLF001
+        instance._caching_results = bool(instance.result_cache.tools)
+        instance._rate_limited = instance.rate_limiter.enabled
+        for request_type, handler in handlers.items():
+            wrapped = routers[request_type](handler) if request_type in routers else handler
+            if instance._caching_results and request_type is CallToolRequest:
+                wrapped = instance._with_result_cache(wrapped)
+            if server_config.validate_arguments and request_type is CallToolRequest:
+                wrapped = instance._with_argument_validation(wrapped)
+            if instance._rate_limited and request_type is not PingRequest:
+                wrapped = instance._with_rate_limit(wrapped)
+            if instance.recorder and request_type is not PingRequest:
+                wrapped = instance._with_capture(wrapped)
+            handlers[request_type] = with_client_cancellation(with_request_locale(wrapped))
+        instance._start_background_tasks()
+        instance._track_sessions()
+        if server_config.batch_max_calls > 0:
+            runner = BatchRunner(handlers[CallToolRequest], server_config.batch_max_calls, server_config.batch_timeout)
+            instance.main_server.add_tool(runner.run, name=BATCH_TOOL)
+        if server_config.tool_search_limit > 0:
+            search = ToolSearch(instance.routes.index, server_config.tool_search_limit)
+            instance.main_server.add_tool(search.run, name=SEARCH_TOOL)
+        if server_config.admin_path:
+            admin_path = server_config.admin_path.rstrip("/")
+            instance.main_server.custom_route(f"{admin_path}/status", methods=["GET"])(instance._admin_status)
+            instance.main_server.custom_route(f"{admin_path}/profile", methods=["GET"])(instance._admin_profile)
+        # 网关自身的组件只列出,请求仍由 FastMCP 处理
+        instance.routes.update(Catalog.build("", None, *instance._components()))
         return instance
 
+    def _track_sessions(self) -> None:
+        """Give front-end sessions ids once some backend has session affinity."""
+        if self._tracking_sessions or not any(config.affinity for config in self.proxy_config.values()):
+            return
+        # 前端会话结束时关闭固定给它的上游会话
+        track_sessions(self.main_server._mcp_server, self._end_session)  # noqa: SLF001
+        self._tracking_sessions = True
+
+    def _start_background_tasks(self) -> None:
+        """Start the traffic recorder, the event loop monitor and the shared store listener."""
+        if self.recorder:
+            self._tasks.append(asyncio.create_task(self.recorder.run()))
+        if self.loop_monitor:
+            self._tasks.append(asyncio.create_task(self.loop_monitor.run()))
+        # 其他节点发现后端目录变化时,本节点也重新获取该后端的目录
+        self.store.on_invalidate("catalog:", self._on_peer_catalog)
+        self._tasks.append(asyncio.create_task(self.store.run()))
+
+    def _list_tools(self, _handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Serve tools/list from the routing snapshot, or only ``search_tools`` in discovery mode."""
+        if self.server_config.discovery_mode:
+
+            async def discovery(_request: Any) -> ServerResult:  # noqa: ANN401
+                # 网关自身的组件登记在空前缀下
+                own = self.routes.catalog("")
+                tools = [tool for tool in own.tool_list if tool.name == SEARCH_TOOL] if own else []
+                return ServerResult(ListToolsResult(tools=tools))
+
+            return discovery
+
+        async def wrapper(_request: Any) -> ServerResult:  # noqa: ANN401
+            return ServerResult(ListToolsResult(tools=self.routes.snapshot.tool_list))
+
+        return wrapper
+
+    def _list_resources(self, _handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Serve resources/list from the routing snapshot."""
+
+        async def wrapper(_request: Any) -> ServerResult:  # noqa: ANN401
+            return ServerResult(ListResourcesResult(resources=self.routes.snapshot.resource_list))
+
+        return wrapper
+
+    def _list_prompts(self, _handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Serve prompts/list from the routing snapshot."""
+
+        async def wrapper(_request: Any) -> ServerResult:  # noqa: ANN401
+            return ServerResult(ListPromptsResult(prompts=self.routes.snapshot.prompt_list))
+
+        return wrapper
+
+    def _route_tool_call(self, handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Send tools/call straight to the owning backend, falling back to FastMCP for unrouted tools."""
+        header = self.server_config.timeout_header
+
+        async def wrapper(request: CallToolRequest) -> Any:  # noqa: ANN401
+            route = self.routes.snapshot.tools.get(request.params.name)
+            if route is None:
+                return await handler(request)
+            # 客户端的截止时间包含排队等待,后端的默认超时只计算转发后的时间
+            deadline = request_timeout(header)
+            scope = asyncio.timeout(deadline)
+            try:
+                async with scope, route.client.pinned() as client:
+                    result = await client.call_tool_mcp(route.target, request.params.arguments or {})
+            except TimeoutError:
+                limit = deadline if scope.expired() else route.client.timeout
+                message = i18n.gettext("Timed out after {}s").format(limit)
+                return ServerResult(CallToolResult(content=[TextContent(type="text", text=message)], isError=True))
+            except Exception as e:  # noqa: BLE001
+                # 与 FastMCP 一致,转发失败作为工具错误返回
+                return ServerResult(CallToolResult(content=[TextContent(type="text", text=str(e))], isError=True))
+            return ServerResult(result)
+
+        return wrapper
+
+    def _route_resource_read(self, handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Send resources/read straight to the owning backend, falling back to FastMCP for templates."""
+
+        async def wrapper(request: ReadResourceRequest) -> Any:  # noqa: ANN401
+            route = self.routes.snapshot.resources.get(str(request.params.uri))
+            if route is None:
+                return await handler(request)
+            async with route.client.pinned() as client:
+                return ServerResult(await client.read_resource_mcp(route.target))
+
+        return wrapper
+
+    def _route_prompt(self, handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Send prompts/get straight to the owning backend."""
+
+        async def wrapper(request: GetPromptRequest) -> Any:  # noqa: ANN401
+            route = self.routes.snapshot.prompts.get(request.params.name)
+            if route is None:
+                return await handler(request)
+            async with route.client.pinned() as client:
+                return ServerResult(await client.get_prompt_mcp(route.target, request.params.arguments))
+
+        return wrapper
+
+    def _with_result_cache(self, handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Answer cacheable tool calls from the shared result cache, and fill it on success."""
+
+        async def wrapper(request: CallToolRequest) -> Any:  # noqa: ANN401
+            route = self.routes.snapshot.tools.get(request.params.name)
+            catalog = self.routes.catalog(route.prefix) if route else None
+            if route is None or catalog is None or not self.result_cache.applies(route):
+                return await handler(request)
+            arguments = request.params.arguments or {}
+            cached = await self.result_cache.get(route, catalog.digest, arguments)
+            if cached is not None:
+                return ServerResult(cached)
+            response = await handler(request)
+            await self.result_cache.put(route, catalog.digest, arguments, response.root)
+            return response
+
+        return wrapper
+
+    def _with_argument_validation(
+        self,
+        handler: Callable[[Any], Awaitable[Any]],
+    ) -> Callable[[Any], Awaitable[Any]]:
+        """Wrap the tools/call handler to reject malformed arguments before they go upstream."""
+        validators = self.validators
+
+        async def wrapper(request: CallToolRequest) -> Any:  # noqa: ANN401
+            name = request.params.name
+            error = validators.validate(name, request.params.arguments or {})
+            if error:
+                message = i18n.gettext("Invalid arguments for tool '{}': {}").format(name, error)
+                raise McpError(ErrorData(code=INVALID_PARAMS, message=message))
+            return await handler(request)
+
+        return wrapper
+
+    def _with_rate_limit(self, handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Wrap a lowlevel request handler with the per-client limits."""
+        limiter = self.rate_limiter
+        routes = self.routes
+        header = self.server_config.client_id_header
+        keys = frozenset(self.server_config.client_keys)
+
+        async def wrapper(request: Any) -> Any:  # noqa: ANN401
+            prefix = None
+            if isinstance(request, CallToolRequest):
+                # batch_call 中的每个调用都会单独限流,批次本身不占用令牌与并发名额
+                if request.params.name == BATCH_TOOL:
+                    return await handler(request)
+                prefix = routes.backend_of(request.params.name)
+            with limiter.acquire(client_identity(header, keys), prefix):
+                return await handler(request)
+
+        return wrapper
+
+    def _with_capture(self, handler: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Wrap a lowlevel request handler to record a sample of requests for replay."""
+        recorder = self.recorder
+
+        async def wrapper(request: Any) -> Any:  # noqa: ANN401
+            if not recorder.sampled():
+                return await handler(request)
+            started = time.monotonic()
+            try:
+                result = await handler(request)
+            except Exception as e:
+                recorder.record(request, started, error=str(e))
+                raise
+            recorder.record(request, started, result)
+            return result
+
+        return wrapper
+
+    async def serve(self, transport: Literal["streamable-http", "sse"]) -> None:
+        """Serve the aggregated MCP server over HTTP until shutdown."""
+        middleware = []
+        if self.server_config.compression:
+            middleware.append(
+                Middleware(
+                    CompressionMiddleware,
+                    min_size=self.server_config.compression_min_size,
+                    level=self.server_config.compression_level,
+                    exclude=self.server_config.compression_exclude,
+                    cache_size=self.server_config.compression_cache_size,
+                ),
+            )
+        app = self.main_server.http_app(transport=transport, middleware=middleware)
+        config = uvicorn.Config(
+            app,
+            host=self.server_config.host,
+            port=self.server_config.port,
+            log_level=self.main_server.settings.log_level.lower(),
+            timeout_graceful_shutdown=self.server_config.close_timeout,
+            lifespan="on",
+        )
+        # 自行创建监听套接字,重启时交给新进程继承
+        sock = listening_socket(config)
+        self.handoff = Handoff(sock)
+        await GracefulServer(config, on_drain=self.drain, on_started=Handoff.notify_ready).serve(sockets=[sock])
+
+    async def restart(self) -> bool:
+        """Restart in a new process that takes over the listening socket, without dropping connections.
+
+        Returns:
+            bool: False if this server is not serving or a restart is already in progress.
+
+        """
+        if self.handoff is None or self.is_shutting_down:
+            self._logger.warning("Not serving, cannot restart without downtime")
+            return False
+        return await self.handoff.start()
+
+    async def drain(self) -> bool:
+        """Reject new upstream calls and wait for in-flight calls to finish.
+
+        Returns:
+            bool: True if every in-flight call finished before ``drain_timeout``.
+
+        """
+        self.is_shutting_down = True
+        if self._drain_task is None:
+            timeout = self.server_config.drain_timeout
+            self._drain_task = asyncio.ensure_future(self.call_tracker.drain(timeout))
+        return await asyncio.shield(self._drain_task)
+
     async def stop(self) -> None:
-        """Stop the MCP server and clean up resources."""
-        if not self._logger:
+        """Drain in-flight calls, then stop the MCP server and clean up resources."""
+        if not self._logger or self._stopped:
             return
+        self._stopped = True
 
         self._logger.info("Stopping MCP server...")
         try:
+            await self.drain()
+
             # Cancel all tasks
             for task in self._tasks:
                 task.cancel()
+            await self.store.close()
 
-            # Close all clients
+            # Close all clients in parallel, each bounded by close_timeout
+            close_timeout = self.server_config.close_timeout
             await asyncio.gather(
-                *(client.__aexit__(None, None, None) for client in self.clients),
+                *(self._close_client(client, close_timeout) for client in self.clients),
                 return_exceptions=True,
             )
 
             # Clear resources
             self.clients.clear()
+            self.supervisors.clear()
             self._tasks.clear()
 
             if self.main_server:
@@ -71,41 +498,320 @@ class McpServer:
         except Exception:
             self._logger.exception("Failed to stop server")
 
+    async def _close_client(self, client: ProxyClient, close_timeout: float) -> None:
+        """Cancel calls still running against ``client`` and wait for their sessions to close."""
+        tasks = self.call_tracker.tasks(client.name)
+        if tasks:
+            self._logger.warning("Cancelling %d unfinished call(s) to '%s'", len(tasks), client.name)
+            for task in tasks:
+                task.cancel()
+            _, pending = await asyncio.wait(tasks, timeout=close_timeout)
+            if pending:
+                self._logger.error("Timed out closing '%s' after %.1fs", client.name, close_timeout)
+        if client.pins:
+            await client.pins.close(close_timeout)
+        if client.supervisor:
+            await client.supervisor.stop(close_timeout)
+
+    def backend_status(self) -> dict[str, dict[str, Any]]:
+        """Return in-flight calls and supervision details for each backend."""
+        in_flight = self.call_tracker.in_flight()
+        status = {}
+        for client in self.clients:
+            status[client.name] = {"in_flight": in_flight.get(client.name, 0)}
+            if client.supervisor:
+                status[client.name].update(client.supervisor.status())
+            if client.scheduler and client.scheduler.backend:
+                status[client.name]["scheduler"] = client.scheduler.backend.status()
+            if client.hedger:
+                status[client.name]["hedging"] = client.hedger.status()
+            if client.pins:
+                status[client.name]["affinity"] = client.pins.status()
+            config = self.proxy_config.get(client.name)
+            if config and config.cache_tools:
+                status[client.name]["result_cache"] = self.result_cache.status(config.prefix)
+        return status
+
+    async def _admin_status(self, request: Request) -> Response:
+        """Serve backend, resource, routing, shared store, event loop, JSON codec and process status as JSON."""
+        if not self._admin_authorized(request):
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        return JSONResponse(
+            {
+                "backends": self.backend_status(),
+                "resources": self.resource_usage(),
+                "routing_version": self.routes.snapshot.version,
+                "store": self.store.status(),
+                "loop": self.loop_monitor.status() if self.loop_monitor else None,
+                "json_codec": codec(),
+                "process": {
+                    "pid": os.getpid(),
+                    "tasks": len(asyncio.all_tasks()),
+                    "threads": threading.active_count(),
+                },
+            },
+        )
+
+    async def _admin_profile(self, request: Request) -> Response:
+        """Sample the stacks of the process for ``seconds`` and serve them as collapsed stacks.
+
+        The output is read by flamegraph.pl, speedscope and similar tools.
+        ``seconds`` is capped by ``profile_max_seconds``, ``interval`` is the
+        time between samples, at most ``seconds``, and one profile runs at a
+        time.
+        """
+        if not self._admin_authorized(request):
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        try:
+            seconds = float(request.query_params.get("seconds", 10))
+            interval = float(request.query_params.get("interval", 0.01))
+        except ValueError:
+            seconds = interval = math.nan
+        if not math.isfinite(seconds) or not math.isfinite(interval):
+            return JSONResponse({"error": "seconds and interval must be finite numbers"}, status_code=400)
+        seconds = min(max(seconds, 0.1), self.server_config.profile_max_seconds)
+        # 采样线程无法取消,间隔超过时长会让它一直占着剖析锁
+        interval = min(max(interval, 0.001), seconds)
+        if self._profiling.locked():
+            return JSONResponse({"error": "a profile is already running"}, status_code=409)
+        async with self._profiling:
+            # 在线程中采样,事件循环照常运行并被采到
+            stacks = await asyncio.to_thread(sample_stacks, seconds, interval)
+        return PlainTextResponse(collapse(stacks))
+
+    def _admin_authorized(self, request: Request) -> bool:
+        """Return True if ``request`` may use the admin endpoints.
+
+        With ``admin_token`` set the request must carry it as a bearer token.
+        Without one, only clients connecting from a loopback address are
+        allowed, since the status and profiles describe the whole process.
+        """
+        token = self.server_config.admin_token
+        if not token:
+            return request.client is not None and is_loopback(request.client.host)
+        return hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}")
+
+    def resource_usage(self) -> dict[str, dict[str, Any]]:
+        """Return the latest RSS, CPU and open FD sample of each stdio backend, keyed by prefix.
+
+        A pinned session's process is keyed by ``<prefix>@<session>``.
+        """
+        if not self.resource_monitor:
+            return {}
+        return self.resource_monitor.snapshot()
+
+    def _supervised(self) -> dict[str, BackendSupervisor]:
+        """Return the supervisors of every stdio backend process, pinned sessions included."""
+        supervisors = dict(self.supervisors)
+        for client in self.clients:
+            if client.pins:
+                supervisors.update((supervisor.name, supervisor) for supervisor in client.pins.supervisors())
+        return supervisors
+
     async def create_proxies(self) -> None:
         """Create proxy servers based on configuration."""
         if not self.proxy_config:
             self._logger.info("No proxy configurations found, skipping proxy creation")
             return
-        for name, config in self.proxy_config.items():
-            if not config:
-                self._logger.warning("Proxy configuration for %s is empty, skipping", name)
-                continue
-            if not config.get("prefix"):
-                self._logger.error("Proxy configuration for %s is missing prefix, skipping", name)
-                continue
-            self._logger.info("name: %s, config: %s", name, str(config))
+        await self._add_backends(self.proxy_config)
+
+    def can_update_backends(self, proxy_config: dict[str, ProxyConfig]) -> bool:
+        """Return True if ``update_backends`` can apply ``proxy_config`` in this process.
+
+        Per-backend rate limits and result caching need request handlers
+        that are only installed at startup when some backend used them.
+        """
+        limited = any(Limit.from_config(config) for config in proxy_config.values())
+        cached = any(config.cache_tools for config in proxy_config.values())
+        return (self._rate_limited or not limited) and (self._caching_results or not cached)
+
+    async def update_backends(self, proxy_config: dict[str, ProxyConfig]) -> None:
+        """Apply a new ``[mcpServers]`` table without restarting the gateway.
+
+        Backends whose config did not change keep running, sessions and all.
+        Removed and changed backends stop being routed, get ``drain_timeout``
+        seconds to finish their calls and are closed. Added and changed
+        backends are then started and listed like at startup.
+        """
+        if self._stopped or self.is_shutting_down:
+            return
+        stale = [name for name, config in self.proxy_config.items() if proxy_config.get(name) != config]
+        fresh = {name: config for name, config in proxy_config.items() if self.proxy_config.get(name) != config}
+        await asyncio.gather(*(self._remove_backend(name) for name in stale))
+        self.proxy_config = proxy_config
+        self.rate_limiter.configure_backends(proxy_config)
+        self.result_cache.configure(proxy_config)
+        self._weights = {config.prefix: config.weight for config in proxy_config.values()}
+        self._track_sessions()
+        await self._add_backends(fresh)
+        self._logger.info("Updated backends: removed %s, started %s", stale, list(fresh))
+
+    async def _remove_backend(self, name: str) -> None:
+        """Stop routing to a backend and close it with its replicas once its calls finish."""
+        prefix = self.proxy_config[name].prefix
+        catalog = self.routes.catalog(prefix)
+        if catalog is not None:
+            for registry, keys in zip(
+                self._components(),
+                (catalog.tools, catalog.resources, catalog.prompts),
+                strict=True,
+            ):
+                for key in keys:
+                    registry.pop(key, None)
+            self.main_server._cache.clear()  # noqa: SLF001
+        snapshot = self.routes.remove(prefix)
+        self.validators.remove(prefix)
+        self._logger.info("Routing table v%d: removed '%s'", snapshot.version, name)
+        # 进行中的目录刷新会把旧后端的组件重新加回来
+        refreshing = self._refreshing.pop(name, None)
+        if refreshing:
+            refreshing.cancel()
+        for task in [task for task in self._tasks if task.get_name() == f"pins:{name}"]:
+            task.cancel()
+            self._tasks.remove(task)
+
+        client = next((client for client in self.clients if client.name == name), None)
+        if client is None:
+            return
+        clients = [client, *client.replicas]
+        tasks = [task for member in clients for task in self.call_tracker.tasks(member.name)]
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.server_config.drain_timeout)
+        close_timeout = self.server_config.close_timeout
+        await asyncio.gather(*(self._close_client(member, close_timeout) for member in clients))
+        for member in clients:
+            self.clients.remove(member)
+            self.supervisors.pop(member.name, None)
+
+    async def _add_backends(self, proxy_config: dict[str, ProxyConfig]) -> None:
+        """Start, import and list the backends of ``proxy_config``."""
+        for name, config in proxy_config.items():
+            self._logger.info("name: %s, config: %s", name, config)
             try:
                 client = await self._create_proxy(name, config)
                 proxy_route = FastMCP.from_client(client, name=name)
                 if client:
+                    before = [set(registry) for registry in self._components()]
                     await self.main_server.import_server(
                         server=proxy_route,
-                        prefix=config.get("prefix", ""),
+                        prefix=config.prefix,
                     )
                     self.clients.append(client)
+                    components = tuple(
+                        {key: item for key, item in registry.items() if key not in previous}
+                        for registry, previous in zip(self._components(), before, strict=True)
+                    )
+                    self._update_catalog(name, config.prefix, client, components)
+                    await self._share_catalog(config.prefix)
             except Exception:
                 import traceback
 
                 traceback.print_exc()
                 self._logger.exception("Failed to create proxy %s", name)
 
-    async def _create_proxy(self, name: str, config: dict[str, Any]) -> Client | None:
-        """Create a single proxy server."""
-        mcp_type = config.get("type")
-        if not mcp_type:
-            self._logger.error("%s: Proxy type not specified", name)
-            return None
+        if self.resource_monitor is None and self.supervisors and ResourceMonitor.available():
+            interval = self.server_config.resource_sample_interval
+            self.resource_monitor = ResourceMonitor(self._supervised, interval)
+            self._tasks.append(asyncio.create_task(self.resource_monitor.run()))
+
+    async def refresh_backend(self, name: str, *, announce: bool = True) -> None:
+        """Re-list one backend and replace its tools, resources and prompts.
+
+        Only that backend's entries are swapped, in the FastMCP registry, the
+        routing table and the argument validators. With ``announce``, other
+        nodes are told to re-list the backend too when its catalog changed.
+        """
+        config = self.proxy_config.get(name)
+        client = next((client for client in self.clients if client.name == name), None)
+        if config is None or client is None or self.main_server is None:
+            return
+        server = FastMCP.from_client(client, name=name)
+        prefix = config.prefix
+        tools = {f"{prefix}_{key}": tool for key, tool in (await server.get_tools()).items()}
+        resources = {f"{prefix}+{key}": resource for key, resource in (await server.get_resources()).items()}
+        prompts = {f"{prefix}_{key}": prompt for key, prompt in (await server.get_prompts()).items()}
+
+        previous = self.routes.catalog(prefix)
+        for registry, old, new in zip(
+            self._components(),
+            (previous.tools, previous.resources, previous.prompts) if previous else ({}, {}, {}),
+            (tools, resources, prompts),
+            strict=True,
+        ):
+            for key in old:
+                registry.pop(key, None)
+            registry.update(new)
+        self.main_server._cache.clear()  # noqa: SLF001
+        self._update_catalog(name, prefix, client, (tools, resources, prompts))
+        if announce:
+            await self._share_catalog(prefix)
+
+    def _components(self) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
+        """Return the live tool, resource and prompt registries of the FastMCP server."""
+        return (
+            self.main_server._tool_manager.get_tools(),  # noqa: SLF001
+            self.main_server._resource_manager.get_resources(),  # noqa: SLF001
+            self.main_server._prompt_manager.get_prompts(),  # noqa: SLF001
+        )
+
+    def _update_catalog(
+        self,
+        name: str,
+        prefix: str,
+        client: ProxyClient,
+        components: tuple[dict[str, Any], ...],
+    ) -> None:
+        """Swap in the routes and argument validators of one backend's tools, resources and prompts."""
+        tools = components[0]
+        snapshot = self.routes.update(Catalog.build(prefix, client, *components))
+        self._logger.info("Routing table v%d: %d tool(s) from '%s'", snapshot.version, len(tools), name)
+        schemas = {key: tool.parameters for key, tool in tools.items()}
+        if self.validators.refresh(prefix, schemas):
+            self._logger.info("Compiled argument validators for %d tool(s) of '%s'", len(schemas), name)
+
+    async def _share_catalog(self, prefix: str) -> None:
+        """Publish the digest of a backend's catalog to the other nodes when it changed."""
+        catalog = self.routes.catalog(prefix)
+        key = f"catalog:{prefix}"
+        try:
+            if catalog and await self.store.get(key) != catalog.digest.encode():
+                await self.store.set(key, catalog.digest.encode())
+        except (StoreError, OSError) as e:
+            self._logger.warning("Cannot share the catalog of '%s': %s", prefix, e)
+
+    async def _on_peer_catalog(self, key: str) -> None:
+        """Re-list a shared backend whose catalog changed on another node."""
+        prefix = key.removeprefix("catalog:")
+        name = next((name for name, config in self.proxy_config.items() if config.prefix == prefix), None)
+        catalog = self.routes.catalog(prefix)
+        # stdio 后端由每个节点各自启动,目录互不相关
+        if name is None or catalog is None or self.proxy_config[name].type in STDIO_TYPES:
+            return
+        if await self.store.get(key) != catalog.digest.encode():
+            # 不再广播,节点间后端版本不同时也不会互相触发刷新
+            self._refresh_soon(name, announce=False)
+
+    def _refresh_soon(self, name: str, *, announce: bool = True) -> None:
+        """Refresh a backend in the background, merging requests while one is running."""
+        if name in self._refreshing:
+            return
+        task = asyncio.create_task(self.refresh_backend(name, announce=announce))
+        self._refreshing[name] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(name, None))
 
+    def _catalog_listener(self, name: str) -> Callable[[Any], Awaitable[None]]:
+        """Refresh a backend's catalog when it announces that its lists changed."""
+
+        async def handler(message: Any) -> None:  # noqa: ANN401
+            if isinstance(getattr(message, "root", None), LIST_CHANGED_NOTIFICATIONS):
+                # 已有刷新在进行时合并通知,避免一次变更触发多次刷新
+                self._refresh_soon(name)
+
+        return handler
+
+    async def _create_proxy(self, name: str, config: ProxyConfig) -> ProxyClient | None:
+        """Create a single proxy server."""
+        mcp_type = config.type
         transport_creators = {
             "process": self._create_process_transport,
             "http": self._create_sse_transport,
@@ -124,35 +830,152 @@ class McpServer:
         if not transport:
             return None
 
-        return await self._setup_proxy(name, config, transport)
+        client = await self._setup_proxy(name, config, transport)
+        if client:
+            client.replicas = await self._create_replicas(name, config, creator)
+            if config.hedge_tools and client.replicas:
+                client.hedger = Hedger(name, config.hedge_tools, config.hedge_percentile, config.hedge_budget)
+            if config.affinity:
+                client.pins = SessionPins(
+                    name,
+                    partial(self._create_pinned_client, name, config, creator, client),
+                    config.max_pinned_sessions,
+                    config.pinned_idle_timeout,
+                    config.start_timeout,
+                )
+                self._tasks.append(asyncio.create_task(client.pins.run(), name=f"pins:{name}"))
+        return client
+
+    async def _create_pinned_client(
+        self,
+        name: str,
+        config: ProxyConfig,
+        creator: Callable[[str, ProxyConfig], Awaitable[Any]],
+        primary: ProxyClient,
+        session: int,
+    ) -> ProxyClient:
+        """Create an unopened client of a backend for one front-end session, on a transport of its own.
+
+        A stdio backend's client gets a supervisor of its own, so the pinned
+        process is health-checked, sampled and held to ``max_rss_mb`` like
+        the backend's own process.
+        """
+        transport = await creator(name, config)
+        if not transport:
+            raise BackendUnavailableError(name, "no transport")
+        client = ProxyClient(
+            transport,
+            name=name,
+            tracker=self.call_tracker,
+            timeout=config.timeout,
+            cancel_upstream=config.cancel_upstream,
+        )
+        # 固定会话与主客户端共用调度器,并发上限对整个后端生效
+        client.scheduler = primary.scheduler
+        if config.type in STDIO_TYPES:
+            client.supervisor = BackendSupervisor(f"{name}@{session}", client, config)
+            client.supervisor.prefix = f"{config.prefix}@{session}"
+        return client
+
+    def _end_session(self, session: int) -> None:
+        """Close the upstream sessions pinned to a front-end session that ended."""
+        for client in self.clients:
+            if client.pins:
+                client.pins.release(session)
+
+    async def _create_replicas(
+        self,
+        name: str,
+        config: ProxyConfig,
+        creator: Callable[[str, ProxyConfig], Awaitable[Any]],
+    ) -> list[ProxyClient]:
+        """Create the extra replicas of a backend, each with its own session."""
+        if config.type in STDIO_TYPES:
+            configs = [config] * (config.replicas - 1)
+        else:
+            configs = [config.model_copy(update={"url": url}) for url in config.replica_urls]
+
+        replicas = []
+        for index, replica_config in enumerate(configs, start=2):
+            replica_name = f"{name}#{index}"
+            transport = await creator(replica_name, replica_config)
+            replica = await self._setup_proxy(replica_name, replica_config, transport) if transport else None
+            if replica is None:
+                self._logger.warning("Failed to start replica '%s'", replica_name)
+                continue
+            # 副本只用于对冲,调度由主客户端负责
+            replica.scheduler = None
+            if replica.supervisor:
+                replica.supervisor.prefix = f"{config.prefix}#{index}"
+            self.clients.append(replica)
+            replicas.append(replica)
+        return replicas
 
     async def _setup_proxy(
         self,
         name: str,
-        config: dict[str, Any],
+        config: ProxyConfig,
         transport: Any,  # noqa: ANN401
-    ) -> Client | None:
+    ) -> ProxyClient | None:
         """Set up a proxy server with retry mechanism."""
-        retry_count = config.get("retry", 1)
+        retry_count = config.retry
+        listener = self._catalog_listener(name) if name in self.proxy_config else None
+        client = ProxyClient(
+            transport,
+            name=name,
+            tracker=self.call_tracker,
+            timeout=config.timeout,
+            cancel_upstream=config.cancel_upstream,
+            message_handler=listener,
+        )
+        client.scheduler = self._create_scheduler(name, config)
+        if config.type not in STDIO_TYPES:
+            self._logger.info("Connected server '%s' successfully", name)
+            return client
+
+        # stdio 后端由 supervisor 持有会话,进程退出后自动重启
         for attempt in range(retry_count):
-            try:
-                client = Client(transport=transport)
+            supervisor = BackendSupervisor(name, client, config)
+            if await supervisor.start(config.start_timeout):
+                client.supervisor = supervisor
+                self.supervisors[name] = supervisor
                 self._logger.info("Connected server '%s' successfully", name)
-            except TimeoutError:
-                self._logger.warning("Timeout connecting server '%s' (try %d/%d)", name, attempt + 1, retry_count)
-
-            except Exception:
-                self._logger.exception("Failed to connect server '%s'", name)
-            return client
+                return client
+            await supervisor.stop(self.server_config.close_timeout)
+            self._logger.warning("Timeout connecting server '%s' (try %d/%d)", name, attempt + 1, retry_count)
         return None
 
+    def _create_scheduler(self, name: str, config: ProxyConfig) -> CallScheduler | None:
+        """Create the scheduler that queues calls to a saturated backend."""
+        backend = None
+        weights = self.server_config.client_weights
+
+        def weight(client: str) -> float:
+            # 客户端标识形如 key:<值> 或 ip:<地址>,权重按冒号后的部分配置
+            return weights.get(client.partition(":")[2], 1.0)
+
+        if config.adaptive_concurrency:
+            limit = create_limit(config.adaptive_concurrency, config.min_concurrency, config.max_concurrency)
+            backend = FairScheduler(name, limit.capacity, weight, limit)
+        elif config.max_concurrency:
+            backend = FairScheduler(name, config.max_concurrency, weight)
+        if backend is None and self.scheduler is None:
+            return None
+        return CallScheduler(
+            config.prefix,
+            backend,
+            self.scheduler,
+            partial(client_identity, self.server_config.client_id_header, frozenset(self.server_config.client_keys)),
+            self.server_config.priority_header,
+        )
+
     async def _create_process_transport(
         self,
         name: str,
-        config: dict[str, Any],
-    ) -> PythonStdioTransport | NodeStdioTransport | None:
+        config: ProxyConfig,
+    ) -> BufferedStdioTransport | None:
         """Create process transport for Python or Node.js scripts."""
-        script_path = config.get("script_path")
+        script_path = config.script_path
         if not script_path:
             self._logger.error("%s: Script path not found", name)
             return None
@@ -165,36 +988,40 @@ class McpServer:
 
         try:
             if is_python:
-                return PythonStdioTransport(
-                    python_cmd=config.get("command", ""),
-                    script_path=script_path,
-                    args=config.get("args", []),
-                    env=config.get("env"),
-                    cwd=config.get("cwd"),
+                return self._buffered(
+                    PythonStdioTransport(
+                        python_cmd=config.command,
+                        script_path=script_path,
+                        args=config.args,
+                        env=config.env,
+                        cwd=config.cwd,
+                    ),
                 )
-            return NodeStdioTransport(
-                node_cmd=config.get("command", ""),
-                script_path=script_path,
-                args=config.get("args", []),
-                env=config.get("env"),
-                cwd=config.get("cwd"),
+            return self._buffered(
+                NodeStdioTransport(
+                    node_cmd=config.command,
+                    script_path=script_path,
+                    args=config.args,
+                    env=config.env,
+                    cwd=config.cwd,
+                ),
             )
         except Exception:
             self._logger.exception("Error creating process transport for '%s'", name)
 
             return None
 
-    async def _create_sse_transport(self, name: str, config: dict[str, Any]) -> SSETransport | None:
+    async def _create_sse_transport(self, name: str, config: ProxyConfig) -> SSETransport | None:
         """Create SSE transport."""
-        url = config.get("url")
+        url = config.url
         if not url:
             self._logger.error("%s: URL not found", name)
             return None
-        return SSETransport(url, headers=config.get("headers", {}))
+        return SSETransport(url, headers=config.headers)
 
-    async def _create_ws_transport(self, name: str, config: dict[str, Any]) -> WSTransport | None:
+    async def _create_ws_transport(self, name: str, config: ProxyConfig) -> WSTransport | None:
         """Create WebSocket transport."""
-        url = config.get("url")
+        url = config.url
         if not url:
             self._logger.error("%s: URL not found", name)
             return None
@@ -203,37 +1030,49 @@ class McpServer:
     async def _create_uvx_transport(
         self,
         name: str,
-        config: dict[str, Any],
-    ) -> UvxStdioTransport | None:
+        config: ProxyConfig,
+    ) -> BufferedStdioTransport | None:
         """Create UVX transport."""
-        tool_name = config.get("tool_name")
+        tool_name = config.tool_name
         if not tool_name:
             self._logger.error("%s: Tool name not found", name)
             return None
-        return UvxStdioTransport(
-            tool_name=tool_name,
-            from_package=config.get("from_package", ""),
-            with_packages=config.get("with_packages", []),
-            tool_args=config.get("args", []),
-            env_vars=config.get("env"),
-            project_directory=config.get("project_directory"),
-            python_version=config.get("python_version"),
+        return self._buffered(
+            UvxStdioTransport(
+                tool_name=tool_name,
+                from_package=config.from_package,
+                with_packages=config.with_packages,
+                tool_args=config.args,
+                env_vars=config.env,
+                project_directory=config.project_directory,
+                python_version=config.python_version,
+            ),
         )
 
     async def _create_npx_transport(
         self,
         name: str,
-        config: dict[str, Any],
-    ) -> NpxStdioTransport | None:
+        config: ProxyConfig,
+    ) -> BufferedStdioTransport | None:
         """Create NPX transport."""
-        package = config.get("package")
+        package = config.package
         if not package:
             self._logger.error("%s: Package not found", name)
             return None
-        return NpxStdioTransport(
-            package=package,
-            args=config.get("args", []),
-            project_directory=config.get("project_directory"),
-            env_vars=config.get("env"),
-            use_package_lock=config.get("use_package_lock", True),
+        return self._buffered(
+            NpxStdioTransport(
+                package=package,
+                args=config.args,
+                project_directory=config.project_directory,
+                env_vars=config.env,
+                use_package_lock=config.use_package_lock,
+            ),
+        )
+
+    def _buffered(self, transport: StdioTransport) -> BufferedStdioTransport:
+        """Run a stdio transport's command with the configured pipe buffer and message queue."""
+        return BufferedStdioTransport(
+            transport,
+            self.server_config.stdio_buffer_limit,
+            self.server_config.stdio_queue_size,
         )
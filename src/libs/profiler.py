@@ -0,0 +1,46 @@
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter[str]:
+    """Sample the stack of every other thread every ``interval`` seconds for ``seconds``.
+
+    Returns:
+        Counter[str]: Number of samples per stack, the thread name first and
+        the innermost frame last, separated by semicolons.
+
+    """
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    me = threading.get_ident()
+    stacks: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():  # noqa: SLF001
+            if thread_id == me:
+                continue
+            if thread_id not in names:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks[";".join([names.get(thread_id, str(thread_id)), *_frames(frame)])] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapse(stacks: Counter[str]) -> str:
+    """Format stacks as collapsed lines ``frame;frame count``, as flamegraph.pl and speedscope read."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _frames(frame: FrameType | None) -> list[str]:
+    """Return the labels of ``frame`` and its callers, outermost first."""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        # 按函数而不是行合并样本,分号是折叠格式的分隔符
+        labels.append(f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(";", ":"))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
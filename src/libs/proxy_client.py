@@ -0,0 +1,219 @@
+import asyncio
+import datetime
+import logging
+from collections.abc import Awaitable
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from types import TracebackType
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import TypeVar
+
+import anyio
+import httpx
+import mcp.types
+from fastmcp import Client
+from mcp.client.session import ClientSession
+from mcp.shared.exceptions import McpError
+
+from src.libs.call_tracker import CallTracker
+
+if TYPE_CHECKING:
+    from src.libs.affinity import SessionPins
+    from src.libs.hedging import Hedger
+    from src.libs.scheduler import CallScheduler
+    from src.libs.supervisor import BackendSupervisor
+
+T = TypeVar("T")
+
+logger = logging.getLogger("mcp_server")
+
+# 发送上游取消通知的最长等待秒数
+CANCEL_NOTIFY_TIMEOUT = 1.0
+# 计为后端过载的传输故障,TimeoutError 与连接错误都是 OSError 的子类
+TRANSPORT_ERRORS = (
+    OSError,
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+)
+
+
+def is_overload(error: BaseException | None) -> bool:
+    """Return True if a call failed in a way that suggests the backend is overloaded.
+
+    Only timeouts and transport failures count. Errors the backend answers
+    with, a backend that is not up yet and cancelled calls do not.
+    """
+    if isinstance(error, McpError):
+        return error.error.code == httpx.codes.REQUEST_TIMEOUT
+    return isinstance(error, TRANSPORT_ERRORS)
+
+
+class ProxyClient(Client):
+    """Upstream client that reports every call to a shared CallTracker.
+
+    ``FastMCPProxy`` wraps each upstream request in ``async with client``,
+    so entering and exiting the client brackets exactly one in-flight call.
+    When a supervisor owns the session, entering only waits for it to be up.
+    With a scheduler, entering also waits for the call's turn to go upstream.
+    With replicas and a hedger, slow idempotent tool calls are also sent to
+    another replica. With pins, each front-end session gets an upstream
+    session of its own. Unless ``cancel_upstream`` is off, a call that is
+    cancelled or times out here is also cancelled upstream, so the backend
+    stops working on it.
+    """
+
+    def __init__(
+        self,
+        transport: Any,  # noqa: ANN401
+        *,
+        name: str,
+        tracker: CallTracker,
+        timeout: float | None = None,
+        cancel_upstream: bool = True,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Initialize the proxy client, with ``timeout`` bounding every forwarded request."""
+        super().__init__(transport=transport, **kwargs)
+        self.name = name
+        self.timeout = timeout
+        self.cancel_upstream = cancel_upstream
+        self._tracker = tracker
+        self.supervisor: BackendSupervisor | None = None
+        self.scheduler: CallScheduler | None = None
+        self.replicas: list[ProxyClient] = []
+        self.hedger: Hedger | None = None
+        self.pins: SessionPins | None = None
+
+    async def __aenter__(self) -> "ProxyClient":
+        """Register the call and open the upstream session."""
+        self._tracker.enter(self.name)
+        try:
+            if self.scheduler:
+                await self.scheduler.acquire()
+            try:
+                if self.supervisor:
+                    await self.supervisor.wait_ready()
+                else:
+                    await super().__aenter__()
+            except BaseException:
+                if self.scheduler:
+                    self.scheduler.release()
+                raise
+        except BaseException:
+            self._tracker.exit(self.name)
+            raise
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        """Close the upstream session and unregister the call."""
+        try:
+            if not self.supervisor:
+                await super().__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            if self.scheduler:
+                self.scheduler.release(dropped=is_overload(exc_val))
+            self._tracker.exit(self.name)
+
+    def pinned(self) -> AbstractAsyncContextManager["ProxyClient"]:
+        """Return the client to enter for one call of the current front-end session.
+
+        That is the session pinned to it when the backend has affinity, and
+        this client otherwise.
+        """
+        return self.pins.session(self) if self.pins else self
+
+    async def call_tool_mcp(
+        self,
+        name: str,
+        arguments: dict[str, Any],
+        timeout: datetime.timedelta | float | None = None,  # noqa: ASYNC109
+    ) -> mcp.types.CallToolResult:
+        """Call a tool, hedging it across replicas when it is configured to."""
+        if self.hedger is None or not self.replicas or not self.hedger.applies(name):
+            return await self._upstream(lambda: Client.call_tool_mcp(self, name, arguments, timeout))
+        return await self.hedger.call(
+            name,
+            [self, *self.replicas],
+            lambda replica: replica.attempt(name, arguments, timeout),
+        )
+
+    async def attempt(
+        self,
+        name: str,
+        arguments: dict[str, Any],
+        timeout: datetime.timedelta | float | None = None,  # noqa: ASYNC109
+    ) -> mcp.types.CallToolResult:
+        """Call a tool on this replica from a hedging task, bypassing the scheduler."""
+        self._tracker.enter(self.name)
+        try:
+            if self.supervisor:
+                await self.supervisor.wait_ready()
+                return await self._upstream(lambda: Client.call_tool_mcp(self, name, arguments, timeout))
+            await Client.__aenter__(self)
+            try:
+                return await self._upstream(lambda: Client.call_tool_mcp(self, name, arguments, timeout))
+            finally:
+                await Client.__aexit__(self, None, None, None)
+        finally:
+            self._tracker.exit(self.name)
+
+    async def read_resource_mcp(self, uri: Any) -> mcp.types.ReadResourceResult:  # noqa: ANN401
+        """Read a resource, cancelling the upstream request if this call is abandoned."""
+        return await self._upstream(lambda: Client.read_resource_mcp(self, uri))
+
+    async def get_prompt_mcp(
+        self,
+        name: str,
+        arguments: dict[str, str] | None = None,
+    ) -> mcp.types.GetPromptResult:
+        """Get a prompt, cancelling the upstream request if this call is abandoned."""
+        return await self._upstream(lambda: Client.get_prompt_mcp(self, name, arguments))
+
+    async def _upstream(self, send: Callable[[], Awaitable[T]]) -> T:
+        """Send one request upstream, and cancel it there if it is abandoned here.
+
+        The session numbers requests from a counter as soon as they are sent,
+        before the first suspension point, so reading the counter right before
+        sending gives this request's id. The counter is private to the MCP
+        SDK; without it the request is still abandoned, only not cancelled
+        upstream. The backend's ``timeout`` bounds the request here rather
+        than in the session, so it never cuts short the session's own
+        handshake.
+        """
+        session = self.session
+        request_id = getattr(session, "_request_id", None)
+        cancel_upstream = self.cancel_upstream and isinstance(request_id, int)
+        async with asyncio.timeout(self.timeout):
+            try:
+                return await send()
+            except asyncio.CancelledError:
+                if cancel_upstream:
+                    await self._cancel_upstream(session, request_id, "abandoned by the gateway")
+                raise
+            except McpError as e:
+                if cancel_upstream and e.error.code == httpx.codes.REQUEST_TIMEOUT:
+                    await self._cancel_upstream(session, request_id, "timed out")
+                raise
+
+    async def _cancel_upstream(self, session: ClientSession, request_id: int, reason: str) -> None:
+        """Tell the backend to stop working on ``request_id``."""
+        notification = mcp.types.CancelledNotification(
+            method="notifications/cancelled",
+            params=mcp.types.CancelledNotificationParams(requestId=request_id, reason=reason),
+        )
+        # 调用方已被取消,屏蔽取消以便通知能发出
+        with anyio.CancelScope(shield=True), anyio.move_on_after(CANCEL_NOTIFY_TIMEOUT):
+            try:
+                await session.send_notification(mcp.types.ClientNotification(notification))
+            except Exception:  # noqa: BLE001
+                logger.debug("Failed to cancel request %s on '%s'", request_id, self.name)
+                return
+        logger.info("Cancelled request %s on '%s': %s", request_id, self.name, reason)
@@ -0,0 +1,188 @@
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from src.libs.i18n import i18n
+from src.models.config_model import ProxyConfig
+from src.models.config_model import ServerConfig
+
+# JSON-RPC server error code used for rate limit and quota rejections
+RATE_LIMITED = -32029
+# 超过该数量后淘汰最久未活动且没有进行中请求的客户端
+MAX_TRACKED_CLIENTS = 10000
+
+
+class RateLimitExceededError(McpError):
+    """Raised when a client goes over its request rate or concurrency quota."""
+
+    def __init__(self, client: str, scope: str, retry_after: float | None) -> None:
+        """Initialize the error.
+
+        Args:
+            client: Identity of the rejected client
+            scope: ``"global"`` or the prefix whose limit was hit
+            retry_after: Seconds until a request would be accepted, None for concurrency quotas
+
+        """
+        if retry_after is None:
+            message = i18n.gettext("Too many concurrent requests ({}), retry later").format(scope)
+        else:
+            message = i18n.gettext("Rate limit exceeded ({}), retry after {:.2f}s").format(scope, retry_after)
+        hint = None if retry_after is None else round(retry_after, 3)
+        super().__init__(ErrorData(code=RATE_LIMITED, message=message, data={"scope": scope, "retry_after": hint}))
+        self.client = client
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Rate and concurrency limits applied to each client."""
+
+    rate: float | None = None
+    burst: int | None = None
+    max_concurrent: int | None = None
+
+    @classmethod
+    def from_config(cls, config: ServerConfig | ProxyConfig) -> "Limit | None":
+        """Build the limit from a config section, or None if it sets no limit."""
+        if config.rate_limit is None and config.max_concurrent_per_client is None:
+            return None
+        return cls(config.rate_limit, config.rate_burst, config.max_concurrent_per_client)
+
+
+class TokenBucket:
+    """Token bucket refilled lazily on each check."""
+
+    __slots__ = ("burst", "rate", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int | None) -> None:
+        """Initialize a full bucket holding ``burst`` tokens refilled at ``rate`` per second."""
+        self.rate = rate
+        self.burst = float(burst if burst is not None else max(1, round(rate)))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Refill the bucket and return the seconds until one token is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ClientState:
+    """Accounting of one client under one limit."""
+
+    __slots__ = ("bucket", "in_flight")
+
+    def __init__(self, limit: Limit) -> None:
+        """Initialize the state for ``limit``."""
+        self.bucket = TokenBucket(limit.rate, limit.burst) if limit.rate else None
+        self.in_flight = 0
+
+
+class RateLimiter:
+    """Token-bucket rate limits and concurrency quotas keyed by client identity.
+
+    A global limit applies to every request of a client, and a per-prefix
+    limit additionally applies to its tool calls on that backend. Each check
+    is a constant number of dict operations; idle clients are evicted in
+    least-recently-used order once ``MAX_TRACKED_CLIENTS`` is reached.
+    """
+
+    def __init__(self, server_config: ServerConfig, proxy_config: dict[str, ProxyConfig]) -> None:
+        """Initialize the limiter from the server and backend configuration."""
+        self.default = Limit.from_config(server_config)
+        self.per_prefix: dict[str, Limit] = {}
+        self._states: OrderedDict[tuple[str, str], ClientState] = OrderedDict()
+        self.configure_backends(proxy_config)
+
+    def configure_backends(self, proxy_config: dict[str, ProxyConfig]) -> None:
+        """Take the per-prefix limits from each backend's config.
+
+        Clients are forgotten under the limits that changed, so they start
+        over with full buckets under the new ones.
+        """
+        per_prefix = {}
+        for config in proxy_config.values():
+            limit = Limit.from_config(config)
+            if limit:
+                per_prefix[config.prefix] = limit
+        changed = {
+            prefix
+            for prefix in per_prefix.keys() | self.per_prefix.keys()
+            if per_prefix.get(prefix) != self.per_prefix.get(prefix)
+        }
+        self.per_prefix = per_prefix
+        for key in [key for key in self._states if key[1] in changed]:
+            del self._states[key]
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if any limit is configured."""
+        return self.default is not None or bool(self.per_prefix)
+
+    @contextmanager
+    def acquire(self, client: str, prefix: str | None = None) -> Iterator[None]:
+        """Admit one request of ``client``, holding a concurrency slot until exit.
+
+        The limit of backend ``prefix`` applies on top of the global one if
+        that backend has its own limit.
+
+        Raises:
+            RateLimitExceededError: If a rate limit or concurrency quota is exceeded.
+
+        """
+        scopes: list[tuple[str, Limit]] = []
+        if self.default:
+            scopes.append(("global", self.default))
+        if prefix in self.per_prefix:
+            scopes.append((prefix, self.per_prefix[prefix]))
+
+        now = time.monotonic()
+        states = []
+        for scope, limit in scopes:
+            state = self._state(client, scope, limit)
+            if limit.max_concurrent is not None and state.in_flight >= limit.max_concurrent:
+                raise RateLimitExceededError(client, scope, None)
+            if state.bucket:
+                wait = state.bucket.wait_time(now)
+                if wait > 0:
+                    raise RateLimitExceededError(client, scope, wait)
+            states.append(state)
+
+        # 所有限制都通过后才扣除令牌,避免一个范围拒绝时消耗另一个范围的配额
+        for state in states:
+            if state.bucket:
+                state.bucket.tokens -= 1
+            state.in_flight += 1
+        try:
+            yield
+        finally:
+            for state in states:
+                state.in_flight -= 1
+
+    def _state(self, client: str, scope: str, limit: Limit) -> ClientState:
+        key = (client, scope)
+        state = self._states.get(key)
+        if state is not None:
+            self._states.move_to_end(key)
+            return state
+        state = self._states[key] = ClientState(limit)
+        if len(self._states) > MAX_TRACKED_CLIENTS:
+            self._evict(key)
+        return state
+
+    def _evict(self, keep: tuple[str, str]) -> None:
+        """Drop the least recently used client that has no request in flight, other than ``keep``."""
+        for key, state in self._states.items():
+            if state.in_flight == 0 and key != keep:
+                del self._states[key]
+                return
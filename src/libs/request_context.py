@@ -0,0 +1,132 @@
+"""Helpers describing the MCP request currently being handled.
+
+They read the lowlevel request context and the HTTP request that carries
+the session, so they work from any code running inside a request handler.
+"""
+
+from collections.abc import Container
+
+from fastmcp.server.dependencies import get_http_request
+from mcp.server.lowlevel.server import request_ctx
+
+from src.libs.i18n import negotiate_language
+
+PRIORITY_CLASSES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = PRIORITY_CLASSES["normal"]
+
+
+def _meta_field(name: str) -> str | None:
+    """Return a field of the current request's ``_meta``, if set."""
+    try:
+        meta = request_ctx.get().meta
+    except LookupError:
+        return None
+    return getattr(meta, name, None) if meta is not None else None
+
+
+def _header(name: str) -> str | None:
+    """Return a header of the HTTP request carrying the session, if any."""
+    try:
+        return get_http_request().headers.get(name)
+    except RuntimeError:
+        return None
+
+
+def request_locale() -> str | None:
+    """Return the locale negotiated for the MCP request being handled.
+
+    A ``locale`` field in the request's ``_meta`` wins over the
+    ``Accept-Language`` header of the HTTP request that carries the session.
+    """
+    return negotiate_language(_meta_field("locale") or _header("accept-language"))
+
+
+def client_identity(header: str, keys: Container[str]) -> str:
+    """Identify the client of the current MCP request.
+
+    The value of ``header`` (an API key) is preferred if it is one of
+    ``keys``, then the peer IP of the HTTP request, then the MCP session
+    itself. Unknown keys are ignored, since any client can send a fresh one.
+    """
+    try:
+        request = get_http_request()
+    except RuntimeError:
+        request = None
+    if request is not None:
+        key = request.headers.get(header)
+        if key and key in keys:
+            return f"key:{key}"
+        if request.client:
+            return f"ip:{request.client.host}"
+    try:
+        return f"session:{id(request_ctx.get().session)}"
+    except LookupError:
+        return "anonymous"
+
+
+def request_priority(header: str) -> int:
+    """Return the priority class of the current request, lower is served first.
+
+    A ``priority`` field in the request's ``_meta`` wins over ``header``.
+    Unknown or missing values fall back to ``normal``.
+    """
+    requested = _meta_field("priority") or _header(header)
+    if not requested:
+        return DEFAULT_PRIORITY
+    return PRIORITY_CLASSES.get(str(requested).lower(), DEFAULT_PRIORITY)
+
+
+def settle_cancelled_request() -> bool:
+    """Finish the current request quietly if the client sent notifications/cancelled for it.
+
+    The session answers a cancelled request itself, but the MCP SDK then
+    tries to answer it again and fails on its own assertion, which takes the
+    whole session down. Marking the request unanswered lets the second answer
+    be skipped, as it is for any cancelled request. This relies on private
+    fields of the SDK's session and responder; if they are missing the
+    request is reported as not cancelled.
+
+    Returns:
+        bool: Whether the request was cancelled by the client
+
+    """
+    try:
+        context = request_ctx.get()
+    except LookupError:
+        return False
+    in_flight = getattr(context.session, "_in_flight", None)
+    responder = in_flight.get(context.request_id) if isinstance(in_flight, dict) else None
+    if not getattr(responder, "cancelled", False) or not hasattr(responder, "_completed"):
+        return False
+    responder._completed = False  # noqa: SLF001
+    in_flight.pop(context.request_id, None)
+    return True
+
+
+def request_timeout(header: str) -> float | None:
+    """Return the deadline the client set for the current request, in seconds from now.
+
+    A ``timeout`` field in the request's ``_meta`` wins over the ``header``
+    of the HTTP request that carries the session. Invalid values are ignored.
+    """
+    value = _meta_field("timeout") or _header(header)
+    try:
+        timeout = float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+    return timeout if timeout is not None and timeout > 0 else None
+
+
+async def report_progress(progress: float, total: float | None = None, message: str | None = None) -> None:
+    """Send a progress notification for the current request, if the client asked for progress."""
+    token = _meta_field("progressToken")
+    if token is None:
+        return
+    context = request_ctx.get()
+    await context.session.send_progress_notification(
+        progress_token=token,
+        progress=progress,
+        total=total,
+        message=message,
+        related_request_id=str(context.request_id),
+    )
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Any
+
+from src.libs.supervisor import BackendSupervisor
+from src.utils.procfs import PROC
+from src.utils.procfs import count_fds
+from src.utils.procfs import descendant_pids
+from src.utils.procfs import read_cpu_seconds
+from src.utils.procfs import read_rss
+
+logger = logging.getLogger("mcp_server")
+
+MB = 1024 * 1024
+
+
+@dataclass
+class ResourceUsage:
+    """Resource usage of one backend's process tree at a sample point."""
+
+    pids: list[int]
+    rss_bytes: int
+    cpu_percent: float
+    open_fds: int
+    sampled_at: float
+
+
+class ResourceMonitor:
+    """Periodically sample RSS, CPU and open FDs of each stdio backend via /proc.
+
+    Each backend's usage is the sum over the process it was started as and
+    all of its descendants. A backend with ``max_rss_mb`` set is recycled by
+    its supervisor once its RSS goes over the ceiling.
+    """
+
+    def __init__(self, supervisors: Callable[[], dict[str, BackendSupervisor]], interval: float) -> None:
+        """Initialize the monitor.
+
+        Args:
+            supervisors: Returns the current supervisors keyed by backend name
+            interval: Seconds between two samples
+
+        """
+        self.supervisors = supervisors
+        self.interval = interval
+        self.usage: dict[str, ResourceUsage] = {}
+        self._cpu: dict[int, tuple[float, float]] = {}
+
+    @staticmethod
+    def available() -> bool:
+        """Return True if /proc can be used on this platform."""
+        return (PROC / "self" / "stat").exists()
+
+    async def run(self) -> None:
+        """Sample forever, until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Failed to sample backend resource usage")
+
+    def sample(self) -> None:
+        """Take one sample of every running backend and enforce memory ceilings."""
+        now = time.monotonic()
+        seen: set[int] = set()
+        supervisors = self.supervisors()
+        for name, supervisor in supervisors.items():
+            if not supervisor.pids:
+                self.usage.pop(supervisor.prefix, None)
+                continue
+            pids = set(supervisor.pids)
+            for pid in supervisor.pids:
+                pids |= descendant_pids(pid)
+            seen |= pids
+
+            usage = ResourceUsage(
+                pids=sorted(pids),
+                rss_bytes=sum(read_rss(pid) for pid in pids),
+                cpu_percent=round(sum(self._cpu_percent(pid, now) for pid in pids), 1),
+                open_fds=sum(count_fds(pid) for pid in pids),
+                sampled_at=time.time(),
+            )
+            self.usage[supervisor.prefix] = usage
+
+            limit = supervisor.max_rss_mb
+            if limit and usage.rss_bytes > limit * MB:
+                reason = f"rss {usage.rss_bytes / MB:.0f}MB exceeded max_rss_mb={limit}"
+                if supervisor.recycle(reason):
+                    logger.warning("Recycling backend '%s': %s", name, reason)
+
+        # 清理已关闭的后端(如已释放的固定会话)与已退出进程的采样
+        for prefix in self.usage.keys() - {supervisor.prefix for supervisor in supervisors.values()}:
+            del self.usage[prefix]
+        for pid in self._cpu.keys() - seen:
+            del self._cpu[pid]
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return the latest usage of each backend, keyed by prefix."""
+        return {prefix: asdict(usage) for prefix, usage in self.usage.items()}
+
+    def _cpu_percent(self, pid: int, now: float) -> float:
+        """Return CPU usage of ``pid`` since its previous sample, in percent of one core."""
+        cpu = read_cpu_seconds(pid)
+        previous = self._cpu.get(pid)
+        self._cpu[pid] = (now, cpu)
+        if previous is None or now <= previous[0]:
+            return 0.0
+        return (cpu - previous[1]) / (now - previous[0]) * 100
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import logging
+from collections import Counter
+from typing import Any
+
+from mcp.types import CallToolResult
+
+from src.libs.json_codec import dump_model
+from src.libs.json_codec import load_model
+from src.libs.routing import Route
+from src.libs.shared_store import StoreCache
+from src.libs.shared_store import StoreError
+from src.models.config_model import ProxyConfig
+
+logger = logging.getLogger("mcp_server")
+
+
+class ResultCache:
+    """Share successful results of cacheable tool calls between gateway nodes.
+
+    A result is keyed by the backend's prefix, the digest of its catalog and
+    a digest of the tool and arguments, so a node whose backend lists
+    different tools never reads results of another version, and a catalog
+    change starts from an empty cache without deleting anything. The store
+    being unavailable only turns the cache off for that call.
+    """
+
+    def __init__(self, store: StoreCache, proxy_config: dict[str, ProxyConfig]) -> None:
+        """Initialize the cache from each backend's ``cache_tools`` and ``cache_ttl``."""
+        self.store = store
+        self.tools: dict[str, set[str]] = {}
+        self.ttls: dict[str, float] = {}
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.configure(proxy_config)
+
+    def configure(self, proxy_config: dict[str, ProxyConfig]) -> None:
+        """Take the cached tools and TTLs from each backend's config."""
+        self.tools = {config.prefix: set(config.cache_tools) for config in proxy_config.values() if config.cache_tools}
+        self.ttls = {config.prefix: config.cache_ttl for config in proxy_config.values()}
+
+    def applies(self, route: Route) -> bool:
+        """Return True if results of the tool behind ``route`` may be cached."""
+        tools = self.tools.get(route.prefix)
+        return bool(tools) and ("*" in tools or route.target in tools)
+
+    async def get(self, route: Route, digest: str, arguments: dict[str, Any]) -> CallToolResult | None:
+        """Return the cached result of a call, if any."""
+        try:
+            value = await self.store.get(self._key(route, digest, arguments))
+        except (StoreError, OSError) as e:
+            logger.warning("Result cache unavailable for '%s': %s", route.prefix, e)
+            return None
+        if value is None:
+            self.misses[route.prefix] += 1
+            return None
+        self.hits[route.prefix] += 1
+        return load_model(CallToolResult, value)
+
+    async def put(self, route: Route, digest: str, arguments: dict[str, Any], result: CallToolResult) -> None:
+        """Cache a successful result for the backend's ``cache_ttl``."""
+        if result.isError:
+            return
+        try:
+            await self.store.set(
+                self._key(route, digest, arguments),
+                dump_model(result, exclude_none=True),
+                self.ttls.get(route.prefix),
+            )
+        except (StoreError, OSError) as e:
+            logger.warning("Result cache unavailable for '%s': %s", route.prefix, e)
+
+    def status(self, prefix: str) -> dict[str, int]:
+        """Return the hits and misses of one backend."""
+        return {"hits": self.hits[prefix], "misses": self.misses[prefix]}
+
+    @staticmethod
+    def _key(route: Route, digest: str, arguments: dict[str, Any]) -> str:
+        payload = json.dumps([route.target, arguments], sort_keys=True, default=str)
+        return f"result:{route.prefix}:{digest}:{hashlib.sha256(payload.encode()).hexdigest()}"
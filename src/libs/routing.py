@@ -0,0 +1,163 @@
+import hashlib
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass
+from dataclasses import field
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+from fastmcp.prompts import Prompt as FastMCPPrompt
+from fastmcp.resources import Resource as FastMCPResource
+from fastmcp.tools import Tool as FastMCPTool
+from mcp.types import Prompt
+from mcp.types import Resource
+from mcp.types import Tool
+
+from src.libs.tool_index import ToolIndex
+
+if TYPE_CHECKING:
+    from src.libs.proxy_client import ProxyClient
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    """Where a prefixed name is served: the backend and its own name for it."""
+
+    prefix: str
+    client: "ProxyClient"
+    target: str
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """The tools, resources and prompts of one backend, keyed by prefixed name.
+
+    The MCP listings are converted once when the catalog is built, so list
+    requests only concatenate the listings of every backend.
+    """
+
+    prefix: str
+    tools: dict[str, Route] = field(default_factory=dict)
+    resources: dict[str, Route] = field(default_factory=dict)
+    prompts: dict[str, Route] = field(default_factory=dict)
+    tool_list: list[Tool] = field(default_factory=list)
+    resource_list: list[Resource] = field(default_factory=list)
+    prompt_list: list[Prompt] = field(default_factory=list)
+
+    @classmethod
+    def build(
+        cls,
+        prefix: str,
+        client: "ProxyClient | None",
+        tools: Mapping[str, FastMCPTool],
+        resources: Mapping[str, FastMCPResource],
+        prompts: Mapping[str, FastMCPPrompt],
+    ) -> "Catalog":
+        """Build a catalog from FastMCP components keyed by prefixed name.
+
+        Without a client, the components are listed but not routed, and
+        requests for them are left to FastMCP.
+        """
+        catalog = cls(prefix)
+        for key, tool in tools.items():
+            catalog.tool_list.append(tool.to_mcp_tool(name=key))
+            if client:
+                catalog.tools[key] = Route(prefix, client, tool.name)
+        for key, resource in resources.items():
+            catalog.resource_list.append(resource.to_mcp_resource(uri=key))
+            if client:
+                catalog.resources[key] = Route(prefix, client, str(resource.uri))
+        for key, prompt in prompts.items():
+            catalog.prompt_list.append(prompt.to_mcp_prompt(name=key))
+            if client:
+                catalog.prompts[key] = Route(prefix, client, prompt.name)
+        return catalog
+
+    @cached_property
+    def digest(self) -> str:
+        """Fingerprint of the listings, equal on every node listing the same components."""
+        listings = [
+            item.model_dump(mode="json", exclude_none=True)
+            for item in (*self.tool_list, *self.resource_list, *self.prompt_list)
+        ]
+        return hashlib.sha256(json.dumps(listings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class RoutingSnapshot:
+    """An immutable view of every backend's routes and listings.
+
+    Request handlers read ``RoutingTable.snapshot`` once and use that view
+    for the whole request, so a concurrent reload never shows them a
+    half-updated table.
+    """
+
+    version: int = 0
+    tools: Mapping[str, Route] = field(default_factory=dict)
+    resources: Mapping[str, Route] = field(default_factory=dict)
+    prompts: Mapping[str, Route] = field(default_factory=dict)
+    tool_list: list[Tool] = field(default_factory=list)
+    resource_list: list[Resource] = field(default_factory=list)
+    prompt_list: list[Prompt] = field(default_factory=list)
+
+
+class RoutingTable:
+    """Copy-on-write index from prefixed names to the backend serving them.
+
+    Lookups are single dict reads on the current snapshot. Updating one
+    backend copies the previous snapshot's maps, replaces only that
+    backend's entries and swaps the new snapshot in with one assignment.
+    The search index of the tools is updated the same way, one backend at
+    a time.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty table."""
+        self.snapshot = RoutingSnapshot()
+        self.index = ToolIndex()
+        self._catalogs: dict[str, Catalog] = {}
+
+    def update(self, catalog: Catalog) -> RoutingSnapshot:
+        """Add or replace the catalog of one backend."""
+        previous = self._catalogs.get(catalog.prefix)
+        self._catalogs[catalog.prefix] = catalog
+        if previous is None or previous.tool_list != catalog.tool_list:
+            self.index.update(catalog.prefix, catalog.tool_list)
+        return self._swap(previous, catalog)
+
+    def remove(self, prefix: str) -> RoutingSnapshot:
+        """Drop the catalog of one backend."""
+        previous = self._catalogs.pop(prefix, None)
+        self.index.remove(prefix)
+        return self._swap(previous, None)
+
+    def catalog(self, prefix: str) -> Catalog | None:
+        """Return the current catalog of backend ``prefix``."""
+        return self._catalogs.get(prefix)
+
+    def backend_of(self, tool_name: str) -> str | None:
+        """Return the prefix of the backend serving ``tool_name``."""
+        route = self.snapshot.tools.get(tool_name)
+        return route.prefix if route else None
+
+    def _swap(self, previous: Catalog | None, current: Catalog | None) -> RoutingSnapshot:
+        old = self.snapshot
+        maps = {}
+        for kind in ("tools", "resources", "prompts"):
+            routes = dict(getattr(old, kind))
+            if previous:
+                for key in getattr(previous, kind):
+                    routes.pop(key, None)
+            if current:
+                routes.update(getattr(current, kind))
+            maps[kind] = routes
+
+        catalogs = self._catalogs.values()
+        self.snapshot = RoutingSnapshot(
+            version=old.version + 1,
+            tool_list=[tool for catalog in catalogs for tool in catalog.tool_list],
+            resource_list=[resource for catalog in catalogs for resource in catalog.resource_list],
+            prompt_list=[prompt for catalog in catalogs for prompt in catalog.prompt_list],
+            **maps,
+        )
+        return self.snapshot
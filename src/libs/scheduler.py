@@ -0,0 +1,171 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import Callable
+from typing import Any
+
+from src.libs.adaptive_limit import ConcurrencyLimit
+from src.libs.request_context import request_priority
+
+# 流的完成标签数量超过该值时,清理已落后于虚拟时间的流
+PRUNE_THRESHOLD = 1024
+
+
+class FairScheduler:
+    """Admit at most ``capacity`` concurrent calls, queueing the rest fairly.
+
+    Queued calls are served by priority class first. Within a class, calls are
+    ordered by start-time fair queuing over flows (clients or prefixes): each
+    call of a flow with weight ``w`` advances that flow's tag by ``1 / w``, so
+    a flow flooding the queue cannot starve the others. Calls are only queued
+    once the scheduler is saturated.
+
+    Admission is keyed by task, so nested acquisitions in one call hold a
+    single slot. With an adaptive ``limit``, the capacity follows the limit,
+    which learns from the time each call held its slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        weight: Callable[[str], float],
+        limit: ConcurrencyLimit | None = None,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            name: Name used in status output
+            capacity: Maximum number of calls admitted at once
+            weight: Returns the weight of a flow, higher gets a larger share
+            limit: Adaptive limit replacing ``capacity`` as calls finish
+
+        """
+        self.name = name
+        self.capacity = limit.capacity if limit else capacity
+        self.weight = weight
+        self.limit = limit
+        self.in_flight = 0
+        self._held: dict[asyncio.Task, int] = {}
+        self._admitted: dict[asyncio.Task, float] = {}
+        self._queue: list[tuple[int, float, int, asyncio.Future]] = []
+        self._finish: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    async def acquire(self, flow: str, priority: int) -> None:
+        """Wait until the current task is admitted."""
+        task = asyncio.current_task()
+        if task in self._held:
+            self._held[task] += 1
+            return
+
+        start = self._tag(flow)
+        if self.in_flight < self.capacity and not self._queue:
+            self._virtual_time = start
+            self._admit(task)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, start, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 已被放行但随即取消时,归还名额
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+        self._held[task] = 1
+        self._admitted[task] = time.monotonic()
+
+    def release(self, *, dropped: bool = False) -> None:
+        """Release the slot held by the current task, whose call failed when ``dropped``."""
+        task = asyncio.current_task()
+        count = self._held.get(task)
+        if count is None:
+            return
+        if count > 1:
+            self._held[task] = count - 1
+            return
+        del self._held[task]
+        admitted = self._admitted.pop(task)
+        if self.limit:
+            self.capacity = self.limit.sample(time.monotonic() - admitted, self.in_flight, dropped)
+        self.in_flight -= 1
+        self._dispatch()
+
+    def status(self) -> dict[str, Any]:
+        """Return capacity, admitted and queued call counts."""
+        queued = sum(1 for *_, future in self._queue if not future.done())
+        status = {"capacity": self.capacity, "in_flight": self.in_flight, "queued": queued}
+        if self.limit:
+            status["adaptive"] = self.limit.status()
+        return status
+
+    def _tag(self, flow: str) -> float:
+        """Assign the start tag of a new call of ``flow`` and advance its finish tag."""
+        start = max(self._virtual_time, self._finish.get(flow, 0.0))
+        self._finish[flow] = start + 1 / max(self.weight(flow), 1e-6)
+        if len(self._finish) > PRUNE_THRESHOLD:
+            self._finish = {f: tag for f, tag in self._finish.items() if tag > self._virtual_time}
+        return start
+
+    def _admit(self, task: asyncio.Task) -> None:
+        self.in_flight += 1
+        self._held[task] = 1
+        self._admitted[task] = time.monotonic()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the head of the queue, skipping cancelled waiters."""
+        while self._queue and self.in_flight < self.capacity:
+            _, start, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._virtual_time = max(self._virtual_time, start)
+            self.in_flight += 1
+            future.set_result(None)
+
+
+class CallScheduler:
+    """Admit one backend's upstream calls through its own and the server-wide scheduler.
+
+    The per-backend scheduler shares the backend fairly between clients, and
+    the server-wide scheduler shares the aggregator fairly between prefixes.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        backend: FairScheduler | None,
+        shared: FairScheduler | None,
+        identify: Callable[[], str],
+        priority_header: str,
+    ) -> None:
+        """Initialize the call scheduler of backend ``prefix``."""
+        self.prefix = prefix
+        self.backend = backend
+        self.shared = shared
+        self.identify = identify
+        self.priority_header = priority_header
+
+    async def acquire(self) -> None:
+        """Wait until the current call may be sent upstream."""
+        priority = request_priority(self.priority_header)
+        if self.backend:
+            await self.backend.acquire(self.identify(), priority)
+        if self.shared:
+            try:
+                await self.shared.acquire(self.prefix, priority)
+            except BaseException:
+                if self.backend:
+                    self.backend.release()
+                raise
+
+    def release(self, *, dropped: bool = False) -> None:
+        """Release the slots held by the current call, which failed when ``dropped``."""
+        if self.shared:
+            self.shared.release()
+        if self.backend:
+            self.backend.release(dropped=dropped)
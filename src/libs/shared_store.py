@@ -0,0 +1,365 @@
+import asyncio
+import contextlib
+import json
+import logging
+import time
+import uuid
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import Any
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("mcp_server")
+
+# 订阅连接断开后重连的最长等待秒数
+RESUBSCRIBE_BACKOFF_MAX = 30.0
+INVALIDATION_CHANNEL = "invalidate"
+
+
+class StoreError(Exception):
+    """The shared store rejected a command or could not be reached."""
+
+
+class SharedStore(ABC):
+    """Key-value store with publish/subscribe shared by every gateway node.
+
+    Values are bytes with an optional time to live. Messages published on a
+    channel reach every subscriber of that channel, on this node and others.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Return the value of ``key``, or None when it is missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Set ``key``, expiring after ``ttl`` seconds when given."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Remove ``keys``."""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: bytes) -> None:
+        """Send ``message`` to every subscriber of ``channel``."""
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """Yield the messages published on ``channel`` from now on."""
+
+    async def close(self) -> None:  # noqa: B027
+        """Release the store's connections."""
+
+
+class MemoryStore(SharedStore):
+    """Store kept in this process, for a single node or for tests."""
+
+    def __init__(self) -> None:
+        """Initialize an empty store."""
+        self._values: dict[str, tuple[bytes, float | None]] = {}
+        self._subscribers: dict[str, set[asyncio.Queue[bytes]]] = defaultdict(set)
+
+    async def get(self, key: str) -> bytes | None:
+        """Return the value of ``key``, or None when it is missing or expired."""
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Set ``key``, expiring after ``ttl`` seconds when given."""
+        self._values[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    async def delete(self, *keys: str) -> None:
+        """Remove ``keys``."""
+        for key in keys:
+            self._values.pop(key, None)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        """Send ``message`` to every subscriber of ``channel``."""
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """Yield the messages published on ``channel`` from now on."""
+        queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self._subscribers[channel].add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].discard(queue)
+
+
+class RespStore(SharedStore):
+    """Store on a server speaking the Redis protocol, such as Redis or Valkey.
+
+    Commands are spread over a pool of up to ``pool_size`` connections,
+    each carrying one command at a time, so a slow reply only holds up the
+    commands queued behind it once every connection is busy. Each
+    subscription holds a connection of its own, reconnecting with backoff
+    when it drops. Messages published while it is down are lost.
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0, pool_size: int = 8) -> None:
+        """Initialize the store.
+
+        Args:
+            url: ``redis://[:password@]host[:port][/db]``
+            timeout: Seconds to wait for a connection or a reply
+            pool_size: Maximum connections open for commands
+
+        """
+        parts = urlsplit(url)
+        if parts.scheme != "redis":
+            msg = f"Unsupported store URL scheme '{parts.scheme}'"
+            raise ValueError(msg)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.strip("/") or 0)
+        self.timeout = timeout
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max(1, pool_size))
+
+    async def get(self, key: str) -> bytes | None:
+        """Return the value of ``key``, or None when it is missing or expired."""
+        return await self._command("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Set ``key``, expiring after ``ttl`` seconds when given."""
+        if ttl:
+            await self._command("SET", key, value, "PX", max(1, int(ttl * 1000)))
+        else:
+            await self._command("SET", key, value)
+
+    async def delete(self, *keys: str) -> None:
+        """Remove ``keys``."""
+        if keys:
+            await self._command("DEL", *keys)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        """Send ``message`` to every subscriber of ``channel``."""
+        await self._command("PUBLISH", channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """Yield the messages published on ``channel`` from now on."""
+        backoff = 1.0
+        while True:
+            try:
+                reader, writer = await self._connect()
+            except (OSError, TimeoutError, StoreError) as e:
+                logger.warning("Cannot subscribe to '%s' on %s:%s: %s", channel, self.host, self.port, e)
+            else:
+                try:
+                    writer.write(encode_command("SUBSCRIBE", channel))
+                    await writer.drain()
+                    while True:
+                        reply = await read_reply(reader)
+                        if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":  # noqa: PLR2004
+                            backoff = 1.0
+                            yield reply[2]
+                except (OSError, asyncio.IncompleteReadError, StoreError) as e:
+                    logger.warning("Subscription to '%s' dropped, resubscribing: %s", channel, e)
+                finally:
+                    writer.close()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RESUBSCRIBE_BACKOFF_MAX)
+
+    async def close(self) -> None:
+        """Close the idle command connections."""
+        self._disconnect()
+
+    def _disconnect(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            if self.password:
+                writer.write(encode_command("AUTH", self.password))
+                await asyncio.wait_for(read_reply(reader), self.timeout)
+            if self.db:
+                writer.write(encode_command("SELECT", self.db))
+                await asyncio.wait_for(read_reply(reader), self.timeout)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _command(self, *args: str | bytes | int) -> Any:  # noqa: ANN401
+        async with self._slots:
+            # 连接断开后重连一次再重试
+            for attempt in range(2):
+                connection = self._idle.pop() if self._idle else None
+                try:
+                    if connection is None:
+                        connection = await self._connect()
+                    reader, writer = connection
+                    writer.write(encode_command(*args))
+                    await writer.drain()
+                    reply = await asyncio.wait_for(read_reply(reader), self.timeout)
+                except (OSError, asyncio.IncompleteReadError, TimeoutError) as e:
+                    # 服务器断开后其余空闲连接多半也已失效,一并关闭
+                    if connection:
+                        connection[1].close()
+                    self._disconnect()
+                    if attempt:
+                        msg = f"Store {self.host}:{self.port} unavailable: {e}"
+                        raise StoreError(msg) from e
+                except BaseException:
+                    # 包括取消,未读取的应答会错配给下一条命令,因此丢弃连接
+                    if connection:
+                        connection[1].close()
+                    raise
+                else:
+                    self._idle.append(connection)
+                    return reply
+        return None
+
+
+def encode_command(*args: str | bytes | int) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:  # noqa: ANN401
+    """Read one RESP reply, raising StoreError for error replies."""
+    line = (await reader.readuntil(b"\r\n"))[:-2]
+    kind, rest = line[:1], line[1:]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise StoreError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        return None if size < 0 else (await reader.readexactly(size + 2))[:-2]
+    if kind == b"*":
+        size = int(rest)
+        return None if size < 0 else [await read_reply(reader) for _ in range(size)]
+    msg = f"Unexpected reply {line[:32]!r}"
+    raise StoreError(msg)
+
+
+def create_store(url: str | None, pool_size: int = 8) -> SharedStore:
+    """Return the store at ``url``, or one kept in this process when it is None."""
+    return RespStore(url, pool_size=pool_size) if url else MemoryStore()
+
+
+class StoreCache:
+    """Shared store with a small local cache in front of it.
+
+    Reads are answered from the local cache while its entry is younger than
+    ``l1_ttl``. Writes go to the shared store and then tell every other node
+    to drop the keys from its local cache, and ``run`` applies what the other
+    nodes announce. ``l1_ttl`` bounds how stale a read can be when an
+    announcement is lost. Keys are namespaced so gateways can share a server.
+    """
+
+    def __init__(self, store: SharedStore, namespace: str, l1_size: int = 1024, l1_ttl: float = 5.0) -> None:
+        """Initialize the cache.
+
+        Args:
+            store: Shared store holding the entries
+            namespace: Prefix of every key and channel of this gateway
+            l1_size: Maximum entries cached locally
+            l1_ttl: Seconds a local entry is used before reading the store again
+
+        """
+        self.store = store
+        self.namespace = namespace
+        self.l1_size = l1_size
+        self.l1_ttl = l1_ttl
+        self.node = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self._l1: OrderedDict[str, tuple[bytes | None, float]] = OrderedDict()
+        self._listeners: list[tuple[str, Callable[[str], Awaitable[None]]]] = []
+
+    async def get(self, key: str) -> bytes | None:
+        """Return the value of ``key``, from the local cache when it is fresh."""
+        entry = self._l1.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._l1.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        value = await self.store.get(self._key(key))
+        self._remember(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Set ``key`` on every node."""
+        await self.store.set(self._key(key), value, ttl)
+        self._remember(key, value, ttl)
+        await self._announce(key)
+
+    async def delete(self, *keys: str) -> None:
+        """Remove ``keys`` on every node."""
+        await self.store.delete(*(self._key(key) for key in keys))
+        for key in keys:
+            self._l1.pop(key, None)
+        await self._announce(*keys)
+
+    def on_invalidate(self, prefix: str, listener: Callable[[str], Awaitable[None]]) -> None:
+        """Call ``listener`` with every key under ``prefix`` that another node changes."""
+        self._listeners.append((prefix, listener))
+
+    async def run(self) -> None:
+        """Drop the local entries that other nodes change, until cancelled."""
+        async for message in self.store.subscribe(self._key(INVALIDATION_CHANNEL)):
+            try:
+                announcement = json.loads(message)
+            except ValueError:
+                continue
+            if announcement.get("node") == self.node:
+                continue
+            for key in announcement.get("keys", []):
+                self._l1.pop(key, None)
+                for prefix, listener in self._listeners:
+                    if key.startswith(prefix):
+                        try:
+                            await listener(key)
+                        except Exception:
+                            logger.exception("Invalidation listener failed for '%s'", key)
+
+    def status(self) -> dict[str, Any]:
+        """Return local cache statistics."""
+        return {"node": self.node, "entries": len(self._l1), "hits": self.hits, "misses": self.misses}
+
+    async def close(self) -> None:
+        """Close the shared store."""
+        with contextlib.suppress(Exception):
+            await self.store.close()
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _remember(self, key: str, value: bytes | None, ttl: float | None = None) -> None:
+        # 本地条目不能比共享存储中的条目活得更久
+        lifetime = min(self.l1_ttl, ttl) if ttl else self.l1_ttl
+        self._l1[key] = (value, time.monotonic() + lifetime)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_size:
+            self._l1.popitem(last=False)
+
+    async def _announce(self, *keys: str) -> None:
+        message = json.dumps({"node": self.node, "keys": list(keys)}).encode()
+        await self.store.publish(self._key(INVALIDATION_CHANNEL), message)
@@ -0,0 +1,136 @@
+import asyncio
+import contextlib
+import logging
+import signal
+import sys
+from collections.abc import AsyncIterator
+from typing import Any
+
+import anyio
+import mcp.types
+from fastmcp.client.transports import ClientTransport
+from fastmcp.client.transports import StdioTransport
+from mcp.client.session import ClientSession
+from mcp.client.stdio import get_default_environment
+from mcp.shared.message import SessionMessage
+
+from src.libs.json_codec import dump_model
+from src.libs.json_codec import load_model
+
+logger = logging.getLogger("mcp_server")
+
+# 关闭时等待后端进程退出的秒数,超时后强制结束
+TERMINATE_TIMEOUT = 5.0
+
+
+class BufferedStdioTransport(ClientTransport):
+    """Stdio transport of a backend with tunable buffers.
+
+    It runs the command of a fastmcp stdio transport, but reads whole lines
+    from a pipe buffered up to ``buffer_limit`` bytes instead of re-splitting
+    a growing string for every chunk, and queues up to ``queue_size``
+    messages each way instead of handing each one over in lockstep. A
+    message longer than ``buffer_limit`` is dropped with an error.
+    """
+
+    def __init__(self, transport: StdioTransport, buffer_limit: int, queue_size: int) -> None:
+        """Initialize the transport.
+
+        Args:
+            transport: fastmcp stdio transport whose command, arguments, environment and directory are run
+            buffer_limit: Maximum size of one message in bytes, and the pipe buffer size
+            queue_size: Messages queued each way between the pipe and the session
+
+        """
+        self.command = transport.command
+        self.args = transport.args
+        self.env = transport.env
+        self.cwd = transport.cwd
+        self.buffer_limit = buffer_limit
+        self.queue_size = queue_size
+
+    @contextlib.asynccontextmanager
+    async def connect_session(self, **session_kwargs: Any) -> AsyncIterator[ClientSession]:  # noqa: ANN401
+        """Start the backend and yield an initialized session on its stdio."""
+        async with (
+            self._streams() as (read_stream, write_stream),
+            ClientSession(read_stream, write_stream, **session_kwargs) as session,
+        ):
+            await session.initialize()
+            yield session
+
+    @contextlib.asynccontextmanager
+    async def _streams(self) -> AsyncIterator[tuple[Any, Any]]:
+        """Start the process and relay its stdout and stdin through message streams."""
+        read_writer, read_stream = anyio.create_memory_object_stream[SessionMessage | Exception](self.queue_size)
+        write_stream, write_reader = anyio.create_memory_object_stream[SessionMessage](self.queue_size)
+        env = {**get_default_environment(), **self.env} if self.env is not None else get_default_environment()
+        process = await asyncio.create_subprocess_exec(
+            self.command,
+            *self.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=sys.stderr,
+            env=env,
+            cwd=self.cwd,
+            limit=self.buffer_limit,
+        )
+
+        async def read_messages() -> None:
+            async with read_writer:
+                while True:
+                    try:
+                        line = await process.stdout.readline()
+                    except ValueError as e:
+                        # 超长的消息已被丢弃,对应的请求只能等待超时
+                        logger.error("Dropped a message over stdio_buffer_limit from '%s': %s", self.command, e)  # noqa: TRY400
+                        await read_writer.send(e)
+                        continue
+                    if not line:
+                        return
+                    try:
+                        message = load_model(mcp.types.JSONRPCMessage, line)
+                    except Exception as e:  # noqa: BLE001
+                        await read_writer.send(e)
+                        continue
+                    await read_writer.send(SessionMessage(message))
+
+        async def write_messages() -> None:
+            async with write_reader:
+                async for session_message in write_reader:
+                    data = dump_model(session_message.message, by_alias=True, exclude_none=True)
+                    process.stdin.write(data + b"\n")
+                    try:
+                        await process.stdin.drain()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # 后端已退出,由读取端结束会话
+                        return
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(read_messages)
+            tg.start_soon(write_messages)
+            try:
+                yield read_stream, write_stream
+            finally:
+                tg.cancel_scope.cancel()
+                await read_stream.aclose()
+                await write_stream.aclose()
+                with anyio.CancelScope(shield=True):
+                    await self._terminate(process)
+
+    @staticmethod
+    async def _terminate(process: asyncio.subprocess.Process) -> None:
+        """Stop the backend, killing it if it ignores SIGTERM."""
+        if process.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                process.send_signal(signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+        except TimeoutError:
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+            await process.wait()
+
+    def __repr__(self) -> str:
+        """Return the command the transport runs."""
+        return f"<{self.__class__.__name__}(command='{self.command}', args={self.args})>"
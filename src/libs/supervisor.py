@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any
+
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+from mcp.types import INTERNAL_ERROR
+from mcp.types import ErrorData
+from mcp.types import JSONRPCError
+
+from src.libs.i18n import i18n
+from src.models.config_model import ProxyConfig
+from src.utils.procfs import child_pids
+from src.utils.procfs import is_alive
+
+logger = logging.getLogger("mcp_server")
+
+
+class BackendUnavailableError(ToolError):
+    """Raised when a supervised backend has no live session."""
+
+    def __init__(self, name: str, state: str) -> None:
+        """Initialize the error for backend ``name`` in ``state``."""
+        super().__init__(i18n.gettext("Backend '{}' is unavailable ({})").format(name, state))
+        self.name = name
+        self.state = state
+
+
+class BackendSupervisor:
+    """Own the upstream session of a stdio backend and restart it when it dies.
+
+    The supervisor task is the only place the session is opened and closed,
+    so a restart swaps the session inside the same ``Client`` object and the
+    proxy objects already imported into the main server keep working.
+    """
+
+    # 串行化子进程启动,以便通过 /proc 的子进程差集识别新进程的 PID
+    _spawn_lock = asyncio.Lock()
+
+    def __init__(self, name: str, client: Client, config: ProxyConfig) -> None:
+        """Initialize the supervisor.
+
+        Args:
+            name: Backend name from ``[mcpServers.<name>]``
+            client: Client whose session is supervised
+            config: Backend configuration
+
+        """
+        self.name = name
+        self.prefix: str = config.prefix
+        self.client = client
+        self.max_rss_mb: float | None = config.max_rss_mb
+        self.health_interval: float = config.health_interval
+        self.max_restarts: int = config.max_restarts
+        self.restart_window: float = config.restart_window
+        self.backoff: float = config.restart_backoff
+        self.backoff_max: float = config.restart_backoff_max
+
+        self.state: str = "stopped"
+        self.pids: set[int] = set()
+        self.restart_count: int = 0
+        self.last_exit_reason: str | None = None
+        self._restart_times: list[float] = []
+        self._ready = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._recycle = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self, start_timeout: float) -> bool:
+        """Start supervising and wait for the first session.
+
+        Returns:
+            bool: True if the backend came up within ``start_timeout`` seconds.
+
+        """
+        self._task = asyncio.create_task(self._run(), name=f"supervisor:{self.name}")
+        try:
+            await asyncio.wait_for(self._ready.wait(), start_timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    async def stop(self, close_timeout: float) -> None:
+        """Close the session and stop restarting it."""
+        self._stopping.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), close_timeout)
+        except TimeoutError:
+            logger.error("Timed out closing '%s' after %.1fs", self.name, close_timeout)  # noqa: TRY400
+            self._task.cancel()
+
+    def recycle(self, reason: str) -> bool:
+        """Request a restart of a live backend, e.g. when it exceeds a resource limit.
+
+        Returns:
+            bool: False if the backend is not running or a restart is already pending.
+
+        """
+        if not self._ready.is_set() or self._recycle.is_set():
+            return False
+        self.last_exit_reason = reason
+        self._recycle.set()
+        return True
+
+    async def wait_ready(self) -> None:
+        """Wait until a session is available, raising if the backend is down."""
+        if self._ready.is_set():
+            return
+        if self.state in ("failed", "stopped"):
+            raise BackendUnavailableError(self.name, self.state)
+        try:
+            await asyncio.wait_for(self._ready.wait(), self.backoff_max)
+        except TimeoutError:
+            raise BackendUnavailableError(self.name, self.state) from None
+
+    def status(self) -> dict[str, Any]:
+        """Return supervision details for this backend."""
+        return {
+            "state": self.state,
+            "pids": sorted(self.pids),
+            "restart_count": self.restart_count,
+            "last_exit_reason": self.last_exit_reason,
+        }
+
+    async def _run(self) -> None:
+        consecutive = 0
+        while not self._stopping.is_set():
+            self.state = "starting" if self.restart_count == 0 else "restarting"
+            started = time.monotonic()
+            reason = await self._run_session()
+            if self._stopping.is_set():
+                break
+
+            self.restart_count += 1
+            self.last_exit_reason = reason
+            now = time.monotonic()
+            # 会话稳定运行超过最大退避时间后,重置退避
+            consecutive = 0 if now - started > self.backoff_max else consecutive + 1
+            self._restart_times = [t for t in self._restart_times if now - t < self.restart_window]
+            self._restart_times.append(now)
+            if len(self._restart_times) > self.max_restarts:
+                self.state = "failed"
+                logger.error(
+                    "Backend '%s' crashed %d times within %.0fs, giving up: %s",
+                    self.name,
+                    len(self._restart_times),
+                    self.restart_window,
+                    reason,
+                )
+                return
+
+            delay = min(self.backoff * 2 ** max(consecutive - 1, 0), self.backoff_max)
+            logger.warning("Backend '%s' exited (%s), restarting in %.1fs", self.name, reason, delay)
+            self.state = "backoff"
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except TimeoutError:
+                continue
+        self.state = "stopped"
+
+    async def _run_session(self) -> str:
+        """Open a session, watch it until it dies, and return the exit reason."""
+        async with self._spawn_lock:
+            before = child_pids(os.getpid())
+            try:
+                await Client.__aenter__(self.client)
+            except Exception as e:  # noqa: BLE001
+                return f"start failed: {e!r}"
+            self.pids = child_pids(os.getpid()) - before
+
+        reason = "stopped"
+        try:
+            self.state = "running"
+            self._ready.set()
+            logger.info("Backend '%s' is running (pids: %s)", self.name, sorted(self.pids))
+            reason = await self._watch()
+        finally:
+            self._ready.clear()
+            self.state = "stopping"
+            self._fail_pending(reason)
+            try:
+                await Client.__aexit__(self.client, None, None, None)
+            except Exception:  # noqa: BLE001
+                logger.debug("Error closing session of '%s'", self.name, exc_info=True)
+            self.pids = set()
+        return reason
+
+    async def _watch(self) -> str:
+        """Return once the backend dies, is recycled, or supervision stops."""
+        self._recycle.clear()
+        while True:
+            stop = asyncio.ensure_future(self._stopping.wait())
+            recycle = asyncio.ensure_future(self._recycle.wait())
+            done, _ = await asyncio.wait(
+                {stop, recycle},
+                timeout=self.health_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            stop.cancel()
+            recycle.cancel()
+            if stop in done:
+                return "stopped"
+            if recycle in done:
+                return self.last_exit_reason or "recycled"
+
+            dead = [pid for pid in self.pids if not is_alive(pid)]
+            if dead:
+                return f"process {dead[0]} exited"
+            try:
+                await asyncio.wait_for(self.client.ping(), self.health_interval)
+            except Exception as e:  # noqa: BLE001
+                return f"health check failed: {e!r}"
+
+    def _fail_pending(self, reason: str) -> None:
+        """Answer requests still waiting on the dead session with an error."""
+        session = self.client._session  # noqa: SLF001
+        if session is None:
+            return
+        streams = session._response_streams  # noqa: SLF001
+        for request_id, stream in list(streams.items()):
+            error = ErrorData(code=INTERNAL_ERROR, message=f"Backend '{self.name}' exited: {reason}")
+            try:
+                stream.send_nowait(JSONRPCError(jsonrpc="2.0", id=request_id, error=error))
+            except Exception:  # noqa: BLE001
+                logger.debug("Could not fail pending request %s of '%s'", request_id, self.name)
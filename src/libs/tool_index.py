@@ -0,0 +1,182 @@
+import bisect
+import heapq
+import math
+import re
+from collections import Counter
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Annotated
+from typing import Any
+
+from mcp.types import Tool
+from pydantic import Field
+
+SEARCH_TOOL = "search_tools"
+
+# 各字段中的词在评分时的权重,名称最能说明工具的用途
+FIELD_WEIGHTS = {"name": 3.0, "parameters": 2.0, "description": 1.0}
+# BM25 参数
+K1 = 1.2
+B = 0.75
+# 查询词按前缀匹配索引词时的最短长度,最多展开的索引词数,以及前缀匹配的权重
+MIN_PREFIX = 3
+MAX_EXPANSIONS = 50
+PREFIX_WEIGHT = 0.5
+
+# 驼峰与下划线分隔的英文单词,数字,以及逐字切分的中日韩文字
+_TOKEN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+|[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split ``text`` into lowercase terms, breaking camelCase and snake_case names apart."""
+    return [_normalize(token) for token in _TOKEN.findall(text)]
+
+
+def _normalize(token: str) -> str:
+    """Lowercase ``token`` and drop a plural s, so "issues" finds "issue"."""
+    token = token.lower()
+    if len(token) > MIN_PREFIX and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+class ToolIndex:
+    """Inverted index over the names, descriptions and parameter names of every backend's tools.
+
+    Postings are kept per term with each tool's field-weighted term
+    frequency, and tools are grouped by backend prefix, so replacing one
+    backend's catalog only touches the postings of that backend's tools.
+    Searches rank tools with BM25, and query terms of ``MIN_PREFIX`` or
+    more letters also match longer terms, at a lower weight.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._postings: dict[str, dict[str, float]] = defaultdict(dict)
+        self._vocabulary: list[str] = []
+        self._tools: dict[str, Tool] = {}
+        self._prefixes: dict[str, str] = {}
+        self._terms: dict[str, Counter[str]] = {}
+        self._lengths: dict[str, float] = {}
+        self._by_prefix: dict[str, list[str]] = {}
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        """Return the number of indexed tools."""
+        return len(self._tools)
+
+    def update(self, prefix: str, tools: Iterable[Tool]) -> None:
+        """Replace the indexed tools of backend ``prefix``."""
+        self.remove(prefix)
+        names = []
+        for tool in tools:
+            if tool.name == SEARCH_TOOL or tool.name in self._tools:
+                continue
+            terms = self._weighted_terms(tool)
+            self._tools[tool.name] = tool
+            self._prefixes[tool.name] = prefix
+            self._terms[tool.name] = terms
+            self._lengths[tool.name] = sum(terms.values())
+            self._total_length += self._lengths[tool.name]
+            for term, weight in terms.items():
+                if term not in self._postings:
+                    bisect.insort(self._vocabulary, term)
+                self._postings[term][tool.name] = weight
+            names.append(tool.name)
+        self._by_prefix[prefix] = names
+
+    def remove(self, prefix: str) -> None:
+        """Drop the indexed tools of backend ``prefix``."""
+        for name in self._by_prefix.pop(prefix, []):
+            del self._tools[name]
+            del self._prefixes[name]
+            terms = self._terms.pop(name)
+            self._total_length -= self._lengths.pop(name)
+            for term in terms:
+                postings = self._postings[term]
+                del postings[name]
+                if not postings:
+                    del self._postings[term]
+                    del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+
+    def search(self, query: str, limit: int, prefix: str | None = None) -> list[tuple[Tool, float]]:
+        """Return up to ``limit`` tools matching ``query``, best first, optionally of one backend only."""
+        if not self._tools:
+            return []
+        scores: dict[str, float] = defaultdict(float)
+        average = self._total_length / len(self._tools)
+        for token in dict.fromkeys(tokenize(query)):
+            for term, boost in self._expand(token):
+                postings = self._postings[term]
+                idf = math.log(1 + (len(self._tools) - len(postings) + 0.5) / (len(postings) + 0.5))
+                for name, frequency in postings.items():
+                    norm = frequency + K1 * (1 - B + B * self._lengths[name] / average)
+                    scores[name] += boost * idf * frequency * (K1 + 1) / norm
+        if prefix is not None:
+            scores = {name: score for name, score in scores.items() if self._prefixes[name] == prefix}
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self._tools[name], score) for name, score in best]
+
+    def _expand(self, token: str) -> list[tuple[str, float]]:
+        """Return the indexed terms ``token`` matches, itself at full weight and longer terms it begins."""
+        matches = [(token, 1.0)] if token in self._postings else []
+        if len(token) < MIN_PREFIX:
+            return matches
+        start = bisect.bisect_right(self._vocabulary, token)
+        for term in self._vocabulary[start : start + MAX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            matches.append((term, PREFIX_WEIGHT))
+        return matches
+
+    @staticmethod
+    def _weighted_terms(tool: Tool) -> Counter[str]:
+        """Count the terms of a tool's fields, each weighted by its field."""
+        properties = (tool.inputSchema or {}).get("properties") or {}
+        fields = {
+            "name": tool.name,
+            "parameters": " ".join(properties),
+            "description": tool.description or "",
+        }
+        terms: Counter[str] = Counter()
+        for field, text in fields.items():
+            for term in tokenize(text):
+                terms[term] += FIELD_WEIGHTS[field]
+        return terms
+
+
+class ToolSearch:
+    """The ``search_tools`` meta-tool, which finds tools in the index without listing them all."""
+
+    def __init__(self, index: ToolIndex, max_results: int) -> None:
+        """Initialize the tool.
+
+        Args:
+            index: Index of every backend's tools
+            max_results: Most tools returned by one search
+
+        """
+        self.index = index
+        self.max_results = max_results
+
+    async def run(
+        self,
+        query: Annotated[str, Field(description="Words describing what the tool should do, or part of its name")],
+        limit: Annotated[int, Field(ge=1, description="Most tools to return")] = 10,
+        prefix: Annotated[str | None, Field(description="Only search the tools of this backend prefix")] = None,
+    ) -> list[dict[str, Any]]:
+        """Search the tools of every backend by name, description and parameter names.
+
+        Returns the best matches first, each with its name, description,
+        input schema and score. Any returned tool can be called by name,
+        whether or not it appears in tools/list.
+        """
+        return [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "inputSchema": tool.inputSchema,
+                "score": round(score, 3),
+            }
+            for tool, score in self.index.search(query, min(limit, self.max_results), prefix)
+        ]
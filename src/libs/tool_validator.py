@@ -0,0 +1,344 @@
+import hashlib
+import json
+import re
+from collections.abc import Callable
+from typing import Any
+
+# 返回第一个错误信息,校验通过时返回 None.错误信息以出错位置开头,例如 ".items[2]: expected string",
+# 只在出错时拼接路径,校验通过的调用不产生字符串
+Validator = Callable[[Any], str | None]
+
+TYPE_CHECKS: dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+    "number": lambda v: isinstance(v, int | float) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _accept(value: Any) -> str | None:  # noqa: ANN401, ARG001
+    return None
+
+
+def _json_key(value: Any) -> Any:  # noqa: ANN401
+    """Return a hashable key equal for JSON-equal values, so 1 matches 1.0 but not True."""
+    if isinstance(value, bool):
+        return ("boolean", value)
+    if isinstance(value, float) and value.is_integer():
+        return ("number", int(value))
+    if isinstance(value, int | float):
+        return ("number", value)
+    if isinstance(value, list):
+        return ("array", tuple(_json_key(item) for item in value))
+    if isinstance(value, dict):
+        return ("object", frozenset((name, _json_key(item)) for name, item in value.items()))
+    return (type(value).__name__, value)
+
+
+class SchemaCompiler:
+    """Compile a JSON Schema into nested closures, once.
+
+    Only the keywords tool input schemas commonly use are enforced. Unknown
+    keywords and ``format`` are ignored, so a compiled validator may accept
+    arguments the backend later rejects, but never rejects valid ones.
+    Local ``$ref`` pointers are resolved lazily, which supports recursive
+    definitions.
+    """
+
+    def __init__(self, root: dict[str, Any]) -> None:
+        """Initialize the compiler for the schema document ``root``."""
+        self.root = root
+        self._refs: dict[str, Validator] = {}
+
+    def compile(self, schema: Any) -> Validator:  # noqa: ANN401
+        """Return a validator for ``schema``."""
+        if schema is True or schema == {}:
+            return _accept
+        if schema is False:
+            return lambda _value: ": no value is allowed"
+        if not isinstance(schema, dict):
+            return _accept
+
+        checks = self._checks(schema)
+        if not checks:
+            return _accept
+        if len(checks) == 1:
+            return checks[0]
+
+        def validate(value: Any) -> str | None:  # noqa: ANN401
+            for check in checks:
+                error = check(value)
+                if error:
+                    return error
+            return None
+
+        return validate
+
+    def _checks(self, schema: dict[str, Any]) -> list[Validator]:
+        """Return one check per group of keywords present in ``schema``."""
+        checks: list[Validator] = []
+        if "$ref" in schema:
+            checks.append(self._ref(schema["$ref"]))
+        if "type" in schema:
+            checks.append(self._type(schema["type"]))
+        if "enum" in schema:
+            checks.append(self._enum(schema["enum"]))
+        if "const" in schema:
+            checks.append(self._enum([schema["const"]]))
+        if {"properties", "required", "additionalProperties"} & schema.keys():
+            checks.append(self._object(schema))
+        if {"items", "minItems", "maxItems"} & schema.keys():
+            checks.append(self._array(schema))
+        if {"minLength", "maxLength", "pattern"} & schema.keys():
+            checks.append(self._string(schema))
+        if {"minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum"} & schema.keys():
+            checks.append(self._number(schema))
+        checks.extend(
+            self._combine(keyword, [self.compile(sub) for sub in schema[keyword]])
+            for keyword in ("anyOf", "oneOf", "allOf")
+            if keyword in schema
+        )
+        return checks
+
+    def _ref(self, ref: str) -> Validator:
+        if not ref.startswith("#"):
+            return _accept
+
+        def validate(value: Any) -> str | None:  # noqa: ANN401
+            validator = self._refs.get(ref)
+            if validator is None:
+                # 先占位,递归引用自身时直接通过,避免无限展开
+                self._refs[ref] = _accept
+                validator = self._refs[ref] = self.compile(self._resolve(ref))
+            return validator(value)
+
+        return validate
+
+    def _resolve(self, ref: str) -> Any:  # noqa: ANN401
+        node: Any = self.root
+        for part in ref.lstrip("#").split("/"):
+            if not part:
+                continue
+            part = part.replace("~1", "/").replace("~0", "~")  # noqa: PLW2901
+            if not isinstance(node, dict) or part not in node:
+                return True
+            node = node[part]
+        return node
+
+    @staticmethod
+    def _type(expected: str | list[str]) -> Validator:
+        names = [expected] if isinstance(expected, str) else list(expected)
+        checks = [TYPE_CHECKS[name] for name in names if name in TYPE_CHECKS]
+        if not checks:
+            return _accept
+        label = " or ".join(names)
+
+        if len(checks) == 1:
+            (check,) = checks
+
+            def validate(value: Any) -> str | None:  # noqa: ANN401
+                if check(value):
+                    return None
+                return f": expected {label}, got {type(value).__name__}"
+
+            return validate
+
+        def validate_any(value: Any) -> str | None:  # noqa: ANN401
+            for check in checks:
+                if check(value):
+                    return None
+            return f": expected {label}, got {type(value).__name__}"
+
+        return validate_any
+
+    @staticmethod
+    def _enum(options: list[Any]) -> Validator:
+        # 按 JSON 语义比较:1 与 1.0 相等,True 与 1 不等
+        allowed = {_json_key(option) for option in options}
+
+        def validate(value: Any) -> str | None:  # noqa: ANN401
+            if _json_key(value) in allowed:
+                return None
+            return f": must be one of {options}"
+
+        return validate
+
+    def _object(self, schema: dict[str, Any]) -> Validator:
+        properties = {name: self.compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = list(schema.get("required", []))
+        additional = schema.get("additionalProperties", True)
+        extra = None if additional is True else self.compile(additional)
+
+        def validate(value: Any) -> str | None:  # noqa: ANN401
+            if not isinstance(value, dict):
+                return None
+            for name in required:
+                if name not in value:
+                    return f": missing required property '{name}'"
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is not None:
+                    error = check(item)
+                elif extra is not None:
+                    error = extra(item)
+                    if error and additional is False:
+                        return f": unexpected property '{name}'"
+                else:
+                    continue
+                if error:
+                    return f".{name}{error}"
+            return None
+
+        return validate
+
+    def _array(self, schema: dict[str, Any]) -> Validator:
+        items = self.compile(schema["items"]) if isinstance(schema.get("items"), dict | bool) else _accept
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+
+        def validate(value: Any) -> str | None:  # noqa: ANN401
+            if not isinstance(value, list):
+                return None
+            if min_items is not None and len(value) < min_items:
+                return f": expected at least {min_items} items"
+            if max_items is not None and len(value) > max_items:
+                return f": expected at most {max_items} items"
+            for index, item in enumerate(value):
+                error = items(item)
+                if error:
+                    return f"[{index}]{error}"
+            return None
+
+        return validate
+
+    @staticmethod
+    def _string(schema: dict[str, Any]) -> Validator:
+        min_length = schema.get("minLength")
+        max_length = schema.get("maxLength")
+        try:
+            pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+        except re.error:
+            pattern = None
+
+        def validate(value: Any) -> str | None:  # noqa: ANN401
+            if not isinstance(value, str):
+                return None
+            if min_length is not None and len(value) < min_length:
+                return f": expected at least {min_length} characters"
+            if max_length is not None and len(value) > max_length:
+                return f": expected at most {max_length} characters"
+            if pattern is not None and not pattern.search(value):
+                return f": does not match pattern {pattern.pattern!r}"
+            return None
+
+        return validate
+
+    @staticmethod
+    def _number(schema: dict[str, Any]) -> Validator:
+        minimum, exclusive_minimum = schema.get("minimum"), schema.get("exclusiveMinimum")
+        maximum, exclusive_maximum = schema.get("maximum"), schema.get("exclusiveMaximum")
+        # draft-04 中 exclusiveMinimum/exclusiveMaximum 为布尔值,为 true 时 minimum/maximum 本身不可取
+        if exclusive_minimum is True:
+            minimum, exclusive_minimum = None, minimum
+        if exclusive_maximum is True:
+            maximum, exclusive_maximum = None, maximum
+        bounds = [
+            (minimum, lambda v, b: v >= b, ">="),
+            (maximum, lambda v, b: v <= b, "<="),
+            (exclusive_minimum, lambda v, b: v > b, ">"),
+            (exclusive_maximum, lambda v, b: v < b, "<"),
+        ]
+        bounds = [bound for bound in bounds if TYPE_CHECKS["number"](bound[0])]
+
+        def validate(value: Any) -> str | None:  # noqa: ANN401
+            if not TYPE_CHECKS["number"](value):
+                return None
+            for bound, holds, op in bounds:
+                if not holds(value, bound):
+                    return f": must be {op} {bound}"
+            return None
+
+        return validate
+
+    @staticmethod
+    def _combine(keyword: str, validators: list[Validator]) -> Validator:
+        def validate(value: Any) -> str | None:  # noqa: ANN401
+            errors = [validator(value) for validator in validators]
+            passed = errors.count(None)
+            if keyword == "allOf":
+                return next((error for error in errors if error), None)
+            if keyword == "oneOf" and passed > 1:
+                return ": matches more than one schema of oneOf"
+            if passed:
+                return None
+            return next(error for error in errors if error)
+
+        return validate
+
+
+def compile_schema(schema: dict[str, Any]) -> Validator:
+    """Compile the input schema of a tool into a validator."""
+    return SchemaCompiler(schema).compile(schema)
+
+
+def schema_digest(schema: Any) -> str:  # noqa: ANN401
+    """Return a stable digest of a schema or catalog."""
+    return hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ToolValidators:
+    """Compiled argument validators of the imported tools, grouped by backend.
+
+    Each backend's catalog carries a version, the digest of its tool
+    schemas. Refreshing a backend with an unchanged catalog keeps its
+    validators; identical schemas share one compiled validator.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self.versions: dict[str, str] = {}
+        self._by_backend: dict[str, dict[str, Validator]] = {}
+        self._by_tool: dict[str, Validator] = {}
+        self._compiled: dict[str, Validator] = {}
+
+    def refresh(self, prefix: str, schemas: dict[str, dict[str, Any]]) -> bool:
+        """Load the tool schemas of backend ``prefix``, keyed by tool name.
+
+        Returns:
+            bool: True if the catalog changed and validators were rebuilt.
+
+        """
+        version = schema_digest(schemas)
+        if self.versions.get(prefix) == version:
+            return False
+        for name in self._by_backend.pop(prefix, {}):
+            self._by_tool.pop(name, None)
+
+        validators = {}
+        for name, schema in schemas.items():
+            digest = schema_digest(schema)
+            validator = self._compiled.get(digest)
+            if validator is None:
+                validator = self._compiled[digest] = compile_schema(schema)
+            validators[name] = validator
+        self._by_backend[prefix] = validators
+        self._by_tool.update(validators)
+        self.versions[prefix] = version
+        return True
+
+    def remove(self, prefix: str) -> None:
+        """Forget the validators of backend ``prefix``."""
+        for name in self._by_backend.pop(prefix, {}):
+            self._by_tool.pop(name, None)
+        self.versions.pop(prefix, None)
+
+    def validate(self, name: str, arguments: dict[str, Any]) -> str | None:
+        """Validate the arguments of tool ``name``, unknown tools always pass."""
+        validator = self._by_tool.get(name)
+        if validator is None:
+            return None
+        error = validator(arguments)
+        return f"arguments{error}" if error else None
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from mcp.types import CallToolRequest
+
+logger = logging.getLogger("mcp_server")
+
+REDACTED = "[REDACTED]"
+
+
+class TrafficRecorder:
+    """Record sampled requests as NDJSON for later replay.
+
+    Each line holds the method, tool and prefix of a request, its redacted
+    arguments, its wall-clock arrival time, its duration and the size of its
+    response. Records are buffered in memory, then serialized and appended to
+    the file by ``run`` off the event loop, so recording never blocks a call.
+    Arrival times stay comparable when several processes append to one file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        prefix_of: Callable[[str], str | None],
+        sample_rate: float = 1.0,
+        redact: list[str] | None = None,
+        flush_interval: float = 1.0,
+    ) -> None:
+        """Initialize the recorder.
+
+        Args:
+            path: NDJSON file the records are appended to
+            prefix_of: Returns the prefix of the backend serving a tool
+            sample_rate: Fraction of requests recorded, between 0 and 1
+            redact: Argument names whose values are replaced, case-insensitive and at any depth
+            flush_interval: Seconds between two writes to the file
+
+        """
+        self.path = Path(path)
+        self.prefix_of = prefix_of
+        self.sample_rate = sample_rate
+        self.redact = {name.lower() for name in redact or ()}
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self._buffer: list[tuple[dict[str, Any], Any]] = []
+
+    def sampled(self) -> bool:
+        """Decide whether the next request is recorded."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate  # noqa: S311
+
+    def record(self, request: Any, started: float, result: Any = None, error: str | None = None) -> None:  # noqa: ANN401
+        """Buffer the record of one finished request.
+
+        Args:
+            request: The lowlevel request
+            started: ``time.monotonic()`` when the request arrived
+            result: The response, None if the request failed
+            error: The error message, None if the request succeeded
+
+        """
+        duration = time.monotonic() - started
+        entry: dict[str, Any] = {
+            "timestamp": round(time.time() - duration, 6),
+            "method": request.method,
+            "duration_ms": round(duration * 1000, 3),
+        }
+        if isinstance(request, CallToolRequest):
+            entry["tool"] = request.params.name
+            entry["prefix"] = self.prefix_of(request.params.name)
+            entry["arguments"] = self._redact(request.params.arguments or {})
+        if result is not None and getattr(result.root, "isError", False):
+            error = "tool error"
+        if error is not None:
+            entry["error"] = error
+        self._buffer.append((entry, result))
+        self.recorded += 1
+
+    async def run(self) -> None:
+        """Flush buffered records forever, until cancelled."""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            # 取消时同步写出剩余记录,保证停止前的请求不丢失
+            records, self._buffer = self._buffer, []
+            self._write(records)
+
+    async def flush(self) -> None:
+        """Append the buffered records to the file."""
+        records, self._buffer = self._buffer, []
+        await asyncio.to_thread(self._write, records)
+
+    def _write(self, records: list[tuple[dict[str, Any], Any]]) -> None:
+        if not records:
+            return
+        lines = []
+        for entry, result in records:
+            if result is not None:
+                # 响应只为计算大小而序列化,放在写入线程中进行
+                entry["response_bytes"] = len(result.model_dump_json(by_alias=True, exclude_none=True))
+            lines.append(json.dumps(entry, ensure_ascii=False, default=str))
+        try:
+            with self.path.open("a", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+        except OSError:
+            logger.exception("Failed to write traffic capture to %s", self.path)
+
+    def _redact(self, value: Any) -> Any:  # noqa: ANN401
+        if not self.redact:
+            return value
+        if isinstance(value, dict):
+            return {key: REDACTED if key.lower() in self.redact else self._redact(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._redact(item) for item in value]
+        return value
@@ -8,13 +8,101 @@ class ErrorMessages:
     PREFIX_ERROR = "prefix must be set"
     URL_ERROR = "url must be set when type is 'http', 'https', 'websocket'"
     COMMAND_ERROR = "command must be set when type is 'process'"
+    ADAPTIVE_ERROR = "adaptive_concurrency must be one of 'aimd', 'gradient'"
+    EVENT_LOOP_ERROR = "event_loop must be one of 'asyncio', 'uvloop'"
+    DISCOVERY_ERROR = "discovery_mode needs tool_search_limit above 0"
 
 
 class ServerConfig(BaseModel):
     host: str = "127.0.0.1"
-    port: int = "8090"
+    port: int = 8090
     name: str
     version: str = "1.0.0"
+    # 关闭时等待进行中调用完成的最长秒数
+    drain_timeout: float = 30.0
+    # 排空后关闭每个上游会话的最长秒数
+    close_timeout: float = 5.0
+    # stdio 后端资源(RSS/CPU/FD)采样间隔秒数
+    resource_sample_interval: float = 10.0
+    # 每个客户端的令牌桶限流:rate_limit 为每秒请求数,rate_burst 为桶容量
+    rate_limit: float | None = None
+    rate_burst: int | None = None
+    # 每个客户端同时进行中的请求数上限
+    max_concurrent_per_client: int | None = None
+    # 用于识别客户端的请求头,请求中没有该请求头或其值不在 client_keys 中时按客户端 IP 识别
+    client_id_header: str = "x-api-key"
+    # 可作为客户端标识的 API key,未配置的值会被忽略,避免客户端更换 key 绕过限流
+    client_keys: list[str] = []
+    # 同时转发到所有后端的调用上限,超出后按前缀加权公平排队
+    max_concurrency: int | None = None
+    # 请求优先级的请求头,取值 high/normal/low,也可以在请求 _meta.priority 中指定
+    priority_header: str = "x-priority"
+    # 公平排队中各客户端的权重,键为 client_id_header 的值或客户端 IP,默认为 1
+    client_weights: dict[str, float] = {}
+    # 按 Accept-Encoding 协商 zstd/br/gzip 响应压缩,zstd 与 br 需要安装 zstandard 与 brotli
+    compression: bool = True
+    # 小于该字节数的完整响应不压缩
+    compression_min_size: int = 1024
+    # 压缩级别,不设置时使用各算法的默认级别
+    compression_level: int | None = None
+    # 不压缩的路径前缀
+    compression_exclude: list[str] = []
+    # 缓存的压缩结果数量,相同的响应体只压缩一次
+    compression_cache_size: int = 128
+    # 转发前按工具的 inputSchema 校验调用参数,不合法的调用直接拒绝
+    validate_arguments: bool = True
+    # batch_call 工具一次最多包含的调用数,大于 0 时才提供该工具,该工具会出现在 tools/list 中
+    batch_max_calls: int = 0
+    # batch_call 中每个调用未单独指定超时时使用的超时秒数
+    batch_timeout: float = 60.0
+    # search_tools 工具一次最多返回的工具数,设为 0 时不提供该工具
+    tool_search_limit: int = 20
+    # 发现模式:tools/list 只列出 search_tools,其他工具由客户端搜索后按名称调用
+    discovery_mode: bool = False
+    # 客户端设置调用截止时间的请求头,单位为秒,也可以在请求的 _meta.timeout 中设置
+    timeout_header: str = "x-request-timeout"
+    # 多个网关节点共享目录与结果缓存的存储,格式为 redis://[:password@]host[:port][/db],不设置时使用进程内存储
+    store_url: str | None = None
+    # 向共享存储发送命令的最大连接数
+    store_pool_size: int = 8
+    # 共享存储中键与频道的前缀,多个网关共用一个存储时用于区分
+    store_namespace: str = "moonshot"
+    # 本地一级缓存的条目数
+    store_l1_size: int = 1024
+    # 本地一级缓存条目的最长使用秒数,失效通知丢失时最多读到这么久之前的值
+    store_l1_ttl: float = 5.0
+    # 管理接口的路径前缀,如 "/admin",提供 GET {admin_path}/status,不设置时不提供
+    admin_path: str | None = None
+    # 设置后管理接口需要请求头 Authorization: Bearer <admin_token>,不设置时只允许本机回环地址访问
+    admin_token: str | None = None
+    # 事件循环实现:"asyncio" 或 "uvloop",未安装 uvloop 时回退到 asyncio,修改后需重启进程生效
+    event_loop: str = "asyncio"
+    # 默认线程池的线程数,用于 DNS 解析与 to_thread,不设置时使用 Python 的默认值
+    executor_workers: int | None = None
+    # stdio 后端单条消息的最大字节数,也是读取管道的缓冲区大小
+    stdio_buffer_limit: int = 16 * 1024 * 1024
+    # stdio 后端与会话之间每个方向排队的消息数,为 0 时逐条交接
+    stdio_queue_size: int = 64
+    # 事件循环延迟的探测间隔秒数,设为 0 时不监测
+    loop_lag_interval: float = 0.5
+    # 事件循环延迟超过该秒数时记录阻塞它的任务与调用栈
+    loop_lag_threshold: float = 0.1
+    # 管理接口 {admin_path}/profile 单次采样的最长秒数
+    profile_max_seconds: float = 60.0
+    # 流量录制文件,每行一条 JSON 记录,不设置时不录制
+    capture_file: str | None = None
+    # 录制的请求比例,0 到 1 之间
+    capture_sample_rate: float = 1.0
+    # 录制时替换为 [REDACTED] 的参数名,不区分大小写,任意层级生效
+    capture_redact: list[str] = ["password", "token", "secret", "api_key", "authorization"]
+
+    @model_validator(mode="after")
+    def validate_config(self) -> "ServerConfig":
+        if self.event_loop not in ("asyncio", "uvloop"):
+            raise ValueError(ErrorMessages.EVENT_LOOP_ERROR)
+        if self.discovery_mode and self.tool_search_limit <= 0:
+            raise ValueError(ErrorMessages.DISCOVERY_ERROR)
+        return self
 
 
 class ProxyConfig(BaseModel):
@@ -37,6 +125,53 @@ class ProxyConfig(BaseModel):
     package: str | None = None
     project_directory: str | None = None
     python_version: str | None = None
+    use_package_lock: bool = True
+    # stdio 后端(process/uvx/npx)的监控与自动重启
+    start_timeout: float = 30.0
+    health_interval: float = 5.0
+    max_restarts: int = 5
+    restart_window: float = 60.0
+    restart_backoff: float = 1.0
+    restart_backoff_max: float = 30.0
+    # 进程树常驻内存上限,单位 MB,超过后重启该后端
+    max_rss_mb: float | None = None
+    # 该前缀下工具调用的单客户端限流与并发上限,在全局限制之外额外生效
+    rate_limit: float | None = None
+    rate_burst: int | None = None
+    max_concurrent_per_client: int | None = None
+    # 同时转发到该后端的调用上限,超出后按优先级与客户端加权公平排队
+    max_concurrency: int | None = None
+    # 服务器级公平排队中该后端的权重
+    weight: float = 1.0
+    # 按调用延迟与失败自动调整并发上限:"aimd" 按失败调整,"gradient" 按延迟变化调整
+    # 启用后 max_concurrency 为上限,不设置时为 256
+    adaptive_concurrency: str | None = None
+    # 自适应并发的下限
+    min_concurrency: int = 1
+    # 结果可以缓存并在节点间共享的工具,"*" 表示全部,只缓存成功的结果
+    cache_tools: list[str] = []
+    # 缓存结果的有效秒数
+    cache_ttl: float = 60.0
+    # 转发到该后端的请求的默认超时秒数,超时后在上游取消该请求,不设置时不限制
+    timeout: float | None = None
+    # 调用被取消或超时时向该后端发送取消通知,旧版 MCP SDK 的后端收到取消通知会退出,此时可关闭
+    cancel_upstream: bool = True
+    # 会话亲和:每个前端会话独占一个上游会话,stdio 后端为每个前端会话单独启动进程
+    # 用于按会话保存状态的后端,如打开的浏览器或数据库事务
+    affinity: bool = False
+    # 同时固定的上游会话上限,达到上限后新的前端会话被拒绝
+    max_pinned_sessions: int = 32
+    # 固定的上游会话空闲超过该秒数后关闭
+    pinned_idle_timeout: float = 300.0
+    # 副本:stdio 后端启动的实例总数,http/websocket 后端额外的副本地址
+    replicas: int = 1
+    replica_urls: list[str] = []
+    # 可安全重复执行的只读工具,慢请求会对冲到另一副本,"*" 表示全部工具
+    hedge_tools: list[str] = []
+    # 首次请求超过该工具近期延迟的此百分位仍未返回时发出对冲请求
+    hedge_percentile: float = 95.0
+    # 对冲请求数占调用数的比例上限
+    hedge_budget: float = 0.1
 
     @model_validator(mode="after")
     def validate_config(self) -> "ProxyConfig":
@@ -48,6 +183,9 @@ class ProxyConfig(BaseModel):
         if not self.prefix:
             raise ValueError(ErrorMessages.PREFIX_ERROR)
 
+        if self.adaptive_concurrency not in (None, "aimd", "gradient"):
+            raise ValueError(ErrorMessages.ADAPTIVE_ERROR)
+
         # 根据type验证相关字段
         if self.type in ["http", "https", "websocket"] and not self.url:
             raise ValueError(ErrorMessages.URL_ERROR)
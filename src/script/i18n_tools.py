@@ -1,13 +1,39 @@
 import argparse
+import copy
+import hashlib
+import json
 import logging
 import os
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import polib
 
 logger = logging.getLogger(__name__)
 
+# 增量构建缓存,记录源文件与 .po 文件的内容哈希
+CACHE_FILE = ".i18n_cache.json"
+
+
+def file_digest(path: str | Path) -> str:
+    """计算文件内容的 sha256 哈希."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def load_cache(locale_dir: str | Path) -> dict:
+    """读取增量构建缓存,缓存不存在或损坏时返回空字典."""
+    try:
+        return json.loads((Path(locale_dir) / CACHE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(locale_dir: str | Path, cache: dict) -> None:
+    """保存增量构建缓存."""
+    path = Path(locale_dir) / CACHE_FILE
+    path.write_text(json.dumps(cache, indent=2, sort_keys=True), encoding="utf-8")
+
 
 def find_py_files(base_dir: str) -> str:
     """查找所有 .py 文件.
@@ -57,6 +83,7 @@ def extract_messages(py_files: str, output_dir: str, domain: str = "messages") -
             "--msgid-bugs-address=your@email.com",
             "--add-comments=TRANSLATORS:",
             "--keyword=_",
+            "--keyword=gettext",
             *py_files,
         ]
         subprocess.run(cmd, check=True, capture_output=True, text=True)  # noqa: S603
@@ -114,85 +141,112 @@ def create_po_files(pot_file: str, locale_dir: str, languages: str) -> str:
         raise Exception(msg) from e  # noqa: TRY002
 
 
-def merge_po_files(pot_file: str, locale_dir: str) -> None:  # noqa: C901
-    """使用 polib 合并 .pot 和现有 .po 文件,保留已有翻译."""
-    try:
-        # 加载新生成的 .pot 文件
-        pot = polib.pofile(pot_file)
+def merge_po_file(pot: polib.POFile, po_file_path: str | Path) -> None:
+    """将 .pot 合并到单个 .po 文件,保留已有翻译.
 
-        locale_path = Path(locale_dir)
-        po_files = list(locale_path.rglob("*.po"))
-
-        if not po_files:
-            logger.warning("在 %s 中未找到 .po 文件,跳过合并", locale_dir)
-            return
-
-        for po_file_path in po_files:
-            if Path.exists(po_file_path):
-                # 加载现有的 .po 文件
-                po = polib.pofile(str(po_file_path), encoding="utf-8")
-                logger.info("正在合并现有 PO 文件: %s", po_file_path)
-            else:
-                # 如果 .po 文件不存在,创建一个新的
-                po = polib.POFile()
-                po.metadata = pot.metadata.copy()  # 复制 .pot 的元信息
-                logger.info("创建新的 PO 文件: %s", po_file_path)
-
-            # 合并逻辑:保留已有翻译,添加新条目,标记废弃条目
-            existing_entries = {entry.msgid: entry for entry in po}
-            for pot_entry in pot:
-                if pot_entry.msgid in existing_entries:
-                    # 如果已有翻译,保留它
-                    existing_entry = existing_entries[pot_entry.msgid]
-                    if existing_entry.msgstr:
-                        pot_entry.msgstr = existing_entry.msgstr
-                # 将新条目添加到 .po 文件(如果之前不存在)
-                if pot_entry.msgid not in existing_entries:
-                    po.append(pot_entry)
-
-            # 标记废弃条目(在 .po 中存在但 .pot 中已删除)
-            for msgid, entry in existing_entries.items():
-                if msgid not in {e.msgid for e in pot}:
-                    entry.obsolete = True  # 标记为废弃
-
-            # 保存更新后的 .po 文件
-            po.save(str(po_file_path))
-            logger.info("已更新 PO 文件: %s", po_file_path)
+    每个条目只做常数次字典查找,合并耗时与条目数成线性关系。
+    """
+    po_file_path = Path(po_file_path)
+    if Path.exists(po_file_path):
+        # 加载现有的 .po 文件
+        po = polib.pofile(str(po_file_path), encoding="utf-8")
+        logger.info("正在合并现有 PO 文件: %s", po_file_path)
+    else:
+        # 如果 .po 文件不存在,创建一个新的
+        po = polib.POFile()
+        po.metadata = pot.metadata.copy()  # 复制 .pot 的元信息
+        logger.info("创建新的 PO 文件: %s", po_file_path)
+
+    # 合并逻辑:保留已有翻译,添加新条目,标记废弃条目
+    existing_entries = {entry.msgid: entry for entry in po}
+    pot_msgids = set()
+    for pot_entry in pot:
+        pot_msgids.add(pot_entry.msgid)
+        existing_entry = existing_entries.get(pot_entry.msgid)
+        if existing_entry is not None:
+            # 已有条目保留翻译,只更新源码位置
+            existing_entry.occurrences = pot_entry.occurrences
+            existing_entry.obsolete = False
+        else:
+            # 复制条目,避免多个语言共享同一个对象
+            po.append(copy.deepcopy(pot_entry))
+
+    # 标记废弃条目(在 .po 中存在但 .pot 中已删除)
+    for msgid, entry in existing_entries.items():
+        if msgid not in pot_msgids:
+            entry.obsolete = True  # 标记为废弃
+
+    # 保存更新后的 .po 文件
+    po.save(str(po_file_path))
+    logger.info("已更新 PO 文件: %s", po_file_path)
+
+
+def compile_po_file(po_file: str | Path) -> Path:
+    """编译单个 .po 文件为同目录下的 .mo 文件."""
+    po_file = Path(po_file)
+    # 直接使用 po 文件所在的目录
+    mo_file = po_file.parent / (po_file.stem + ".mo")
+
+    cmd = ["msgfmt", "-o", str(mo_file), str(po_file)]
+    subprocess.run(cmd, check=True, capture_output=True, text=True)  # noqa: S603
+    logger.info("已生成 MO 文件: %s", mo_file)
+    return mo_file
+
+
+def build_catalog(pot_file: str | None, po_file: str, cached_digest: str | None) -> str:
+    """在工作进程中合并并按需编译单个语言的 .po 文件.
 
-    except Exception as e:
-        msg = f"合并 .po 文件时出错: {e}"
-        raise Exception(msg) from e  # noqa: TRY002
+    Args:
+        pot_file: 需要合并的 POT 文件路径,为 None 时跳过合并
+        po_file: PO 文件路径
+        cached_digest: 上次编译时 .po 文件的哈希
 
+    Returns:
+        str: 处理后 .po 文件的哈希
 
-def compile_po_files(locale_dir: str) -> None:
-    """编译所有 .po 文件为 .mo 文件."""
-    try:
-        locale_path = Path(locale_dir)
-        if not Path.exists(locale_path):
-            msg = f"locale 目录 {locale_dir} 不存在,跳过编译"
-            raise FileNotFoundError(msg)  # noqa: TRY301
+    """
+    if pot_file is not None:
+        merge_po_file(polib.pofile(pot_file), po_file)
+
+    digest = file_digest(po_file)
+    mo_file = Path(po_file).with_suffix(".mo")
+    if digest != cached_digest or not mo_file.exists():
+        compile_po_file(po_file)
+    else:
+        logger.info("PO 文件未变化,跳过编译: %s", po_file)
+    return digest
+
+
+def build_catalogs(
+    pot_file: str | None,
+    locale_dir: str | Path,
+    cached: dict[str, str],
+    jobs: int | None = None,
+) -> dict[str, str]:
+    """并行处理所有语言的 .po 文件,各语言互不依赖.
 
-        po_files = list(locale_path.rglob("*.po"))
-        if not po_files:
-            msg = f"在 {locale_dir} 中未找到 .po 文件"
-            raise FileNotFoundError(msg)  # noqa: TRY301
+    Args:
+        pot_file: 需要合并的 POT 文件路径,为 None 时只编译有变化的 .po 文件
+        locale_dir: locale 目录路径
+        cached: 上次构建时各 .po 文件的哈希
+        jobs: 进程池大小,默认为 CPU 核数
 
-        for po_file in po_files:
-            # 直接使用 po 文件所在的目录
-            mo_dir = po_file.parent
-            mo_file = mo_dir / (po_file.stem + ".mo")
+    Returns:
+        dict[str, str]: 本次构建后各 .po 文件的哈希
 
-            Path.mkdir(mo_dir, exist_ok=True)
+    """
+    po_files = sorted(str(path) for path in Path(locale_dir).rglob("*.po"))
+    if not po_files:
+        msg = f"在 {locale_dir} 中未找到 .po 文件"
+        raise FileNotFoundError(msg)
 
-            cmd = ["msgfmt", "-o", str(mo_file), str(po_file)]
-            subprocess.run(cmd, check=True, capture_output=True, text=True)  # noqa: S603
-            logger.info("已生成 MO 文件: %s", mo_file)
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {po: pool.submit(build_catalog, pot_file, po, cached.get(po)) for po in po_files}
+            return {po: future.result() for po, future in futures.items()}
     except subprocess.CalledProcessError as e:
         msg = f"msgfmt 执行失败: {e}"
         raise Exception(msg) from e  # noqa: TRY002
-    except Exception as e:
-        msg = f"编译.po 文件时出错: {e}"
-        raise Exception(msg) from e  # noqa: TRY002
 
 
 def main() -> None:
@@ -208,24 +262,44 @@ def main() -> None:
         help="需要支持的语言代码列表,用逗号分隔,例如:zh_CN,en_US",
     )
 
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="并行编译的进程数,默认为 CPU 核数",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="忽略增量缓存,重新提取和编译全部翻译文件",
+    )
+
     args = parser.parse_args()
     base_dir = args.base_dir
     locale_dir = Path(base_dir) / "locale"
     languages = args.languages.split(",")
-    # 1. 查找所有 .py 文件
+    cache = {} if args.force else load_cache(locale_dir)
+
+    # 1. 查找所有 .py 文件并计算内容哈希
     py_files = find_py_files(base_dir)
+    sources = {path: file_digest(path) for path in py_files}
 
-    # 2. 提取翻译字符串
-    pot_file = extract_messages(py_files, locale_dir)
+    # 2. 仅在源文件有变化时重新提取翻译字符串
+    pot_file = str(locale_dir / "messages.pot")
+    if sources != cache.get("sources") or not Path(pot_file).exists():
+        extract_messages(py_files, locale_dir)
+        merge_pot = pot_file
+    else:
+        logger.info("源文件未变化,跳过提取")
+        merge_pot = None
 
     # 3. 创建新的 PO 文件(如果不存在)
     create_po_files(pot_file, locale_dir, languages)
 
-    # 4. 合并 .pot 和现有 .po 文件
-    merge_po_files(pot_file, locale_dir)
+    # 4. 并行合并 .pot 并编译有变化的 .po 文件
+    po_digests = build_catalogs(merge_pot, locale_dir, cache.get("po", {}), args.jobs)
 
-    # 5. 编译 .po 文件为 .mo 文件
-    compile_po_files(locale_dir)
+    save_cache(locale_dir, {"sources": sources, "po": po_digests})
     logger.info("翻译文件处理流程完成")
 
 
@@ -0,0 +1,150 @@
+import argparse
+import json
+import logging
+import math
+import random
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import mcp.types
+
+from src.libs.json_codec import codec
+from src.libs.json_codec import dump_model
+from src.libs.json_codec import load_model
+
+logger = logging.getLogger(__name__)
+
+DUMP_OPTIONS = {"by_alias": True, "exclude_none": True}
+# 随机生成的 JSON 值的最大嵌套深度
+MAX_DEPTH = 3
+# 随机文本使用的字符,包含控制字符,HTML 字符,非 ASCII 字符与辅助平面字符
+ALPHABET = 'ab \t\n\r"\\/<>&\x00\x1f\x7fé中文  ﻿😀'
+
+
+def random_float(rng: random.Random) -> float:
+    """生成随机的有限浮点数,一半按量级均匀分布,一半取自随机的二进制表示."""
+    if rng.random() < 0.5:  # noqa: PLR2004
+        return rng.uniform(-1, 1) * 10 ** rng.randint(-30, 30)
+    value = struct.unpack("d", rng.randbytes(8))[0]
+    return value if math.isfinite(value) else 0.0
+
+
+def random_value(rng: random.Random, depth: int = 0) -> Any:  # noqa: ANN401
+    """生成随机的 JSON 值,覆盖各种量级的浮点数,超过 64 位的整数与特殊字符."""
+    generators = {
+        "float": lambda: random_float(rng),
+        "int": lambda: rng.randint(-(2**63), 2**64 - 1),
+        "big": lambda: rng.randint(2**64, 2**80),
+        "text": lambda: "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 24))),
+        "bool": lambda: rng.random() < 0.5,  # noqa: PLR2004
+        "null": lambda: None,
+    }
+    if depth < MAX_DEPTH:
+        generators["list"] = lambda: [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+        generators["dict"] = lambda: {
+            f"k{i}{rng.choice(ALPHABET)}": random_value(rng, depth + 1) for i in range(rng.randint(0, 4))
+        }
+    return generators[rng.choice(list(generators))]()
+
+
+def random_message(rng: random.Random) -> dict[str, Any]:
+    """生成随机的 JSON-RPC 消息,覆盖请求,结果,错误与通知."""
+    message_id = rng.choice([rng.randint(0, 2**31), f"id-{rng.randint(0, 999)}"])
+    kind = rng.randrange(5)
+    if kind == 0:
+        arguments = {f"arg{i}": random_value(rng) for i in range(rng.randint(0, 6))}
+        params = {"name": "tool", "arguments": arguments}
+        return {"jsonrpc": "2.0", "id": message_id, "method": "tools/call", "params": params}
+    if kind == 1:
+        content = [{"type": "text", "text": str(random_value(rng))} for _ in range(rng.randint(1, 3))]
+        return {"jsonrpc": "2.0", "id": message_id, "result": {"content": content, "isError": rng.random() < 0.1}}  # noqa: PLR2004
+    if kind == 2:  # noqa: PLR2004
+        tools = [
+            {
+                "name": f"tool_{i}",
+                "description": str(random_value(rng)),
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {"x": {"type": "number", "default": random_value(rng)}},
+                },
+            }
+            for i in range(rng.randint(0, 5))
+        ]
+        return {"jsonrpc": "2.0", "id": message_id, "result": {"tools": tools}}
+    if kind == 3:  # noqa: PLR2004
+        error = {"code": -32603, "message": str(random_value(rng)), "data": random_value(rng)}
+        return {"jsonrpc": "2.0", "id": message_id, "error": error}
+    params = {"progressToken": message_id, "progress": random_value(rng) if rng.random() < 0.5 else 1.5}  # noqa: PLR2004
+    return {"jsonrpc": "2.0", "method": "notifications/progress", "params": params}
+
+
+def load_messages(path: str | Path) -> list[bytes]:
+    """读取每行一条 JSON-RPC 消息的文件,例如用 tee 记录的 stdio 后端输出."""
+    return [line for line in Path(path).read_bytes().splitlines() if line.strip()]
+
+
+def check(lines: list[bytes]) -> list[str]:
+    """逐条对比快速编解码与 pydantic 的结果.
+
+    Returns:
+        list[str]: 不一致的消息说明,全部一致时为空
+
+    """
+    mismatches = []
+    for line in lines:
+        try:
+            expected = mcp.types.JSONRPCMessage.model_validate_json(line)
+        except ValueError:
+            continue
+        parsed = load_model(mcp.types.JSONRPCMessage, line)
+        if parsed != expected:
+            mismatches.append(f"parse: {line[:200]!r}")
+            continue
+        written = dump_model(parsed, **DUMP_OPTIONS)
+        if written != expected.model_dump_json(**DUMP_OPTIONS).encode():
+            mismatches.append(f"write: {line[:200]!r} -> {written[:200]!r}")
+    return mismatches
+
+
+def timing(lines: list[bytes]) -> tuple[float, float]:
+    """返回 pydantic 与快速编解码各自解析并写回全部消息的秒数."""
+    started = time.perf_counter()
+    for line in lines:
+        mcp.types.JSONRPCMessage.model_validate_json(line).model_dump_json(**DUMP_OPTIONS).encode()
+    reference = time.perf_counter() - started
+    started = time.perf_counter()
+    for line in lines:
+        dump_model(load_model(mcp.types.JSONRPCMessage, line), **DUMP_OPTIONS)
+    return reference, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON 编解码校验工具：确认快速编解码与 pydantic 的输出逐字节一致")
+    parser.add_argument("--count", type=int, default=20000, help="随机生成的消息数,默认 20000")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子,默认 0")
+    parser.add_argument("--messages", action="append", default=[], help="额外校验的消息文件,每行一条,可重复指定")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(args.seed)  # noqa: S311
+    lines = [json.dumps(random_message(rng), ensure_ascii=False).encode() for _ in range(args.count)]
+    for path in args.messages:
+        lines.extend(load_messages(path))
+
+    mismatches = check(lines)
+    reference, fast = timing(lines)
+    sys.stdout.write(
+        f"codec={codec()} messages={len(lines)} mismatches={len(mismatches)} "
+        f"pydantic={reference:.3f}s codec_time={fast:.3f}s\n",
+    )
+    for mismatch in mismatches[:10]:
+        sys.stdout.write(mismatch + "\n")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any
+
+import mcp.types
+from fastmcp import Client
+from fastmcp.client.transports import StdioTransport
+from mcp.server.lowlevel import Server
+from mcp.server.stdio import stdio_server
+
+from src.libs.event_loop import loop_factory
+from src.libs.stdio_transport import BufferedStdioTransport
+from src.script.replay_traffic import percentile
+
+logger = logging.getLogger(__name__)
+
+ECHO_TOOL = "echo"
+
+
+async def run_echo(size: int) -> None:
+    """以 stdio 运行一个回显后端,每次调用返回 size 字节的文本."""
+    server = Server("loop-benchmark")
+    payload = "x" * size
+
+    @server.list_tools()
+    async def list_tools() -> list[mcp.types.Tool]:
+        return [mcp.types.Tool(name=ECHO_TOOL, description="返回固定大小的文本", inputSchema={"type": "object"})]
+
+    @server.call_tool()
+    async def call_tool(name: str, arguments: dict[str, Any]) -> list[mcp.types.TextContent]:  # noqa: ARG001
+        return [mcp.types.TextContent(type="text", text=payload)]
+
+    async with stdio_server() as (read_stream, write_stream):
+        await server.run(read_stream, write_stream, server.create_initialization_options())
+
+
+async def benchmark(
+    target: Any,  # noqa: ANN401
+    tool: str,
+    arguments: dict[str, Any],
+    concurrency: int,
+    duration: float,
+) -> tuple[int, int, list[float]]:
+    """以 concurrency 个并发调用 tool,持续 duration 秒.
+
+    Args:
+        target: fastmcp 客户端可连接的目标,网关地址或传输
+        tool: 调用的工具名
+        arguments: 调用参数
+        concurrency: 并发调用数
+        duration: 持续秒数
+
+    Returns:
+        tuple: 成功次数,失败次数,以及每次成功调用的延迟毫秒数
+
+    """
+    latencies: list[float] = []
+    errors = 0
+    async with Client(target) as client:
+        deadline = time.monotonic() + duration
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                try:
+                    result = await client.call_tool_mcp(tool, arguments)
+                except Exception:  # noqa: BLE001
+                    errors += 1
+                    continue
+                if result.isError:
+                    errors += 1
+                    continue
+                latencies.append((time.monotonic() - started) * 1000)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(latencies), errors, latencies
+
+
+def format_report(loop: str, calls: int, errors: int, latencies: list[float], duration: float) -> str:
+    """将压测结果整理为一行,延迟单位为毫秒."""
+    return (
+        f"loop={loop} calls={calls} errors={errors} calls/s={calls / duration:.0f} "
+        f"p50={percentile(latencies, 50):.2f} p95={percentile(latencies, 95):.2f} "
+        f"p99={percentile(latencies, 99):.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="事件循环压测工具：对比 asyncio 与 uvloop 下的吞吐与延迟")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    echo = subparsers.add_parser("echo", help="以 stdio 运行回显后端,供压测或网关配置使用")
+    echo.add_argument("--size", type=int, default=1024, help="每次调用返回的字节数,默认 1024")
+
+    run = subparsers.add_parser("run", help="压测网关,或不指定 --url 时直接压测 stdio 回显后端")
+    run.add_argument("--loop", choices=("asyncio", "uvloop"), default="asyncio", help="压测端使用的事件循环")
+    run.add_argument("--url", help="网关的 MCP 地址,不指定时启动回显后端并经 stdio 传输调用")
+    run.add_argument("--tool", default=ECHO_TOOL, help="调用的工具名,压测网关时需带后端前缀")
+    run.add_argument("--arguments", type=json.loads, default={}, help="调用参数的 JSON 对象,默认为空")
+    run.add_argument("--size", type=int, default=1024, help="回显后端每次返回的字节数,默认 1024")
+    run.add_argument("--concurrency", type=int, default=16, help="并发调用数,默认 16")
+    run.add_argument("--duration", type=float, default=10.0, help="持续秒数,默认 10")
+    run.add_argument("--buffer-limit", type=int, default=16 * 1024 * 1024, help="对应 stdio_buffer_limit")
+    run.add_argument("--queue-size", type=int, default=64, help="对应 stdio_queue_size")
+
+    args = parser.parse_args()
+    if args.command == "echo":
+        asyncio.run(run_echo(args.size))
+        return
+
+    logging.basicConfig(level=logging.WARNING)
+    target = args.url or BufferedStdioTransport(
+        StdioTransport(sys.executable, ["-m", "src.script.loop_benchmark", "echo", "--size", str(args.size)]),
+        args.buffer_limit,
+        args.queue_size,
+    )
+    calls, errors, latencies = asyncio.run(
+        benchmark(target, args.tool, args.arguments, args.concurrency, args.duration),
+        loop_factory=loop_factory(args.loop),
+    )
+    sys.stdout.write(format_report(args.loop, calls, errors, latencies, args.duration) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import statistics
+import sys
+import time
+from collections import defaultdict
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+import mcp.types
+from fastmcp import Client
+from mcp.server.lowlevel import Server
+from mcp.server.stdio import stdio_server
+
+logger = logging.getLogger(__name__)
+
+# CallToolResult 中除文本外的 JSON 开销,替身后端据此还原录制的响应大小
+RESULT_OVERHEAD = len('{"content":[{"type":"text","text":""}],"isError":false}')
+REPLAYED_METHODS = ("tools/call", "tools/list")
+
+
+def load_trace(path: str | Path) -> list[dict[str, Any]]:
+    """读取 NDJSON 录制文件,按请求到达的先后排序.
+
+    Args:
+        path: 录制文件路径
+
+    Returns:
+        list[dict]: 录制的请求记录,跳过无法解析的行
+
+    """
+    records = []
+    with Path(path).open(encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning("跳过第 %s 行,不是合法的 JSON", number)
+    # 按墙上时间排序,重启前后的进程追加到同一文件的记录合并为一条时间线
+    records.sort(key=lambda record: record["timestamp"])
+    return records
+
+
+def arguments_key(tool: str, arguments: dict[str, Any]) -> str:
+    """计算工具调用的指纹,相同工具与参数的调用得到相同的指纹."""
+    payload = json.dumps([tool, arguments], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """返回 values 的 pct 百分位,values 为空时返回 0."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class StandinBackend:
+    """按录制文件模拟一个后端.
+
+    每个工具按录制的耗时响应,并返回与录制大小相同的结果.同一工具与参数的调用
+    依次使用录制的耗时,没有录制过的参数使用该工具耗时的中位数,因此多次回放的
+    后端行为完全一致.
+    """
+
+    def __init__(self, records: list[dict[str, Any]], prefix: str) -> None:
+        """初始化替身后端.
+
+        Args:
+            records: 录制的请求记录
+            prefix: 要模拟的后端前缀,只使用该前缀的工具调用
+
+        """
+        self.timings: dict[str, deque[dict[str, Any]]] = defaultdict(deque)
+        self.by_tool: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for record in records:
+            if record.get("method") != "tools/call" or record.get("prefix") != prefix:
+                continue
+            tool = record["tool"][len(prefix) + 1 :]
+            self.timings[arguments_key(tool, record.get("arguments", {}))].append(record)
+            self.by_tool[tool].append(record)
+
+    def tools(self) -> list[mcp.types.Tool]:
+        """返回录制中出现过的工具,参数不做限制."""
+        return [
+            mcp.types.Tool(name=name, description="Replayed tool", inputSchema={"type": "object"})
+            for name in sorted(self.by_tool)
+        ]
+
+    async def call(self, tool: str, arguments: dict[str, Any]) -> list[mcp.types.TextContent]:
+        """按录制的耗时与响应大小应答一次调用."""
+        record = self._next_record(tool, arguments)
+        await asyncio.sleep(record.get("duration_ms", 0) / 1000)
+        if "error" in record:
+            raise RuntimeError(record["error"])
+        size = max(0, record.get("response_bytes", 0) - RESULT_OVERHEAD)
+        return [mcp.types.TextContent(type="text", text="x" * size)]
+
+    def _next_record(self, tool: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        queue = self.timings.get(arguments_key(tool, arguments))
+        if queue:
+            # 循环使用同一调用的录制结果
+            queue.rotate(-1)
+            return queue[-1]
+        recorded = self.by_tool.get(tool)
+        if not recorded:
+            return {}
+        duration = statistics.median(record.get("duration_ms", 0) for record in recorded)
+        size = int(statistics.median(record.get("response_bytes", 0) for record in recorded))
+        return {"duration_ms": duration, "response_bytes": size}
+
+
+async def run_standin(trace: str, prefix: str) -> None:
+    """以 stdio MCP 服务器的方式运行替身后端."""
+    backend = StandinBackend(load_trace(trace), prefix)
+    server = Server(f"standin-{prefix}")
+
+    @server.list_tools()
+    async def list_tools() -> list[mcp.types.Tool]:
+        return backend.tools()
+
+    @server.call_tool()
+    async def call_tool(name: str, arguments: dict[str, Any]) -> list[mcp.types.TextContent]:
+        return await backend.call(name, arguments)
+
+    async with stdio_server() as (read_stream, write_stream):
+        await server.run(read_stream, write_stream, server.create_initialization_options())
+
+
+async def replay(trace: str, url: str, speed: float) -> dict[str, dict[str, list[float]]]:
+    """按录制的时间间隔向网关回放请求.
+
+    Args:
+        trace: 录制文件路径
+        url: 网关的 MCP 地址,以 /sse 结尾时使用 SSE
+        speed: 回放速度倍数,2 表示以两倍速度发出请求
+
+    Returns:
+        dict: 以工具名为键,包含录制与回放的延迟以及失败次数
+
+    """
+    records = [record for record in load_trace(trace) if record.get("method") in REPLAYED_METHODS]
+    results: dict[str, dict[str, list[float]]] = defaultdict(lambda: {"captured": [], "replayed": [], "errors": []})
+    if not records:
+        logger.warning("录制文件中没有可回放的请求")
+        return results
+
+    async with Client(url) as client:
+
+        async def send(record: dict[str, Any]) -> None:
+            key = record.get("tool", record["method"])
+            started = time.monotonic()
+            try:
+                if record["method"] == "tools/list":
+                    await client.list_tools()
+                elif (await client.call_tool_mcp(record["tool"], record.get("arguments", {}))).isError:
+                    results[key]["errors"].append("tool error")
+                    return
+            except Exception as e:  # noqa: BLE001
+                results[key]["errors"].append(str(e))
+                return
+            results[key]["captured"].append(record["duration_ms"])
+            results[key]["replayed"].append((time.monotonic() - started) * 1000)
+
+        first = records[0]["timestamp"]
+        start = time.monotonic()
+        tasks = []
+        for record in records:
+            # 按录制时的间隔发出请求,不等待前一个请求完成
+            delay = (record["timestamp"] - first) / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(record)))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def format_report(results: dict[str, dict[str, list[float]]]) -> str:
+    """将回放结果整理为每个工具一行的延迟对比表,单位为毫秒."""
+    header = f"{'tool':<32} {'calls':>6} {'errors':>6} {'p50':>9} {'p50 Δ':>9} {'p95':>9} {'p95 Δ':>9}"
+    lines = [header, "-" * len(header)]
+    for key in sorted(results):
+        captured, replayed = results[key]["captured"], results[key]["replayed"]
+        p50, p95 = percentile(replayed, 50), percentile(replayed, 95)
+        lines.append(
+            f"{key:<32} {len(replayed):>6} {len(results[key]['errors']):>6} "
+            f"{p50:>9.1f} {p50 - percentile(captured, 50):>+9.1f} "
+            f"{p95:>9.1f} {p95 - percentile(captured, 95):>+9.1f}",
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="流量回放工具：用录制的请求对网关做性能回归测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    standin = subparsers.add_parser("standin", help="按录制文件模拟一个后端,在网关配置中作为 process 后端启动")
+    standin.add_argument("--trace", required=True, help="capture_file 录制的 NDJSON 文件")
+    standin.add_argument("--prefix", required=True, help="要模拟的后端前缀")
+
+    run = subparsers.add_parser("replay", help="向网关回放录制的请求并对比延迟")
+    run.add_argument("--trace", required=True, help="capture_file 录制的 NDJSON 文件")
+    run.add_argument("--url", default="http://127.0.0.1:8090/mcp", help="网关的 MCP 地址,默认为本机 8090 端口")
+    run.add_argument("--speed", type=float, default=1.0, help="回放速度倍数,默认按录制时的速度")
+
+    args = parser.parse_args()
+    if args.command == "standin":
+        asyncio.run(run_standin(args.trace, args.prefix))
+        return
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(replay(args.trace, args.url, args.speed))
+    sys.stdout.write(format_report(results) + "\n")
+
+
+if __name__ == "__main__":
+    main()
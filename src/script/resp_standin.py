@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+from src.libs.shared_store import read_reply
+
+logger = logging.getLogger(__name__)
+
+
+def encode(value: bytes | str | int | list | None) -> bytes:
+    """将应答编码为 RESP 格式,字符串以 + 开头的简单字符串返回."""
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+
+
+class RespStandin:
+    """用于本地测试共享存储的 Redis 协议替身.
+
+    只实现网关用到的 PING、AUTH、SELECT、GET、SET、DEL、PUBLISH 与 SUBSCRIBE,
+    数据按 SELECT 选择的库分别保存在内存中.多个网关节点指向同一个替身即可验证跨节点的缓存与失效通知.
+    """
+
+    def __init__(self, password: str | None = None) -> None:
+        """初始化替身.
+
+        Args:
+            password: 设置后客户端需先 AUTH
+
+        """
+        self.password = password
+        self.databases: dict[int, dict[bytes, tuple[bytes, float | None]]] = defaultdict(dict)
+        self.channels: dict[bytes, set[asyncio.StreamWriter]] = defaultdict(set)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个客户端连接,直到连接关闭."""
+        authenticated = self.password is None
+        db = 0
+        try:
+            while True:
+                command = await read_reply(reader)
+                name, args = command[0].upper(), command[1:]
+                if name == b"AUTH":
+                    authenticated = args[-1].decode() == self.password
+                    writer.write(encode("OK") if authenticated else b"-WRONGPASS invalid password\r\n")
+                elif not authenticated:
+                    writer.write(b"-NOAUTH Authentication required.\r\n")
+                elif name == b"SELECT":
+                    db = int(args[0])
+                    writer.write(encode("OK"))
+                elif name == b"SUBSCRIBE":
+                    for channel in args:
+                        self.channels[channel].add(writer)
+                        writer.write(encode([b"subscribe", channel, len(self.channels[channel])]))
+                else:
+                    writer.write(self.execute(name, args, self.databases[db]))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for subscribers in self.channels.values():
+                subscribers.discard(writer)
+            writer.close()
+
+    def execute(self, name: bytes, args: list[bytes], values: dict[bytes, tuple[bytes, float | None]]) -> bytes:
+        """在连接选择的库 ``values`` 上执行一条普通命令并返回编码后的应答."""
+        commands = {
+            b"PING": lambda *_: encode("PONG"),
+            b"GET": self._get,
+            b"SET": self._set,
+            b"DEL": self._delete,
+            b"PUBLISH": self._publish,
+        }
+        command = commands.get(name)
+        if command is None:
+            return f"-ERR unknown command '{name.decode()}'\r\n".encode()
+        return command(args, values)
+
+    @staticmethod
+    def _get(args: list[bytes], values: dict[bytes, tuple[bytes, float | None]]) -> bytes:
+        entry = values.get(args[0])
+        if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+            values.pop(args[0], None)
+            return encode(None)
+        return encode(entry[0])
+
+    @staticmethod
+    def _set(args: list[bytes], values: dict[bytes, tuple[bytes, float | None]]) -> bytes:
+        expires = None
+        if len(args) >= 4 and args[2].upper() in (b"PX", b"EX"):  # noqa: PLR2004
+            scale = 1000 if args[2].upper() == b"PX" else 1
+            expires = time.monotonic() + int(args[3]) / scale
+        values[args[0]] = (args[1], expires)
+        return encode("OK")
+
+    @staticmethod
+    def _delete(args: list[bytes], values: dict[bytes, tuple[bytes, float | None]]) -> bytes:
+        return encode(sum(values.pop(key, None) is not None for key in args))
+
+    def _publish(self, args: list[bytes], _values: dict[bytes, tuple[bytes, float | None]]) -> bytes:
+        subscribers = self.channels.get(args[0], set())
+        for subscriber in subscribers:
+            subscriber.write(encode([b"message", args[0], args[1]]))
+        return encode(len(subscribers))
+
+
+async def serve(host: str, port: int, password: str | None) -> None:
+    """启动替身并一直运行."""
+    standin = RespStandin(password)
+    server = await asyncio.start_server(standin.handle, host, port)
+    logger.info("RESP 替身已在 %s:%s 启动", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Redis 协议替身：在本地测试多个网关节点共享的存储")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址,默认为本机")
+    parser.add_argument("--port", type=int, default=6379, help="监听端口,默认为 6379")
+    parser.add_argument("--password", default=None, help="设置后客户端需先 AUTH")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.host, args.port, args.password))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import secrets
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+import httpx
+from fastmcp import Client
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[2]
+# 网关与替身后端的环境变量中带有本次压测的标记,用于在 /proc 中找到它们,包括已脱离父进程的
+MARKER_ENV = "MOONSHOT_SOAK_ID"
+ADMIN_PATH = "/admin"
+# 每个会话在压测结束后最多再等待的秒数,超时计为失败,避免卡住的调用拖住整个压测
+SESSION_GRACE = 30.0
+# 判断增长时比较的样本数,取开头与末尾各这么多个样本的中位数
+WINDOW = 3
+# 各指标允许的增长量,超过后判定为泄漏
+TOLERANCES = {
+    "gateways": 0,
+    "gateway_rss_mb": 48.0,
+    "gateway_fds": 16,
+    "gateway_threads": 4,
+    "backends": 0,
+    "tasks": 16,
+}
+# 配置变体:每轮交替使用,在增删后端与调整副本数之间切换
+VARIANTS = (
+    {"a": {"replicas": 1}},
+    {"a": {"replicas": 1}, "b": {"replicas": 2}},
+)
+
+
+def write_config(path: Path, port: int, token: str, cycle: int) -> list[str]:
+    """写入第 cycle 轮的网关配置,后端均为 loop_benchmark 的回显后端.
+
+    Returns:
+        list[str]: 该配置下可调用的工具名
+
+    """
+    backends = VARIANTS[cycle % len(VARIANTS)]
+    lines = [
+        "[server]",
+        'name = "soak"',
+        'host = "127.0.0.1"',
+        f"port = {port}",
+        f'admin_path = "{ADMIN_PATH}"',
+        "drain_timeout = 5.0",
+        "# cycle = " + str(cycle),
+    ]
+    for name, options in backends.items():
+        lines += [
+            "",
+            f"[mcpServers.{name}]",
+            'type = "process"',
+            f"command = {json.dumps(sys.executable)}",
+            f"script_path = {json.dumps(str(ROOT / 'src' / 'script' / 'loop_benchmark.py'))}",
+            'args = ["echo", "--size", "256"]',
+            f'prefix = "{name}"',
+            f"replicas = {options['replicas']}",
+            f"env = {{ PYTHONPATH = {json.dumps(str(ROOT))}, {MARKER_ENV} = {json.dumps(token + ':backend')} }}",
+        ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return [f"{name}_echo" for name in backends]
+
+
+def marked_processes(token: str) -> dict[str, list[int]]:
+    """在 /proc 中查找带有本次标记的进程,按网关与后端分组."""
+    found: dict[str, list[int]] = {"gateway": [], "backend": []}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            environ = (entry / "environ").read_bytes().split(b"\0")
+        except OSError:
+            continue
+        for role, pids in found.items():
+            if f"{MARKER_ENV}={token}:{role}".encode() in environ:
+                pids.append(int(entry.name))
+    return found
+
+
+def process_usage(pid: int) -> tuple[float, int, int]:
+    """返回进程的常驻内存 MB,打开的文件描述符数与线程数,进程已退出时返回 0."""
+    try:
+        status = (Path("/proc") / str(pid) / "status").read_text(encoding="utf-8")
+        fds = sum(1 for _ in (Path("/proc") / str(pid) / "fd").iterdir())
+    except OSError:
+        return 0.0, 0, 0
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+    return int(fields["VmRSS"].split()[0]) / 1024, fds, int(fields["Threads"])
+
+
+async def sample(url: str, token: str, cycle: int) -> dict[str, Any]:
+    """采集一次网关与后端的资源指标,以及网关内存活的任务数."""
+    processes = marked_processes(token)
+    usage = [process_usage(pid) for pid in processes["gateway"]]
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            status = (await client.get(f"{url}{ADMIN_PATH}/status")).json()
+        tasks = status["process"]["tasks"]
+    except (httpx.HTTPError, ValueError, KeyError):
+        tasks = -1
+    return {
+        "at": time.time(),
+        "cycle": cycle,
+        "variant": cycle % len(VARIANTS),
+        "gateways": len(processes["gateway"]),
+        "gateway_rss_mb": round(sum(rss for rss, _, _ in usage), 1),
+        "gateway_fds": sum(fds for _, fds, _ in usage),
+        "gateway_threads": sum(threads for _, _, threads in usage),
+        "backends": len(processes["backend"]),
+        "tasks": tasks,
+    }
+
+
+def find_growth(samples: list[dict[str, Any]], warmup: int) -> list[str]:
+    """按配置变体分组比较开头与末尾的样本,返回超过允许增长量的指标说明."""
+    by_variant: dict[int, list[dict[str, Any]]] = defaultdict(list)
+    for item in samples[warmup:]:
+        by_variant[item["variant"]].append(item)
+    failures = []
+    for variant, series in sorted(by_variant.items()):
+        if len(series) < 2 * WINDOW:
+            continue
+        for metric, tolerance in TOLERANCES.items():
+            values = [item[metric] for item in series]
+            baseline = statistics.median(values[:WINDOW])
+            latest = statistics.median(values[-WINDOW:])
+            if latest - baseline > tolerance:
+                failures.append(
+                    f"variant {variant}: {metric} grew from {baseline} to {latest} over {len(values)} cycles",
+                )
+    return failures
+
+
+async def drive_traffic(url: str, tools: list[str], seconds: float, concurrency: int) -> tuple[int, int]:
+    """以 concurrency 个客户端持续调用 seconds 秒,每个会话调用若干次后重新连接.
+
+    Returns:
+        tuple: 成功的调用次数,以及失败的调用与连接次数
+
+    """
+    deadline = time.monotonic() + seconds
+    succeeded = errors = 0
+    rng = random.Random()  # noqa: S311
+
+    async def worker() -> None:
+        nonlocal succeeded, errors
+        while time.monotonic() < deadline:
+            try:
+                async with asyncio.timeout(deadline - time.monotonic() + SESSION_GRACE), Client(f"{url}/mcp") as client:
+                    for _ in range(rng.randint(1, 20)):
+                        if time.monotonic() >= deadline:
+                            break
+                        if (await client.call_tool_mcp(rng.choice(tools), {})).isError:
+                            errors += 1
+                        else:
+                            succeeded += 1
+            except Exception:  # noqa: BLE001
+                errors += 1
+                await asyncio.sleep(0.5)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return succeeded, errors
+
+
+def kill_backend(token: str) -> int | None:
+    """强制结束一个替身后端,由网关的监控重启它,返回被结束的进程号."""
+    backends = marked_processes(token)["backend"]
+    if not backends:
+        return None
+    pid = random.choice(backends)  # noqa: S311
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        return None
+    return pid
+
+
+async def wait_ready(url: str, seconds: float) -> None:
+    """等待网关的管理接口可以访问,最多等待 seconds 秒."""
+    deadline = time.monotonic() + seconds
+    async with httpx.AsyncClient(timeout=2) as client:
+        while True:
+            try:
+                if (await client.get(f"{url}{ADMIN_PATH}/status")).status_code == 200:  # noqa: PLR2004
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                msg = f"网关在 {seconds} 秒内没有启动"
+                raise TimeoutError(msg)
+            await asyncio.sleep(0.5)
+
+
+async def stop_all(token: str, seconds: float) -> list[int]:
+    """结束所有带标记的网关并等待它们与后端退出,返回 seconds 秒后仍存在的进程号."""
+    for pid in marked_processes(token)["gateway"]:
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        remaining = [pid for pids in marked_processes(token).values() for pid in pids]
+        if not remaining:
+            return []
+        await asyncio.sleep(0.5)
+    return [pid for pids in marked_processes(token).values() for pid in pids]
+
+
+def append_sample(path: str, item: dict[str, Any]) -> None:
+    """将一轮的样本追加到 NDJSON 文件."""
+    with Path(path).open("a", encoding="utf-8") as file:
+        file.write(json.dumps(item) + "\n")
+
+
+def format_sample(item: dict[str, Any], calls: int, errors: int) -> str:
+    """将一轮的样本整理为一行."""
+    metrics = " ".join(f"{metric}={item[metric]}" for metric in TOLERANCES)
+    return f"cycle={item['cycle']} variant={item['variant']} {metrics} calls={calls} errors={errors}"
+
+
+async def soak(args: argparse.Namespace) -> int:
+    """运行压测,返回退出码:0 表示没有发现泄漏."""
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="moonshot-soak-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    config_path = workdir / "moonshot_config.toml"
+    token = secrets.token_hex(8)
+    url = f"http://127.0.0.1:{args.port}"
+    tools = write_config(config_path, args.port, token, 0)
+
+    with (workdir / "gateway.log").open("ab") as log:
+        # 网关在独立的会话中运行,零停机重启后的新进程不是本进程的子进程,通过标记查找
+        subprocess.Popen(  # noqa: S603, ASYNC220
+            [sys.executable, str(ROOT / "server.py")],
+            cwd=workdir,
+            env={**os.environ, MARKER_ENV: f"{token}:gateway"},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    sys.stdout.write(f"workdir={workdir} marker={token}\n")
+    samples: list[dict[str, Any]] = []
+    failures: list[str] = []
+    total_calls = total_errors = 0
+    deadline = time.monotonic() + args.duration
+    try:
+        await wait_ready(url, args.settle * 4)
+        cycle = 0
+        while time.monotonic() < deadline and not failures:
+            if cycle:
+                tools = write_config(config_path, args.port, token, cycle)
+                await asyncio.sleep(args.settle)
+            if args.kill_every and cycle % args.kill_every == args.kill_every - 1:
+                kill_backend(token)
+            succeeded, errors = await drive_traffic(url, tools, args.cycle_seconds, args.concurrency)
+            calls = succeeded + errors
+            total_calls += calls
+            total_errors += errors
+            await asyncio.sleep(args.settle)
+            item = await sample(url, token, cycle)
+            samples.append(item)
+            sys.stdout.write(format_sample(item, calls, errors) + "\n")
+            sys.stdout.flush()
+            if args.samples:
+                append_sample(args.samples, item)
+            failures = find_growth(samples, args.warmup)
+            if errors and not succeeded:
+                failures.append(f"cycle {cycle}: all {calls} calls failed, see {workdir / 'gateway.log'}")
+            cycle += 1
+    finally:
+        leftover = await stop_all(token, args.settle * 2)
+    if leftover:
+        failures.append(f"processes left after shutdown: {leftover}")
+    if total_calls and total_errors / total_calls > args.max_error_rate:
+        failures.append(f"error rate {total_errors / total_calls:.2%} of {total_calls} calls")
+    for failure in failures:
+        sys.stdout.write(f"FAIL {failure}\n")
+    if not failures:
+        sys.stdout.write(f"PASS {len(samples)} cycles, {total_calls} calls, {total_errors} errors\n")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="长时间压测工具：反复修改配置,重启替身后端并持续调用,检查网关的内存,文件描述符,进程与任务是否泄漏,"
+        "通过 /proc 采集指标,仅支持 Linux",
+    )
+    parser.add_argument("--duration", type=float, default=4 * 3600, help="压测总秒数,默认 4 小时")
+    parser.add_argument("--cycle-seconds", type=float, default=30.0, help="每轮持续调用的秒数,默认 30")
+    parser.add_argument("--settle", type=float, default=10.0, help="修改配置后与采样前等待的秒数,默认 10")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发客户端数,默认 8")
+    parser.add_argument("--kill-every", type=int, default=2, help="每隔几轮强制结束一个替身后端,0 表示不结束")
+    parser.add_argument("--warmup", type=int, default=4, help="不参与增长判断的前几轮,默认 4")
+    parser.add_argument("--max-error-rate", type=float, default=0.05, help="允许的调用失败比例,默认 0.05")
+    parser.add_argument("--port", type=int, default=8190, help="网关监听的端口,默认 8190")
+    parser.add_argument("--workdir", help="存放配置与网关日志的目录,默认新建临时目录")
+    parser.add_argument("--samples", help="将每轮的样本以 NDJSON 格式追加到该文件")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # 重启与结束后端时客户端的连接错误已计入失败次数,不再逐条输出
+    logging.getLogger("mcp").setLevel(logging.CRITICAL)
+    sys.exit(asyncio.run(soak(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""读取 /proc 的辅助函数(仅 Linux)."""
+
+import os
+from pathlib import Path
+
+PROC = Path("/proc")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def child_pids(pid: int) -> set[int]:
+    """获取进程的直接子进程.
+
+    Args:
+        pid: 父进程 ID
+
+    Returns:
+        set[int]: 子进程 ID 集合,无法读取 /proc 时返回空集合
+
+    """
+    children: set[int] = set()
+    try:
+        for task in (PROC / str(pid) / "task").iterdir():
+            text = (task / "children").read_text()
+            children.update(int(child) for child in text.split())
+    except OSError:
+        return _scan_child_pids(pid)
+    return children
+
+
+def _scan_child_pids(pid: int) -> set[int]:
+    """在没有 children 文件的内核上扫描 /proc 查找子进程."""
+    children: set[int] = set()
+    for entry in PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        stat = read_stat(int(entry.name))
+        if stat and int(stat[1]) == pid:
+            children.add(int(entry.name))
+    return children
+
+
+def read_stat(pid: int) -> list[str] | None:
+    """读取 /proc/<pid>/stat,返回从 state 字段开始的字段列表.
+
+    进程名可能包含空格和括号,因此从最后一个 ')' 之后开始切分。
+    """
+    try:
+        text = (PROC / str(pid) / "stat").read_text()
+    except OSError:
+        return None
+    return text[text.rfind(")") + 2 :].split()
+
+
+def is_alive(pid: int) -> bool:
+    """判断进程是否存活(僵尸进程视为已退出)."""
+    stat = read_stat(pid)
+    return stat is not None and stat[0] not in ("Z", "X")
+
+
+def descendant_pids(pid: int) -> set[int]:
+    """获取进程的所有后代进程(npx/uvx 往往会再派生真正的服务进程)."""
+    found: set[int] = set()
+    pending = [pid]
+    while pending:
+        for child in child_pids(pending.pop()):
+            if child not in found:
+                found.add(child)
+                pending.append(child)
+    return found
+
+
+def read_rss(pid: int) -> int:
+    """读取进程常驻内存大小(字节),进程不存在时返回 0."""
+    try:
+        fields = (PROC / str(pid) / "statm").read_text().split()
+    except OSError:
+        return 0
+    return int(fields[1]) * PAGE_SIZE
+
+
+def read_cpu_seconds(pid: int) -> float:
+    """读取进程累计的用户态与内核态 CPU 时间(秒)."""
+    stat = read_stat(pid)
+    if stat is None:
+        return 0.0
+    # stat[11]/stat[12] 对应 /proc/<pid>/stat 的第 14/15 个字段 utime/stime
+    return (int(stat[11]) + int(stat[12])) / CLOCK_TICKS
+
+
+def count_fds(pid: int) -> int:
+    """统计进程打开的文件描述符数量."""
+    try:
+        return sum(1 for _ in (PROC / str(pid) / "fd").iterdir())
+    except OSError:
+        return 0
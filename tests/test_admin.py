@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from starlette.requests import Request
+
+from src.libs.mcp_server import McpServer
+from src.models.config_model import ServerConfig
+
+
+def request(query: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/admin/profile",
+            "query_string": query.encode(),
+            "headers": [],
+            "client": ("127.0.0.1", 50000),
+        },
+    )
+
+
+async def create_server() -> McpServer:
+    return await McpServer.create(
+        ServerConfig(name="test", tool_search_limit=0),
+        {},
+        logging.getLogger("test_admin"),
+    )
+
+
+@pytest.mark.parametrize("query", ["interval=nan", "interval=inf", "seconds=nan", "seconds=-inf", "interval=x"])
+def test_profile_rejects_non_finite_numbers(query: str) -> None:
+    async def run() -> None:
+        server = await create_server()
+        try:
+            response = await server._admin_profile(request(query))  # noqa: SLF001
+            assert response.status_code == 400
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_profile_interval_is_capped_by_its_duration() -> None:
+    async def run() -> None:
+        server = await create_server()
+        try:
+            started = time.monotonic()
+            response = await server._admin_profile(request("seconds=0.2&interval=1e9"))  # noqa: SLF001
+            assert response.status_code == 200
+            assert time.monotonic() - started < 5
+            # 剖析锁已经释放,下一次剖析可以开始
+            response = await server._admin_profile(request("seconds=0.1"))  # noqa: SLF001
+            assert response.status_code == 200
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
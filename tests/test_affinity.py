@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import sys
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastmcp import Client
+
+from src.libs.affinity import PinLimitError
+from src.libs.mcp_server import McpServer
+from src.models.config_model import ProxyConfig
+from src.models.config_model import ServerConfig
+from src.utils.procfs import is_alive
+
+BACKEND = """
+import os
+
+from fastmcp import FastMCP
+
+server = FastMCP("pinned")
+
+
+@server.tool()
+def pid() -> int:
+    return os.getpid()
+
+
+server.run()
+"""
+
+
+@asynccontextmanager
+async def gateway(tmp_path: Path, **options: object) -> AsyncIterator[McpServer]:
+    """Run the gateway in process with one stdio backend that has session affinity."""
+    script = tmp_path / "backend.py"
+    script.write_text(BACKEND, encoding="utf-8")
+    backend = ProxyConfig(
+        type="process",
+        prefix="p",
+        command=sys.executable,
+        script_path=str(script),
+        affinity=True,
+        **options,
+    )
+    server = await McpServer.create(
+        ServerConfig(name="test", tool_search_limit=0, resource_sample_interval=0.1),
+        {"pinned": backend},
+        logging.getLogger("test_affinity"),
+    )
+    try:
+        await server.create_proxies()
+        yield server
+    finally:
+        await server.stop()
+
+
+async def call_pid(client: Client) -> tuple[bool, str]:
+    result = await asyncio.wait_for(client.call_tool_mcp("p_pid", {}), 15)
+    return result.isError, result.content[0].text
+
+
+async def eventually(check: Callable[[], bool], timeout: float = 10) -> None:  # noqa: ASYNC109
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.05)
+
+
+def affinity(server: McpServer) -> dict:
+    return server.backend_status()["pinned"]["affinity"]
+
+
+def pinned_usage(server: McpServer) -> dict[str, dict]:
+    return {key: usage for key, usage in server.resource_usage().items() if key.startswith("p@")}
+
+
+def test_pinned_process_is_supervised_and_released_with_its_session(tmp_path: Path) -> None:
+    async def run() -> None:
+        async with gateway(tmp_path, max_pinned_sessions=1) as server:
+            primary = server.supervisors["pinned"].pids
+            async with Client(server.main_server) as second:
+                async with Client(server.main_server) as first:
+                    failed, text = await call_pid(first)
+                    assert not failed
+                    pid = int(text)
+                    assert pid not in primary
+                    assert affinity(server)["pids"] == [pid]
+                    await eventually(lambda: any(pid in usage["pids"] for usage in pinned_usage(server).values()))
+
+                    # 固定会话已达上限,新的前端会话被拒绝
+                    failed, text = await call_pid(second)
+                    assert failed
+                    assert str(PinLimitError("pinned", 1)) in text
+
+                # 前端会话结束后固定的进程随之关闭
+                await eventually(lambda: not is_alive(pid))
+                await eventually(lambda: not pinned_usage(server))
+                failed, text = await call_pid(second)
+                assert not failed
+                assert int(text) != pid
+                assert affinity(server)["opened"] == 2
+
+    asyncio.run(run())
+
+
+def test_idle_pinned_session_is_closed(tmp_path: Path) -> None:
+    async def run() -> None:
+        async with gateway(tmp_path, pinned_idle_timeout=0.2) as server, Client(server.main_server) as client:
+            _, first = await call_pid(client)
+            await eventually(lambda: affinity(server)["expired"] == 1)
+            assert affinity(server)["pinned"] == 0
+            await eventually(lambda: not is_alive(int(first)))
+
+            _, second = await call_pid(client)
+            assert second != first
+            assert affinity(server)["opened"] == 2
+
+    asyncio.run(run())
+
+
+def test_pinned_process_is_held_to_max_rss(tmp_path: Path) -> None:
+    async def run() -> None:
+        options = {"max_rss_mb": 1, "max_restarts": 100, "restart_backoff": 0.1}
+        async with gateway(tmp_path, **options) as server, Client(server.main_server) as client:
+            _, first = await call_pid(client)
+            (supervisor,) = server.clients[0].pins.supervisors()
+            await eventually(lambda: supervisor.restart_count > 0)
+            assert supervisor.last_exit_reason.startswith("rss")
+            await eventually(lambda: not is_alive(int(first)))
+
+    asyncio.run(run())
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import sys
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import mcp.types
+from fastmcp import Client
+
+from src.libs.mcp_server import McpServer
+from src.models.config_model import ProxyConfig
+from src.models.config_model import ServerConfig
+
+# 慢工具被取消时写入标记文件,测试据此确认取消到达了后端
+BACKEND = """
+import asyncio
+import sys
+from pathlib import Path
+
+from fastmcp import FastMCP
+
+server = FastMCP("slow")
+marker = Path(sys.argv[1])
+
+
+@server.tool()
+async def wait(seconds: float) -> str:
+    try:
+        await asyncio.sleep(seconds)
+    except asyncio.CancelledError:
+        marker.write_text("cancelled")
+        raise
+    return "done"
+
+
+@server.tool()
+def echo(text: str) -> str:
+    return text
+
+
+server.run()
+"""
+
+
+@asynccontextmanager
+async def gateway(tmp_path: Path, **options: object) -> AsyncIterator[Client]:
+    """Run the gateway in process with one stdio backend, and connect a client to it."""
+    script = tmp_path / "backend.py"
+    script.write_text(BACKEND, encoding="utf-8")
+    backend = ProxyConfig(
+        type="process",
+        prefix="s",
+        command=sys.executable,
+        script_path=str(script),
+        args=[str(tmp_path / "cancelled")],
+        **options,
+    )
+    server = await McpServer.create(
+        ServerConfig(name="test", tool_search_limit=0),
+        {"slow": backend},
+        logging.getLogger("test_cancellation"),
+    )
+    try:
+        await server.create_proxies()
+        async with Client(server.main_server) as client:
+            yield client
+    finally:
+        await server.stop()
+
+
+async def wait_for_file(path: Path, timeout: float) -> bool:  # noqa: ASYNC109
+    deadline = time.monotonic() + timeout
+    while not path.exists():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def echo(client: Client, timeout: float) -> str:  # noqa: ASYNC109
+    """Call s_echo until it succeeds.
+
+    Backends built on MCP SDK 1.9 exit after a cancelled request, like this
+    test's own backend, and the supervisor restarts them.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = await asyncio.wait_for(client.call_tool_mcp("s_echo", {"text": "still up"}), timeout)
+        if not result.isError or time.monotonic() > deadline:
+            return result.content[0].text
+        await asyncio.sleep(0.2)
+
+
+def test_client_cancellation_reaches_the_backend(tmp_path: Path) -> None:
+    async def run() -> None:
+        async with gateway(tmp_path) as client:
+            # 发送前读取计数器得到该请求的 id,与网关转发时的做法相同
+            request_id = client.session._request_id  # noqa: SLF001
+            call = asyncio.create_task(client.call_tool_mcp("s_wait", {"seconds": 30}))
+            await asyncio.sleep(0.5)
+            await client.session.send_notification(
+                mcp.types.ClientNotification(
+                    mcp.types.CancelledNotification(
+                        method="notifications/cancelled",
+                        params=mcp.types.CancelledNotificationParams(requestId=request_id, reason="test"),
+                    ),
+                ),
+            )
+            assert await wait_for_file(tmp_path / "cancelled", 10)
+            call.cancel()
+            await asyncio.gather(call, return_exceptions=True)
+
+            # 只有被取消的请求结束,会话仍可继续使用
+            await asyncio.wait_for(client.ping(), 5)
+            assert await echo(client, 15) == "still up"
+
+    asyncio.run(run())
+
+
+def test_backend_timeout_cancels_the_upstream_request(tmp_path: Path) -> None:
+    async def run() -> None:
+        async with gateway(tmp_path, timeout=0.5) as client:
+            result = await asyncio.wait_for(client.call_tool_mcp("s_wait", {"seconds": 30}), 10)
+            assert result.isError
+            assert await wait_for_file(tmp_path / "cancelled", 10)
+            assert await echo(client, 15) == "still up"
+
+    asyncio.run(run())
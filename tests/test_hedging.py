@@ -0,0 +1,26 @@
+import asyncio
+
+from src.libs.hedging import MIN_SAMPLES
+from src.libs.hedging import Hedger
+
+
+def test_cancelled_primary_still_counts_toward_the_percentile() -> None:
+    delays = {"fast": 0.001, "hedge": 0.05, "slow": 1.0}
+
+    async def attempt(replica: str) -> str:
+        await asyncio.sleep(delays[replica])
+        return replica
+
+    async def run() -> tuple[Hedger, str]:
+        hedger = Hedger("backend", ["*"], 50, 1.0)
+        for _ in range(MIN_SAMPLES):
+            await hedger.call("tool", ["fast", "fast"], attempt)
+        return hedger, await hedger.call("tool", ["slow", "hedge"], attempt)
+
+    hedger, result = asyncio.run(run())
+    window = hedger._windows["tool"]  # noqa: SLF001
+    assert result == "hedge"
+    assert hedger.hedge_wins == 1
+    # 被取消的首个请求记录了已运行的时间,对冲请求本身不记录
+    assert len(window.samples) == MIN_SAMPLES + 1
+    assert window.samples[-1] >= max(list(window.samples)[:-1])
@@ -0,0 +1,34 @@
+import asyncio
+
+import anyio
+import httpx
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import INTERNAL_ERROR
+from mcp.types import ErrorData
+
+from src.libs.proxy_client import is_overload
+from src.libs.supervisor import BackendUnavailableError
+
+
+@pytest.mark.parametrize(
+    ("error", "overload"),
+    [
+        (None, False),
+        (TimeoutError(), True),
+        (ConnectionResetError(), True),
+        (httpx.ConnectError("refused"), True),
+        (anyio.ClosedResourceError(), True),
+        (McpError(ErrorData(code=httpx.codes.REQUEST_TIMEOUT, message="timed out")), True),
+        (McpError(ErrorData(code=INTERNAL_ERROR, message="tool failed")), False),
+        (BackendUnavailableError("backend", "restarting"), False),
+        (asyncio.CancelledError(), False),
+        (ValueError("bad arguments"), False),
+    ],
+)
+def test_only_timeouts_and_transport_failures_count_as_overload(
+    error: BaseException | None,
+    *,
+    overload: bool,
+) -> None:
+    assert is_overload(error) is overload
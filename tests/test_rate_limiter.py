@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+
+import pytest
+
+from src.libs import rate_limiter
+from src.libs.rate_limiter import RATE_LIMITED
+from src.libs.rate_limiter import RateLimiter
+from src.libs.rate_limiter import RateLimitExceededError
+from src.models.config_model import ProxyConfig
+from src.models.config_model import ServerConfig
+
+
+@dataclass
+class Clock:
+    now: float = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def limiter(proxies: dict[str, ProxyConfig] | None = None, **limits: float) -> RateLimiter:
+    return RateLimiter(ServerConfig(name="test", **limits), proxies or {})
+
+
+def admit(limiter: RateLimiter, client: str, prefix: str | None = None) -> None:
+    with limiter.acquire(client, prefix):
+        pass
+
+
+def test_no_limits_configured() -> None:
+    assert not limiter().enabled
+
+
+def test_token_bucket_refills(clock: Clock) -> None:
+    limits = limiter(rate_limit=2, rate_burst=2)
+    admit(limits, "a")
+    admit(limits, "a")
+    with pytest.raises(RateLimitExceededError) as rejected:
+        admit(limits, "a")
+    assert rejected.value.error.code == RATE_LIMITED
+    assert rejected.value.error.data == {"scope": "global", "retry_after": 0.5}
+
+    # 其他客户端有各自的令牌桶
+    admit(limits, "b")
+
+    clock.now += 0.5
+    admit(limits, "a")
+    with pytest.raises(RateLimitExceededError):
+        admit(limits, "a")
+
+    # 令牌最多累积到 burst 个
+    clock.now += 60
+    admit(limits, "a")
+    admit(limits, "a")
+    with pytest.raises(RateLimitExceededError):
+        admit(limits, "a")
+
+
+def test_concurrency_cap() -> None:
+    limits = limiter(max_concurrent_per_client=1)
+    with limits.acquire("a"):
+        with pytest.raises(RateLimitExceededError) as rejected:
+            admit(limits, "a")
+        admit(limits, "b")
+    assert rejected.value.retry_after is None
+    assert rejected.value.error.data == {"scope": "global", "retry_after": None}
+    admit(limits, "a")
+
+
+@pytest.mark.usefixtures("clock")
+def test_prefix_limit_applies_on_top_of_global() -> None:
+    proxy = ProxyConfig(type="http", prefix="p", url="http://backend", rate_limit=1, rate_burst=1)
+    limits = limiter({"p": proxy}, rate_limit=1, rate_burst=2)
+    admit(limits, "a", "p")
+    with pytest.raises(RateLimitExceededError) as rejected:
+        admit(limits, "a", "p")
+    assert rejected.value.scope == "p"
+
+    # 被前缀限制拒绝的请求不消耗全局令牌
+    admit(limits, "a")
+    with pytest.raises(RateLimitExceededError) as rejected:
+        admit(limits, "a")
+    assert rejected.value.scope == "global"
+    assert rejected.value.error.data["retry_after"] == 1.0
+
+
+def test_busy_clients_are_not_evicted(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(rate_limiter, "MAX_TRACKED_CLIENTS", 2)
+    limits = limiter(max_concurrent_per_client=1)
+    with limits.acquire("a"), limits.acquire("b"):
+        # 达到上限时所有客户端都有进行中的请求,新客户端也不会淘汰自己
+        with limits.acquire("c"):
+            with pytest.raises(RateLimitExceededError):
+                admit(limits, "c")
+            with pytest.raises(RateLimitExceededError):
+                admit(limits, "a")
+        admit(limits, "d")
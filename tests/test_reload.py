@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+from fastmcp import Client
+
+from src.libs.mcp_server import McpServer
+from src.models.config_model import ProxyConfig
+from src.models.config_model import ServerConfig
+from src.utils.procfs import is_alive
+
+BACKEND = """
+import os
+
+from fastmcp import FastMCP
+
+server = FastMCP("backend")
+
+
+@server.tool()
+def pid() -> int:
+    return os.getpid()
+
+
+server.run()
+"""
+
+
+def backend(script: Path, prefix: str, **options: object) -> ProxyConfig:
+    return ProxyConfig(type="process", prefix=prefix, command=sys.executable, script_path=str(script), **options)
+
+
+async def call_pid(client: Client, prefix: str) -> tuple[bool, str]:
+    result = await asyncio.wait_for(client.call_tool_mcp(f"{prefix}_pid", {}), 15)
+    return result.isError, result.content[0].text
+
+
+async def tool_names(client: Client) -> set[str]:
+    return {tool.name for tool in await client.list_tools()}
+
+
+def test_update_backends_keeps_unchanged_backends_running(tmp_path: Path) -> None:
+    async def run() -> None:
+        script = tmp_path / "backend.py"
+        script.write_text(BACKEND, encoding="utf-8")
+        server = await McpServer.create(
+            ServerConfig(name="test", tool_search_limit=0),
+            {"kept": backend(script, "k"), "changed": backend(script, "c"), "removed": backend(script, "r")},
+            logging.getLogger("test_reload"),
+        )
+        try:
+            await server.create_proxies()
+            async with Client(server.main_server) as client:
+                _, kept = await call_pid(client, "k")
+                _, changed = await call_pid(client, "c")
+                _, removed = await call_pid(client, "r")
+                kept_client = next(proxy for proxy in server.clients if proxy.name == "kept")
+
+                new_config = {
+                    "kept": backend(script, "k"),
+                    "changed": backend(script, "c", timeout=30),
+                    "added": backend(script, "a"),
+                }
+                assert server.can_update_backends(new_config)
+                await server.update_backends(new_config)
+
+                # 同一个会话中即可看到新的目录
+                assert await tool_names(client) == {"k_pid", "c_pid", "a_pid"}
+                assert await call_pid(client, "k") == (False, kept)
+                assert next(proxy for proxy in server.clients if proxy.name == "kept") is kept_client
+                failed, pid = await call_pid(client, "c")
+                assert not failed
+                assert pid != changed
+                failed, _ = await call_pid(client, "a")
+                assert not failed
+                failed, _ = await call_pid(client, "r")
+                assert failed
+
+                assert sorted(proxy.name for proxy in server.clients) == ["added", "changed", "kept"]
+                assert sorted(server.supervisors) == ["added", "changed", "kept"]
+                deadline = time.monotonic() + 10
+                while is_alive(int(removed)) or is_alive(int(changed)):
+                    assert time.monotonic() < deadline
+                    await asyncio.sleep(0.05)
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_handlers_missing_at_startup_need_a_restart(tmp_path: Path) -> None:
+    async def run() -> None:
+        script = tmp_path / "backend.py"
+        server = await McpServer.create(
+            ServerConfig(name="test", tool_search_limit=0),
+            {"plain": backend(script, "p")},
+            logging.getLogger("test_reload"),
+        )
+        try:
+            assert server.can_update_backends({"plain": backend(script, "p", affinity=True)})
+            assert not server.can_update_backends({"plain": backend(script, "p", cache_tools=["*"])})
+            assert not server.can_update_backends({"plain": backend(script, "p", rate_limit=1.0)})
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
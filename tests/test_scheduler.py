@@ -0,0 +1,171 @@
+import asyncio
+from collections import Counter
+
+from src.libs.adaptive_limit import AimdLimit
+from src.libs.scheduler import CallScheduler
+from src.libs.scheduler import FairScheduler
+
+
+def scheduler(capacity: int, weights: dict[str, float] | None = None) -> FairScheduler:
+    weights = weights or {}
+    return FairScheduler("test", capacity, lambda flow: weights.get(flow, 1.0))
+
+
+async def call(scheduler: FairScheduler, flow: str, priority: int, order: list[str]) -> None:
+    await scheduler.acquire(flow, priority)
+    order.append(flow)
+    await asyncio.sleep(0)
+    scheduler.release()
+
+
+async def run_queued(scheduler: FairScheduler, calls: list[tuple[str, int]]) -> list[str]:
+    """Queue ``calls`` behind a held slot, then free it and return the admission order."""
+    order: list[str] = []
+    await scheduler.acquire("holder", 1)
+    tasks = [asyncio.create_task(call(scheduler, flow, priority, order)) for flow, priority in calls]
+    await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_higher_priority_is_served_first() -> None:
+    order = asyncio.run(run_queued(scheduler(1), [("low", 2), ("high", 0), ("normal", 1)]))
+    assert order == ["high", "normal", "low"]
+
+
+def test_flooding_client_does_not_starve_others() -> None:
+    order = asyncio.run(run_queued(scheduler(1), [("a", 1)] * 10 + [("b", 1)] * 2))
+    assert order[:4] == ["a", "b", "a", "b"]
+
+
+def test_weighted_share_between_clients() -> None:
+    order = asyncio.run(run_queued(scheduler(1, {"a": 3.0}), [("a", 1)] * 12 + [("b", 1)] * 12))
+    assert Counter(order[:8]) == {"a": 6, "b": 2}
+
+
+def test_weighted_share_between_prefixes() -> None:
+    shared = scheduler(1, {"heavy": 3.0})
+    calls = {
+        prefix: CallScheduler(prefix, None, shared, lambda: "client", "x-priority") for prefix in ("heavy", "light")
+    }
+    order: list[str] = []
+
+    async def prefix_call(prefix: str) -> None:
+        await calls[prefix].acquire()
+        order.append(prefix)
+        await asyncio.sleep(0)
+        calls[prefix].release()
+
+    async def run() -> None:
+        await shared.acquire("holder", 1)
+        tasks = [asyncio.create_task(prefix_call(prefix)) for prefix in ["heavy"] * 12 + ["light"] * 12]
+        await asyncio.sleep(0)
+        shared.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert Counter(order[:8]) == {"heavy": 6, "light": 2}
+
+
+def test_nested_acquisitions_hold_one_slot() -> None:
+    async def run() -> FairScheduler:
+        fair = scheduler(1)
+        await fair.acquire("a", 1)
+        await asyncio.wait_for(fair.acquire("a", 1), 1)
+        assert fair.in_flight == 1
+        fair.release()
+        assert fair.in_flight == 1
+        fair.release()
+        return fair
+
+    assert asyncio.run(run()).in_flight == 0
+
+
+def test_cancelled_waiter_is_skipped() -> None:
+    async def run() -> tuple[FairScheduler, list[str]]:
+        fair = scheduler(1)
+        order: list[str] = []
+        await fair.acquire("holder", 1)
+        cancelled = asyncio.create_task(call(fair, "cancelled", 1, order))
+        waiting = asyncio.create_task(call(fair, "waiting", 1, order))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        fair.release()
+        await waiting
+        return fair, order
+
+    fair, order = asyncio.run(run())
+    assert order == ["waiting"]
+    assert fair.status() == {"capacity": 1, "in_flight": 0, "queued": 0}
+
+
+def test_waiter_cancelled_after_admission_gives_the_slot_back() -> None:
+    async def run() -> tuple[FairScheduler, list[str]]:
+        fair = scheduler(1)
+        order: list[str] = []
+        await fair.acquire("holder", 1)
+        cancelled = asyncio.create_task(call(fair, "cancelled", 1, order))
+        waiting = asyncio.create_task(call(fair, "waiting", 1, order))
+        await asyncio.sleep(0)
+        # 名额已交给首个等待者,但它在恢复运行前被取消
+        fair.release()
+        cancelled.cancel()
+        await asyncio.wait_for(waiting, 1)
+        return fair, order
+
+    fair, order = asyncio.run(run())
+    assert order == ["waiting"]
+    assert fair.in_flight == 0
+
+
+def test_backend_slot_is_released_when_cancelled_in_the_shared_queue() -> None:
+    async def run() -> FairScheduler:
+        backend, shared = scheduler(2), scheduler(1)
+        calls = CallScheduler("p", backend, shared, lambda: "client", "x-priority")
+        await calls.acquire()
+        queued = asyncio.create_task(calls.acquire())
+        await asyncio.sleep(0)
+        assert backend.in_flight == 2
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert backend.in_flight == 1
+        calls.release()
+        return backend
+
+    assert asyncio.run(run()).in_flight == 0
+
+
+def test_adaptive_capacity_shrinks_on_drops() -> None:
+    async def hold(fair: FairScheduler, release: asyncio.Event, *, dropped: bool) -> None:
+        await fair.acquire("a", 1)
+        await release.wait()
+        fair.release(dropped=dropped)
+
+    async def run() -> None:
+        limit = AimdLimit(1, 8)
+        fair = FairScheduler("test", 0, lambda _: 1.0, limit)
+        assert fair.capacity == 2
+        dropped, ok = asyncio.Event(), asyncio.Event()
+        holders = [
+            asyncio.create_task(hold(fair, dropped, dropped=True)),
+            asyncio.create_task(hold(fair, ok, dropped=False)),
+        ]
+        order: list[str] = []
+        queued = asyncio.create_task(call(fair, "b", 1, order))
+        await asyncio.sleep(0)
+        assert fair.status()["queued"] == 1
+
+        # 失败的调用使上限降为 1,释放的名额不再交给排队的调用
+        dropped.set()
+        await asyncio.sleep(0)
+        assert fair.capacity == 1
+        assert order == []
+        ok.set()
+        await asyncio.wait_for(queued, 1)
+        await asyncio.gather(*holders)
+        assert order == ["b"]
+        assert fair.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import pytest
+
+from src.libs.shared_store import RespStore
+from src.libs.shared_store import StoreCache
+from src.libs.shared_store import StoreError
+from src.script.resp_standin import RespStandin
+
+
+@dataclass
+class Standin:
+    """A RespStandin listening on a free local port."""
+
+    server: RespStandin
+    port: int = 0
+    connections: int = 0
+
+    def url(self, password: str | None = None, db: int = 0) -> str:
+        auth = f":{password}@" if password else ""
+        return f"redis://{auth}127.0.0.1:{self.port}/{db}"
+
+
+@asynccontextmanager
+async def standin(password: str | None = None) -> AsyncIterator[Standin]:
+    state = Standin(RespStandin(password))
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # 记录打开过的连接数,用于检查连接池上限
+        state.connections += 1
+        await state.server.handle(reader, writer)
+
+    listener = await asyncio.start_server(handle, "127.0.0.1", 0)
+    state.port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        yield state
+
+
+def test_auth_and_db_selection() -> None:
+    async def run() -> None:
+        async with standin("secret") as server:
+            first = RespStore(server.url("secret", db=1), timeout=2)
+            second = RespStore(server.url("secret", db=2), timeout=2)
+            await first.set("key", b"one")
+            await second.set("key", b"two")
+            assert await first.get("key") == b"one"
+            assert await second.get("key") == b"two"
+            await first.delete("key")
+            assert await first.get("key") is None
+            assert await second.get("key") == b"two"
+
+            with pytest.raises(StoreError, match="WRONGPASS"):
+                await RespStore(server.url("wrong"), timeout=2).get("key")
+            with pytest.raises(StoreError, match="NOAUTH"):
+                await RespStore(server.url(), timeout=2).get("key")
+            await first.close()
+            await second.close()
+
+    asyncio.run(run())
+
+
+def test_ttl_expiry() -> None:
+    async def run() -> None:
+        async with standin() as server:
+            store = RespStore(server.url(), timeout=2)
+            await store.set("short", b"value", ttl=0.05)
+            await store.set("kept", b"value")
+            assert await store.get("short") == b"value"
+            await asyncio.sleep(0.1)
+            assert await store.get("short") is None
+            assert await store.get("kept") == b"value"
+            await store.close()
+
+    asyncio.run(run())
+
+
+def test_invalidation_reaches_other_nodes() -> None:
+    async def run() -> None:
+        async with standin() as server:
+            writer = StoreCache(RespStore(server.url(), timeout=2), "gw", l1_ttl=60)
+            reader = StoreCache(RespStore(server.url(), timeout=2), "gw", l1_ttl=60)
+            changed: asyncio.Queue[str] = asyncio.Queue()
+
+            async def listener(key: str) -> None:
+                await changed.put(key)
+
+            reader.on_invalidate("tools:", listener)
+            task = asyncio.create_task(reader.run())
+            started = time.monotonic()
+            while not server.server.channels.get(b"gw:invalidate"):
+                assert time.monotonic() - started < 5
+                await asyncio.sleep(0.01)
+            try:
+                # 读到的空值留在本地缓存中,直到写入方通知失效
+                assert await reader.get("tools:a") is None
+                await writer.set("tools:a", b"new")
+                assert await asyncio.wait_for(changed.get(), 5) == "tools:a"
+                assert await reader.get("tools:a") == b"new"
+
+                await writer.delete("tools:a")
+                assert await asyncio.wait_for(changed.get(), 5) == "tools:a"
+                assert await reader.get("tools:a") is None
+                assert changed.empty()
+            finally:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+                await writer.close()
+                await reader.close()
+
+    asyncio.run(run())
+
+
+def test_commands_share_a_bounded_pool() -> None:
+    async def run() -> None:
+        async with standin() as server:
+            store = RespStore(server.url(), timeout=2, pool_size=2)
+            await asyncio.gather(*(store.set(f"k{i}", b"%d" % i) for i in range(20)))
+            values = await asyncio.gather(*(store.get(f"k{i}") for i in range(20)))
+            assert values == [b"%d" % i for i in range(20)]
+            assert server.connections == 2
+            await store.close()
+
+    asyncio.run(run())
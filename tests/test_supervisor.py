@@ -0,0 +1,46 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport
+
+from src.libs.supervisor import BackendSupervisor
+from src.models.config_model import ProxyConfig
+
+BACKEND = """
+from fastmcp import FastMCP
+
+FastMCP("idle").run()
+"""
+
+
+def supervisor(tmp_path: Path) -> BackendSupervisor:
+    script = tmp_path / "backend.py"
+    script.write_text(BACKEND, encoding="utf-8")
+    client = Client(PythonStdioTransport(script_path=str(script), python_cmd=sys.executable))
+    config = ProxyConfig(type="process", prefix="idle", command=sys.executable, health_interval=30)
+    return BackendSupervisor("idle", client, config)
+
+
+def test_stop_and_recycle_do_not_wait_for_the_health_check(tmp_path: Path) -> None:
+    async def run() -> None:
+        backend = supervisor(tmp_path)
+        assert await backend.start(10)
+        first = backend.pids
+
+        started = time.monotonic()
+        assert backend.recycle("test")
+        while backend.pids in (first, set()):
+            assert time.monotonic() - started < 10
+            await asyncio.sleep(0.05)
+        assert backend.restart_count == 1
+        assert backend.last_exit_reason == "test"
+
+        started = time.monotonic()
+        await backend.stop(10)
+        assert time.monotonic() - started < 5
+        assert backend.state == "stopped"
+
+    asyncio.run(run())
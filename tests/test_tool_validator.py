@@ -0,0 +1,183 @@
+import pytest
+
+from src.libs.tool_validator import ToolValidators
+from src.libs.tool_validator import compile_schema
+
+
+def properties(**schemas: dict) -> dict:
+    return {"type": "object", "properties": schemas}
+
+
+@pytest.mark.parametrize(
+    ("schema", "value", "error"),
+    [
+        ({"minimum": 0}, 0, None),
+        ({"minimum": 0}, -1, ".n: must be >= 0"),
+        ({"maximum": 10}, 10, None),
+        ({"maximum": 10}, 10.5, ".n: must be <= 10"),
+        ({"exclusiveMinimum": 0}, 0, ".n: must be > 0"),
+        ({"exclusiveMinimum": 0}, 0.5, None),
+        ({"exclusiveMaximum": 10}, 10, ".n: must be < 10"),
+        ({"exclusiveMaximum": 10}, 9, None),
+        # draft-04 的布尔形式
+        ({"minimum": 0, "exclusiveMinimum": True}, 0.5, None),
+        ({"minimum": 0, "exclusiveMinimum": True}, 0, ".n: must be > 0"),
+        ({"minimum": 0, "exclusiveMinimum": False}, 0, None),
+        ({"maximum": 10, "exclusiveMaximum": False}, 5, None),
+        ({"maximum": 10, "exclusiveMaximum": False}, 10, None),
+        ({"maximum": 10, "exclusiveMaximum": True}, 10, ".n: must be < 10"),
+        ({"maximum": 10, "exclusiveMaximum": True}, 9.99, None),
+        ({"exclusiveMaximum": True}, 5, None),
+        ({"exclusiveMinimum": False}, -5, None),
+        # 非数字的值不受范围限制
+        ({"minimum": 0}, "text", None),
+        ({"minimum": 0}, False, None),
+    ],
+)
+def test_number_bounds(schema: dict, value: object, error: str | None) -> None:
+    assert compile_schema(properties(n=schema))({"n": value}) == error
+
+
+@pytest.mark.parametrize(
+    ("kind", "value", "valid"),
+    [
+        ("integer", 3, True),
+        ("integer", 3.0, True),
+        ("integer", 3.5, False),
+        ("integer", True, False),
+        ("number", 1.5, True),
+        ("number", False, False),
+        ("string", "x", True),
+        ("string", 1, False),
+        ("boolean", True, True),
+        ("boolean", 0, False),
+        ("null", None, True),
+        ("array", [], True),
+        ("object", {}, True),
+        ("object", [], False),
+    ],
+)
+def test_types(kind: str, value: object, *, valid: bool) -> None:
+    assert (compile_schema({"type": kind})(value) is None) is valid
+
+
+def test_type_list() -> None:
+    validate = compile_schema({"type": ["string", "null"]})
+    assert validate(None) is None
+    assert validate(1) == ": expected string or null, got int"
+
+
+def test_required_and_additional_properties() -> None:
+    validate = compile_schema(
+        {
+            "type": "object",
+            "properties": {"a": {"type": "string"}},
+            "required": ["a"],
+            "additionalProperties": False,
+        },
+    )
+    assert validate({"a": "x"}) is None
+    assert validate({}) == ": missing required property 'a'"
+    assert validate({"a": "x", "b": 1}) == ": unexpected property 'b'"
+    assert validate({"a": 1}) == ".a: expected string, got int"
+
+
+def test_additional_properties_schema() -> None:
+    validate = compile_schema({"type": "object", "additionalProperties": {"type": "integer"}})
+    assert validate({"x": 1}) is None
+    assert validate({"x": "1"}) == ".x: expected integer, got str"
+
+
+def test_enum_and_const_do_not_mix_bool_and_int() -> None:
+    assert compile_schema({"enum": [1, "a"]})(True) == ": must be one of [1, 'a']"
+    assert compile_schema({"enum": [1, "a"]})(1) is None
+    assert compile_schema({"const": True})(1) == ": must be one of [True]"
+    assert compile_schema({"const": 1})(True) == ": must be one of [1]"
+
+
+@pytest.mark.parametrize(
+    ("schema", "value"),
+    [
+        ({"type": "integer", "enum": [1, 2]}, 1.0),
+        ({"const": 0}, 0.0),
+        ({"const": 0.0}, 0),
+        ({"enum": [[1, {"a": 2}]]}, [1.0, {"a": 2.0}]),
+        ({"const": {"a": 1, "b": [True]}}, {"b": [True], "a": 1}),
+    ],
+)
+def test_enum_and_const_compare_numbers_by_value(schema: dict, value: object) -> None:
+    assert compile_schema(schema)(value) is None
+
+
+def test_enum_and_const_compare_nested_values_by_json_type() -> None:
+    assert compile_schema({"const": [1]})([True]) == ": must be one of [[1]]"
+    assert compile_schema({"const": {"a": 0}})({"a": False}) == ": must be one of [{'a': 0}]"
+    assert compile_schema({"enum": ["1", None]})(1) == ": must be one of ['1', None]"
+
+
+def test_array_items_and_length() -> None:
+    validate = compile_schema({"type": "array", "items": {"type": "integer"}, "minItems": 1, "maxItems": 2})
+    assert validate([1]) is None
+    assert validate([]) == ": expected at least 1 items"
+    assert validate([1, 2, 3]) == ": expected at most 2 items"
+    assert validate([1, "x"]) == "[1]: expected integer, got str"
+
+
+def test_string_keywords() -> None:
+    validate = compile_schema({"type": "string", "minLength": 2, "maxLength": 3, "pattern": "^a"})
+    assert validate("ab") is None
+    assert validate("a") == ": expected at least 2 characters"
+    assert validate("abcd") == ": expected at most 3 characters"
+    assert validate("ba") == ": does not match pattern '^a'"
+
+
+def test_invalid_pattern_is_ignored() -> None:
+    assert compile_schema({"type": "string", "pattern": "("})("anything") is None
+
+
+def test_combinators() -> None:
+    one_of = compile_schema({"oneOf": [{"type": "integer"}, {"type": "number"}]})
+    assert one_of(1.5) is None
+    assert one_of(1) == ": matches more than one schema of oneOf"
+    any_of = compile_schema({"anyOf": [{"type": "string"}, {"type": "integer"}]})
+    assert any_of("x") is None
+    assert any_of(1.5) == ": expected string, got float"
+    all_of = compile_schema({"allOf": [{"type": "integer"}, {"minimum": 2}]})
+    assert all_of(2) is None
+    assert all_of(1) == ": must be >= 2"
+
+
+def test_recursive_ref() -> None:
+    validate = compile_schema(
+        {
+            "$ref": "#/$defs/node",
+            "$defs": {
+                "node": {
+                    "type": "object",
+                    "properties": {
+                        "value": {"type": "integer"},
+                        "children": {"type": "array", "items": {"$ref": "#/$defs/node"}},
+                    },
+                },
+            },
+        },
+    )
+    assert validate({"value": 1, "children": [{"value": 2, "children": []}]}) is None
+    assert validate({"value": 1, "children": [{"value": "2"}]}) == ".children[0].value: expected integer, got str"
+
+
+def test_unknown_keywords_and_boolean_schemas() -> None:
+    assert compile_schema({"format": "email", "type": "string"})("not an email") is None
+    assert compile_schema(properties(x=True))({"x": object()}) is None
+    assert compile_schema(properties(x=False))({"x": 1}) == ".x: no value is allowed"
+
+
+def test_tool_validators_refresh_and_remove() -> None:
+    validators = ToolValidators()
+    schemas = {"s_echo": properties(text={"type": "string"})}
+    assert validators.refresh("s", schemas)
+    assert not validators.refresh("s", schemas)
+    assert validators.validate("s_echo", {"text": 1}) == "arguments.text: expected string, got int"
+    assert validators.validate("s_unknown", {"text": 1}) is None
+    validators.remove("s")
+    assert validators.validate("s_echo", {"text": 1}) is None
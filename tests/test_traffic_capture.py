@@ -0,0 +1,53 @@
+import json
+import time
+from pathlib import Path
+
+from mcp.types import CallToolRequest
+from mcp.types import CallToolRequestParams
+from mcp.types import CallToolResult
+from mcp.types import ServerResult
+from mcp.types import TextContent
+
+from src.libs.traffic_capture import REDACTED
+from src.libs.traffic_capture import TrafficRecorder
+from src.script.replay_traffic import load_trace
+
+
+def call(tool: str, **arguments: object) -> CallToolRequest:
+    return CallToolRequest(method="tools/call", params=CallToolRequestParams(name=tool, arguments=arguments))
+
+
+def recorder(path: Path) -> TrafficRecorder:
+    return TrafficRecorder(str(path), lambda tool: tool.split("_")[0], redact=["key"])
+
+
+def test_records_are_serialized_when_written(tmp_path: Path) -> None:
+    path = tmp_path / "capture.ndjson"
+    capture = recorder(path)
+    result = ServerResult(CallToolResult(content=[TextContent(type="text", text="hello")]))
+    capture.record(call("fs_read", path="a", key="value"), time.monotonic(), result)
+    capture.record(call("fs_read"), time.monotonic(), error="boom")
+    assert not path.exists()
+
+    capture._write(capture._buffer)  # noqa: SLF001
+    first, second = (json.loads(line) for line in path.read_text().splitlines())
+    assert first["prefix"] == "fs"
+    assert first["arguments"] == {"path": "a", "key": REDACTED}
+    assert first["response_bytes"] == len(result.model_dump_json(by_alias=True, exclude_none=True))
+    assert second["error"] == "boom"
+    assert "response_bytes" not in second
+
+
+def test_traces_of_several_processes_share_one_timeline(tmp_path: Path) -> None:
+    path = tmp_path / "capture.ndjson"
+    old, new = recorder(path), recorder(path)
+    old.record(call("fs_first"), time.monotonic())
+    time.sleep(0.01)
+    # 新进程的记录先写入文件,回放时仍排在旧进程的记录之后
+    new.record(call("fs_second"), time.monotonic())
+    new._write(new._buffer)  # noqa: SLF001
+    old._write(old._buffer)  # noqa: SLF001
+
+    records = load_trace(path)
+    assert [record["tool"] for record in records] == ["fs_first", "fs_second"]
+    assert records[1]["timestamp"] - records[0]["timestamp"] >= 0.01